@@ -2,18 +2,22 @@
 from __future__ import annotations
 
 import asyncio
+import random
 import re
 import struct
 import time
+from collections.abc import AsyncIterator
 from collections.abc import Callable
+from collections.abc import Iterable
 from collections.abc import Mapping
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 from datetime import date
 from datetime import datetime
-from pathlib import Path
+from typing import Any
 from typing import Literal
 from typing import TypedDict
 
-import bcrypt
 import databases.core
 from fastapi import APIRouter
 from fastapi import Response
@@ -24,6 +28,8 @@ from fastapi.responses import HTMLResponse
 import app.packets
 import app.settings
 import app.state
+import app.usecases.client_versions
+import app.usecases.passwords
 import app.usecases.performance
 import app.utils
 from app import commands
@@ -39,7 +45,6 @@ from app.logging import Ansi
 from app.logging import log
 from app.logging import magnitude_fmt_time
 from app.objects.beatmap import Beatmap
-from app.objects.beatmap import ensure_local_osu_file
 from app.objects.channel import Channel
 from app.objects.clan import Clan
 from app.objects.match import Match
@@ -59,12 +64,9 @@ from app.packets import BasePacket
 from app.packets import ClientPackets
 from app.repositories import ingame_logins as logins_repo
 from app.repositories import players as players_repo
-from app.state import services
+from app.usecases.osu_files import ensure_local_osu_file
 from app.usecases.performance import ScoreParams
 
-OSU_API_V2_CHANGELOG_URL = "https://osu.ppy.sh/api/v2/changelog"
-
-BEATMAPS_PATH = Path.cwd() / ".data/osu"
 
 BASE_DOMAIN = app.settings.DOMAIN
 
@@ -164,6 +166,54 @@ matches:
     )
 
 
+class LoginAdmission:
+    """Limit the number of logins being processed & waiting at once."""
+
+    def __init__(self, max_concurrency: int, max_queued: int) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.queued = 0
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def full(self) -> bool:
+        """Whether no more logins may wait for their turn."""
+        return self.queued >= self.max_queued
+
+    def retry_delay(self) -> int:
+        """A jittered delay (in ms) for a client to retry, based on the load."""
+        base_delay = 1000 * (1 + self.queued / self.max_concurrency)
+        return int(min(base_delay, 30_000) * random.uniform(0.5, 1.5))
+
+    def _report_queue_depth(self) -> None:
+        if app.state.services.datadog:
+            app.state.services.datadog.gauge("bancho.login_queue_depth", self.queued)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for & hold one of the concurrent login slots."""
+        self.queued += 1
+        self._report_queue_depth()
+
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+            self._report_queue_depth()
+
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+login_admission = LoginAdmission(
+    max_concurrency=app.settings.LOGIN_MAX_CONCURRENCY,
+    max_queued=app.settings.LOGIN_MAX_QUEUED,
+)
+
+
 @router.post("/")
 async def bancho_handler(
     request: Request,
@@ -174,14 +224,26 @@ async def bancho_handler(
 
     if osu_token is None:
         # the client is performing a login
-        async with app.state.services.database.connection() as db_conn:
-            login_data = await login(
-                request.headers,
-                await request.body(),
-                ip,
-                db_conn,
+        if login_admission.full:
+            # too many logins are already waiting; have
+            # the client retry after a (jittered) delay.
+            if app.state.services.datadog:
+                app.state.services.datadog.increment("bancho.logins_rejected")
+
+            return Response(
+                content=app.packets.restart_server(login_admission.retry_delay()),
+                headers={"cho-token": "server-busy"},
             )
 
+        async with login_admission.slot():
+            async with app.state.services.database.connection() as db_conn:
+                login_data = await login(
+                    request.headers,
+                    await request.body(),
+                    ip,
+                    db_conn,
+                )
+
         return Response(
             content=login_data["response_body"],
             headers={"cho-token": login_data["osu_token"]},
@@ -193,10 +255,12 @@ async def bancho_handler(
     if not player:
         # chances are, we just restarted the server
         # tell their client to reconnect immediately.
+        # NOTE: the delay is jittered so that clients
+        # don't all reconnect at once after a restart.
         return Response(
             content=(
                 app.packets.notification("SERVER REBOOTED, SORRY!!!")
-                + app.packets.restart_server(0)  # ms until reconnection
+                + app.packets.restart_server(login_admission.retry_delay())
             ),
         )
 
@@ -277,10 +341,11 @@ class ChangeAction(BasePacket):
         player.status.mods = Mods(self.mods)
         player.status.mode = GameMode(self.mode)
         player.status.map_id = self.map_id
+        player.invalidate_status_packets()
 
         # broadcast it to all online players.
         if not player.restricted:
-            app.state.sessions.players.enqueue(app.packets.user_stats(player))
+            app.state.sessions.players.enqueue(player.stats_packet)
 
 
 IGNORED_CHANNELS = ["#highlight", "#userlog"]
@@ -431,7 +496,7 @@ class Logout(BasePacket):
 @register(ClientPackets.REQUEST_STATUS_UPDATE, restricted=True)
 class StatsUpdateRequest(BasePacket):
     async def handle(self, player: Player) -> None:
-        player.enqueue(app.packets.user_stats(player))
+        player.enqueue(player.stats_packet)
 
 
 # Some messages to send on welcome/restricted/etc.
@@ -518,6 +583,99 @@ def parse_login_data(data: bytes) -> LoginData:
     }
 
 
+def online_players_data(players: Iterable[Player]) -> bytes:
+    """Build the data sent to a logging in player about `players`."""
+    if app.settings.LOGIN_PRESENCE_BUNDLE:
+        # only send the ids of online players; the osu! client will
+        # request their presence & stats when it needs to display them.
+        return app.packets.user_presence_bundle([o.id for o in players])
+
+    data = bytearray()
+
+    for o in players:
+        if o is app.state.sessions.bot:
+            # optimization for bot since it's
+            # the most frequently requested user
+            data += app.packets.bot_presence(o)
+            data += app.packets.bot_stats(o)
+        else:
+            data += o.presence_packet
+            data += o.stats_packet
+
+    return bytes(data)
+
+
+class LoginStageTimer:
+    """Track the time taken by each consecutive stage of a login."""
+
+    def __init__(self) -> None:
+        self.stages: dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        """Mark the end of `stage`, which began at the end of the previous."""
+        now = time.perf_counter()
+        self.stages[stage] = now - self._last
+        self._last = now
+
+    def report(self) -> None:
+        """Report the stage timings to datadog."""
+        if app.state.services.datadog:
+            for stage, time_taken in self.stages.items():
+                app.state.services.datadog.histogram(
+                    "bancho.login_stage_time",
+                    time_taken,
+                    tags=[f"stage:{stage}"],
+                )
+
+
+async def record_login(
+    user_id: int,
+    ip: IPAddress,
+    osu_version: OsuVersion,
+    login_data: LoginData,
+) -> None:
+    """Store the login & the client's hardware hashes for auditing."""
+    await logins_repo.create(
+        user_id=user_id,
+        ip=str(ip),
+        osu_ver=osu_version.date,
+        osu_stream=osu_version.stream,
+    )
+
+    await app.state.services.database.execute(
+        "INSERT INTO client_hashes "
+        "(userid, osupath, adapters, uninstall_id,"
+        " disk_serial, latest_time, occurrences) "
+        "VALUES (:id, :osupath, :adapters, :uninstall, :disk_serial, NOW(), 1) "
+        "ON DUPLICATE KEY UPDATE "
+        "occurrences = occurrences + 1, "
+        "latest_time = NOW() ",
+        {
+            "id": user_id,
+            "osupath": login_data["osu_path_md5"],
+            "adapters": login_data["adapters_md5"],
+            "uninstall": login_data["uninstall_md5"],
+            "disk_serial": login_data["disk_signature_md5"],
+        },
+    )
+
+
+async def fetch_unread_mail(player: Player) -> list[Mapping[str, Any]]:
+    """Fetch the mail sent to `player` while they were offline."""
+    if player.restricted:
+        return []
+
+    rows = await app.state.services.database.fetch_all(
+        "SELECT m.`msg`, m.`time`, m.`from_id`, "
+        "(SELECT name FROM users WHERE id = m.`from_id`) AS `from`, "
+        "(SELECT name FROM users WHERE id = m.`to_id`) AS `to` "
+        "FROM `mail` m WHERE m.`to_id` = :to AND m.`read` = 0",
+        {"to": player.id},
+    )
+    return [dict(row._mapping) for row in rows]
+
+
 async def login(
     headers: Mapping[str, str],
     body: bytes,
@@ -544,6 +702,8 @@ async def login(
       other: valid id, logged in
     """
 
+    stage_timer = LoginStageTimer()
+
     # parse login data
     login_data = parse_login_data(body)
 
@@ -571,27 +731,24 @@ async def login(
         if osu_client_stream in ("stable", "beta"):
             osu_client_stream += "40"  # TODO: why?
 
-        allowed_client_versions = set()
-
-        # TODO: put this behind a layer of abstraction
-        #       for better handling of the error cases
-        response = await services.http_client.get(
-            OSU_API_V2_CHANGELOG_URL,
-            params={"stream": osu_client_stream},
-        )
-        response.raise_for_status()
-        for build in response.json()["builds"]:
-            version = date(
-                int(build["version"][0:4]),
-                int(build["version"][4:6]),
-                int(build["version"][6:8]),
+        allowed_client_versions = (
+            await app.usecases.client_versions.get_allowed_versions(
+                osu_client_stream,
             )
-            allowed_client_versions.add(version)
+        )
 
-            if any(entry["major"] for entry in build["changelog_entries"]):
-                # this build is a major iteration to the client
-                # don't allow anything older than this
-                break
+        if allowed_client_versions is None:
+            # we can't check the client's version (e.g. the osu! api is down)
+            return {
+                "osu_token": "client-versions-unavailable",
+                "response_body": (
+                    app.packets.user_id(-1)
+                    + app.packets.notification(
+                        "Unable to check your client's version; "
+                        "please try again later.",
+                    )
+                ),
+            }
 
         if osu_version.date not in allowed_client_versions:
             return {
@@ -660,57 +817,32 @@ async def login(
             "response_body": app.packets.user_id(-1),
         }
 
-    # get our bcrypt cache
-    bcrypt_cache = app.state.cache.bcrypt
+    stage_timer.mark("validation")
+
     pw_bcrypt = user_info["pw_bcrypt"].encode()
 
     # check credentials against db. algorithms like these are intentionally
     # designed to be slow; we'll cache the results to speed up subsequent logins.
-    if pw_bcrypt in bcrypt_cache:  # ~0.01 ms
-        if login_data["password_md5"] != bcrypt_cache[pw_bcrypt]:
-            return {
-                "osu_token": "incorrect-password",
-                "response_body": (
-                    app.packets.notification(f"{BASE_DOMAIN}: Incorrect password")
-                    + app.packets.user_id(-1)
-                ),
-            }
-    else:  # ~200ms
-        if not bcrypt.checkpw(login_data["password_md5"], pw_bcrypt):
-            return {
-                "osu_token": "incorrect-password",
-                "response_body": (
-                    app.packets.notification(f"{BASE_DOMAIN}: Incorrect password")
-                    + app.packets.user_id(-1)
-                ),
-            }
-
-        bcrypt_cache[pw_bcrypt] = login_data["password_md5"]
+    if not await app.usecases.passwords.verify_password(
+        login_data["password_md5"],
+        pw_bcrypt,
+    ):
+        return {
+            "osu_token": "incorrect-password",
+            "response_body": (
+                app.packets.notification(f"{BASE_DOMAIN}: Incorrect password")
+                + app.packets.user_id(-1)
+            ),
+        }
 
     """ login credentials verified """
 
-    await logins_repo.create(
-        user_id=user_info["id"],
-        ip=str(ip),
-        osu_ver=osu_version.date,
-        osu_stream=osu_version.stream,
-    )
+    stage_timer.mark("authentication")
 
-    await db_conn.execute(
-        "INSERT INTO client_hashes "
-        "(userid, osupath, adapters, uninstall_id,"
-        " disk_serial, latest_time, occurrences) "
-        "VALUES (:id, :osupath, :adapters, :uninstall, :disk_serial, NOW(), 1) "
-        "ON DUPLICATE KEY UPDATE "
-        "occurrences = occurrences + 1, "
-        "latest_time = NOW() ",
-        {
-            "id": user_info["id"],
-            "osupath": login_data["osu_path_md5"],
-            "adapters": login_data["adapters_md5"],
-            "uninstall": login_data["uninstall_md5"],
-            "disk_serial": login_data["disk_signature_md5"],
-        },
+    # the audit inserts are write-only, so we
+    # can keep them off of the response path.
+    app.state.services.create_task_with_own_connection(
+        record_login(user_info["id"], ip, osu_version, login_data),
     )
 
     # TODO: store adapters individually
@@ -726,13 +858,18 @@ async def login(
             "disk_serial": login_data["disk_signature_md5"],
         }
 
-    hw_matches = await db_conn.fetch_all(
-        "SELECT u.name, u.priv, h.occurrences "
-        "FROM client_hashes h "
-        "INNER JOIN users u ON h.userid = u.id "
-        "WHERE h.userid != :user_id AND "
-        f"({hw_checks})",
-        {"user_id": user_info["id"], **hw_args},
+    # fetch any accounts with matching hardware
+    # & the player's geolocation concurrently.
+    hw_matches, geoloc = await asyncio.gather(
+        db_conn.fetch_all(
+            "SELECT u.name, u.priv, h.occurrences "
+            "FROM client_hashes h "
+            "INNER JOIN users u ON h.userid = u.id "
+            "WHERE h.userid != :user_id AND "
+            f"({hw_checks})",
+            {"user_id": user_info["id"], **hw_args},
+        ),
+        app.state.services.fetch_geoloc(ip, headers),
     )
 
     if hw_matches:
@@ -769,8 +906,6 @@ async def login(
 
     db_country = user_info["country"]
 
-    geoloc = await app.state.services.fetch_geoloc(ip, headers)
-
     if geoloc is None:
         return {
             "osu_token": "login-failed",
@@ -787,14 +922,18 @@ async def login(
         # country wasn't stored on registration.
         log(f"Fixing {login_data['username']}'s country.", Ansi.LGREEN)
 
-        await db_conn.execute(
-            "UPDATE users SET country = :country WHERE id = :user_id",
-            {
-                "country": geoloc["country"]["acronym"],
-                "user_id": user_info["id"],
-            },
+        app.state.services.create_task_with_own_connection(
+            app.state.services.database.execute(
+                "UPDATE users SET country = :country WHERE id = :user_id",
+                {
+                    "country": geoloc["country"]["acronym"],
+                    "user_id": user_info["id"],
+                },
+            ),
         )
 
+    stage_timer.mark("checks")
+
     client_details = ClientDetails(
         osu_version=osu_version,
         osu_path_md5=login_data["osu_path_md5"],
@@ -866,10 +1005,19 @@ async def login(
     # tells osu! to reorder channels based on config.
     data += app.packets.channel_info_end()
 
-    # fetch some of the player's
-    # information from sql to be cached.
-    await player.stats_from_sql_full(db_conn)
-    await player.relationships_from_sql(db_conn)
+    # fetch some of the player's information from sql to be cached,
+    # along with any mail they were sent while offline, concurrently.
+    _, _, mail_rows = await asyncio.gather(
+        app.state.services.create_task_with_own_connection(
+            player.stats_from_sql_full(db_conn),
+        ),
+        player.relationships_from_sql(db_conn),
+        app.state.services.create_task_with_own_connection(
+            fetch_unread_mail(player),
+        ),
+    )
+
+    stage_timer.mark("fetch")
 
     # TODO: fetch player.recent_scores from sql
 
@@ -881,7 +1029,7 @@ async def login(
     data += app.packets.silence_end(player.remaining_silence)
 
     # update our new player's stats, and broadcast them.
-    user_data = app.packets.user_presence(player) + app.packets.user_stats(player)
+    user_data = player.presence_packet + player.stats_packet
 
     data += user_data
 
@@ -891,27 +1039,11 @@ async def login(
             # enqueue us to them
             o.enqueue(user_data)
 
-            # enqueue them to us.
-            if not o.restricted:
-                if o is app.state.sessions.bot:
-                    # optimization for bot since it's
-                    # the most frequently requested user
-                    data += app.packets.bot_presence(o)
-                    data += app.packets.bot_stats(o)
-                else:
-                    data += app.packets.user_presence(o)
-                    data += app.packets.user_stats(o)
+        # enqueue them to us.
+        data += online_players_data(app.state.sessions.players.unrestricted)
 
         # the player may have been sent mail while offline,
         # enqueue any messages from their respective authors.
-        mail_rows = await db_conn.fetch_all(
-            "SELECT m.`msg`, m.`time`, m.`from_id`, "
-            "(SELECT name FROM users WHERE id = m.`from_id`) AS `from`, "
-            "(SELECT name FROM users WHERE id = m.`to_id`) AS `to` "
-            "FROM `mail` m WHERE m.`to_id` = :to AND m.`read` = 0",
-            {"to": player.id},
-        )
-
         if mail_rows:
             sent_to = set()  # ids
 
@@ -960,16 +1092,8 @@ async def login(
 
     else:
         # player is restricted, one way data
-        for o in app.state.sessions.players.unrestricted:
-            # enqueue them to us.
-            if o is app.state.sessions.bot:
-                # optimization for bot since it's
-                # the most frequently requested user
-                data += app.packets.bot_presence(o)
-                data += app.packets.bot_stats(o)
-            else:
-                data += app.packets.user_presence(o)
-                data += app.packets.user_stats(o)
+        # enqueue them to us.
+        data += online_players_data(app.state.sessions.players.unrestricted)
 
         data += app.packets.account_restricted()
         data += app.packets.send_message(
@@ -985,6 +1109,8 @@ async def login(
     # making them officially logged in.
     app.state.sessions.players.append(player)
 
+    stage_timer.mark("response")
+
     if app.state.services.datadog:
         if not player.restricted:
             app.state.services.datadog.increment("bancho.online_players")
@@ -992,6 +1118,8 @@ async def login(
         time_taken = time.time() - login_time
         app.state.services.datadog.histogram("bancho.login_time", time_taken)
 
+        stage_timer.report()
+
     user_os = "unix (wine)" if running_under_wine else "win32"
     country_code = player.geoloc["country"]["acronym"].upper()
 
@@ -1220,12 +1348,11 @@ class SendPrivateMessage(BasePacket):
 
                         # calculate generic pp values from their /np
 
-                        osu_file_path = BEATMAPS_PATH / f"{bmap.id}.osu"
-                        if not await ensure_local_osu_file(
-                            osu_file_path,
+                        osu_file_path = await ensure_local_osu_file(
                             bmap.id,
                             bmap.md5,
-                        ):
+                        )
+                        if osu_file_path is None:
                             resp_msg = (
                                 "Mapfile could not be found; "
                                 "this incident has been reported."
@@ -1250,21 +1377,27 @@ class SendPrivateMessage(BasePacket):
                                 for acc in app.settings.PP_CACHED_ACCURACIES
                             ]
 
-                            results = app.usecases.performance.calculate_performances(
-                                osu_file_path=str(osu_file_path),
-                                scores=scores,
-                            )
-
-                            resp_msg = " | ".join(
-                                f"{acc}%: {result['performance']['pp']:,.2f}pp"
-                                for acc, result in zip(
-                                    app.settings.PP_CACHED_ACCURACIES,
-                                    results,
+                            try:
+                                results = await app.usecases.performance.calculate_performances(
+                                    osu_file_path=str(osu_file_path),
+                                    scores=scores,
+                                    map_md5=bmap.md5,
+                                )
+                            except asyncio.TimeoutError:
+                                resp_msg = "Performance calculation timed out."
+                            except BrokenProcessPool:
+                                resp_msg = "Performance calculation failed."
+                            else:
+                                resp_msg = " | ".join(
+                                    f"{acc}%: {result['performance']['pp']:,.2f}pp"
+                                    for acc, result in zip(
+                                        app.settings.PP_CACHED_ACCURACIES,
+                                        results,
+                                    )
                                 )
-                            )
 
-                            elapsed = time.time_ns() - pp_calc_st
-                            resp_msg += f" | Elapsed: {magnitude_fmt_time(elapsed)}"
+                                elapsed = time.time_ns() - pp_calc_st
+                                resp_msg += f" | Elapsed: {magnitude_fmt_time(elapsed)}"
                     else:
                         resp_msg = "Could not find map."
 
@@ -2031,20 +2164,24 @@ class StatsRequest(BasePacket):
         self.user_ids = reader.read_i32_list_i16l()
 
     async def handle(self, player: Player) -> None:
-        unrestrcted_ids = [p.id for p in app.state.sessions.players.unrestricted]
-        is_online = lambda o: o in unrestrcted_ids and o != player.id
+        unrestricted = app.state.sessions.players.unrestricted
 
-        for online in filter(is_online, self.user_ids):
-            target = app.state.sessions.players.get(id=online)
-            if target:
-                if target is app.state.sessions.bot:
-                    # optimization for bot since it's
-                    # the most frequently requested user
-                    packet = app.packets.bot_stats(target)
-                else:
-                    packet = app.packets.user_stats(target)
+        for user_id in self.user_ids:
+            if user_id == player.id:
+                continue
 
-                player.enqueue(packet)
+            target = app.state.sessions.players.get(id=user_id)
+            if target is None or target not in unrestricted:
+                continue
+
+            if target is app.state.sessions.bot:
+                # optimization for bot since it's
+                # the most frequently requested user
+                packet = app.packets.bot_stats(target)
+            else:
+                packet = target.stats_packet
+
+            player.enqueue(packet)
 
 
 @register(ClientPackets.MATCH_INVITE)
@@ -2102,7 +2239,7 @@ class UserPresenceRequest(BasePacket):
                     # the most frequently requested user
                     packet = app.packets.bot_presence(target)
                 else:
-                    packet = app.packets.user_presence(target)
+                    packet = target.presence_packet
 
                 player.enqueue(packet)
 
@@ -2120,7 +2257,7 @@ class UserPresenceRequestAll(BasePacket):
         buffer = bytearray()
 
         for player in app.state.sessions.players.unrestricted:
-            buffer += app.packets.user_presence(player)
+            buffer += player.presence_packet
 
         player.enqueue(bytes(buffer))
 
@@ -1,6 +1,7 @@
 """ osu: handle connections from web, api, and beyond? """
 from __future__ import annotations
 
+import asyncio
 import copy
 import hashlib
 import random
@@ -10,16 +11,17 @@ from collections import defaultdict
 from collections.abc import Awaitable
 from collections.abc import Callable
 from collections.abc import Mapping
+from concurrent.futures.process import BrokenProcessPool
 from enum import IntEnum
 from enum import unique
 from functools import cache
+from functools import partial
 from pathlib import Path as SystemPath
 from typing import Any
 from typing import Literal
 from urllib.parse import unquote
 from urllib.parse import unquote_plus
 
-import bcrypt
 from fastapi import status
 from fastapi.datastructures import FormData
 from fastapi.datastructures import UploadFile
@@ -35,9 +37,8 @@ from fastapi.responses import FileResponse
 from fastapi.responses import ORJSONResponse
 from fastapi.responses import RedirectResponse
 from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
-from py3rijndael import Pkcs7Padding
-from py3rijndael import RijndaelCbc
 from starlette.datastructures import UploadFile as StarletteUploadFile
 
 import app.packets
@@ -55,25 +56,32 @@ from app.logging import log
 from app.logging import printc
 from app.objects import models
 from app.objects.beatmap import Beatmap
-from app.objects.beatmap import ensure_local_osu_file
 from app.objects.beatmap import RankedStatus
 from app.objects.player import Player
 from app.objects.score import Grade
 from app.objects.score import Score
 from app.objects.score import SubmissionStatus
+from app.objects.top_scores import TopScore
+from app.objects.top_scores import TopScores
 from app.repositories import maps as maps_repo
 from app.repositories import players as players_repo
 from app.repositories import scores as scores_repo
 from app.repositories import stats as stats_repo
-from app.repositories.achievements import Achievement
 from app.usecases import achievements as achievements_usecases
+from app.usecases import duplicate_scores
+from app.usecases import leaderboards
+from app.usecases import map_ranks
+from app.usecases import passwords as passwords_usecases
+from app.usecases import replays
+from app.usecases import score_decryption
+from app.usecases import score_pipeline
 from app.usecases import user_achievements as user_achievements_usecases
+from app.usecases import write_behind
+from app.usecases.osu_files import ensure_local_osu_file
 from app.utils import escape_enum
 from app.utils import pymysql_encode
 
 
-BEATMAPS_PATH = SystemPath.cwd() / ".data/osu"
-REPLAYS_PATH = SystemPath.cwd() / ".data/osr"
 SCREENSHOTS_PATH = SystemPath.cwd() / ".data/ss"
 
 
@@ -628,20 +636,75 @@ def decrypt_score_aes_data(
     # TODO: perhaps this should return TypedDict?
 
     # attempt to decrypt score data
-    aes = RijndaelCbc(
-        key=f"osu!-scoreburgr---------{osu_version}".encode(),
-        iv=b64decode(iv_b64),
-        padding=Pkcs7Padding(32),
-        block_size=32,
-    )
+    iv = b64decode(iv_b64)
 
-    score_data = aes.decrypt(b64decode(score_data_b64)).decode().split(":")
-    client_hash_decoded = aes.decrypt(b64decode(client_hash_b64)).decode()
+    score_data = (
+        score_decryption.decrypt(osu_version, iv, b64decode(score_data_b64))
+        .decode()
+        .split(":")
+    )
+    client_hash_decoded = score_decryption.decrypt(
+        osu_version,
+        iv,
+        b64decode(client_hash_b64),
+    ).decode()
 
     # score data is delimited by colons (:).
     return score_data, client_hash_decoded
 
 
+async def report_score_metrics(score: Score) -> None:
+    if app.state.services.datadog:
+        app.state.services.datadog.increment("bancho.submitted_scores")
+
+        if score.status == SubmissionStatus.BEST:
+            app.state.services.datadog.increment("bancho.submitted_scores_best")
+
+
+async def announce_first_place(score: Score, performance: str) -> None:
+    """Announce a new #1 on a beatmap's leaderboard in #announce."""
+    assert score.player is not None
+    assert score.bmap is not None
+
+    announce_chan = app.state.sessions.channels.get_by_name("#announce")
+    assert announce_chan is not None
+
+    ann = [
+        f"\x01ACTION achieved #1 on {score.bmap.embed}",
+        f"with {score.acc:.2f}% for {performance}.",
+    ]
+
+    if score.mods:
+        ann.insert(1, f"+{score.mods!r}")
+
+    # if the player didn't already hold #1, add the previous #1.
+    # NOTE: this may run after the new score has been saved, so we
+    # only look at the other players' personal bests on the map.
+    if not (score.prev_best and score.prev_best.rank == 1):
+        scoring_metric = "pp" if score.mode >= GameMode.RELAX_OSU else "score"
+
+        prev_n1 = await app.state.services.database.fetch_one(
+            "SELECT u.id, name FROM users u "
+            "INNER JOIN scores s ON u.id = s.userid "
+            "WHERE s.map_md5 = :map_md5 AND s.mode = :mode "
+            "AND s.status = 2 AND u.priv & 1 AND s.userid != :user_id "
+            f"ORDER BY s.{scoring_metric} DESC LIMIT 1",
+            {
+                "map_md5": score.bmap.md5,
+                "mode": score.mode,
+                "user_id": score.player.id,
+            },
+        )
+
+        if prev_n1:
+            ann.append(
+                f"(Previous #1: [https://{app.settings.DOMAIN}/u/"
+                "{id} {name}])".format(id=prev_n1["id"], name=prev_n1["name"]),
+            )
+
+    announce_chan.send(" ".join(ann), sender=score.player, to_self=True)
+
+
 @router.post("/web/osu-submit-modular-selector.php")
 async def osuSubmitModularSelector(
     request: Request,
@@ -784,15 +847,13 @@ async def osuSubmitModularSelector(
     if score.mode != score.player.status.mode:
         score.player.status.mods = score.mods
         score.player.status.mode = score.mode
+        score.player.invalidate_status_packets()
 
         if not score.player.restricted:
-            app.state.sessions.players.enqueue(app.packets.user_stats(score.player))
+            app.state.sessions.players.enqueue(score.player.stats_packet)
 
     # stop here if this is a duplicate score
-    if await app.state.services.database.fetch_one(
-        "SELECT 1 FROM scores WHERE online_checksum = :checksum",
-        {"checksum": score.client_checksum},
-    ):
+    if await duplicate_scores.is_duplicate(score.client_checksum):
         log(f"{score.player} submitted a duplicate score.", Ansi.LYELLOW)
         return Response(b"error: no")
 
@@ -801,9 +862,15 @@ async def osuSubmitModularSelector(
     score.acc = score.calculate_accuracy()
 
     if score.bmap:
-        osu_file_path = BEATMAPS_PATH / f"{score.bmap.id}.osu"
-        if await ensure_local_osu_file(osu_file_path, score.bmap.id, score.bmap.md5):
-            score.pp, score.sr = score.calculate_performance(osu_file_path)
+        osu_file_path = await ensure_local_osu_file(score.bmap.id, score.bmap.md5)
+        if osu_file_path is not None:
+            try:
+                score.pp, score.sr = await score.calculate_performance(osu_file_path)
+            except (asyncio.TimeoutError, BrokenProcessPool):
+                # nothing's been saved yet; have the client retry later,
+                # rather than saving the score without its performance.
+                log(f"Failed to calculate performance of {score}.", Ansi.LRED)
+                return Response(b"", status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
             if score.passed:
                 await score.calculate_status()
@@ -842,13 +909,7 @@ async def osuSubmitModularSelector(
 
     """ Score submission checks completed; submit the score. """
 
-    if app.state.services.datadog:
-        app.state.services.datadog.increment("bancho.submitted_scores")
-
     if score.status == SubmissionStatus.BEST:
-        if app.state.services.datadog:
-            app.state.services.datadog.increment("bancho.submitted_scores_best")
-
         if score.bmap.has_leaderboard:
             if score.bmap.status == RankedStatus.Loved and score.mode in (
                 GameMode.VANILLA_OSU,
@@ -866,41 +927,13 @@ async def osuSubmitModularSelector(
                 ),
             )
 
-            if score.rank == 1 and not score.player.restricted:
-                announce_chan = app.state.sessions.channels.get_by_name("#announce")
-
-                ann = [
-                    f"\x01ACTION achieved #1 on {score.bmap.embed}",
-                    f"with {score.acc:.2f}% for {performance}.",
-                ]
-
-                if score.mods:
-                    ann.insert(1, f"+{score.mods!r}")
-
-                scoring_metric = "pp" if score.mode >= GameMode.RELAX_OSU else "score"
-
-                # If there was previously a score on the map, add old #1.
-                prev_n1 = await app.state.services.database.fetch_one(
-                    "SELECT u.id, name FROM users u "
-                    "INNER JOIN scores s ON u.id = s.userid "
-                    "WHERE s.map_md5 = :map_md5 AND s.mode = :mode "
-                    "AND s.status = 2 AND u.priv & 1 "
-                    f"ORDER BY s.{scoring_metric} DESC LIMIT 1",
-                    {"map_md5": score.bmap.md5, "mode": score.mode},
-                )
-
-                if prev_n1:
-                    if score.player.id != prev_n1["id"]:
-                        ann.append(
-                            f"(Previous #1: [https://{app.settings.DOMAIN}/u/"
-                            "{id} {name}])".format(
-                                id=prev_n1["id"],
-                                name=prev_n1["name"],
-                            ),
-                        )
-
-                assert announce_chan is not None
-                announce_chan.send(" ".join(ann), sender=score.player, to_self=True)
+        if score.bmap.awards_ranked_pp:
+            # fetch the player's top scores before this score is
+            # saved, so that it can be added to them further below.
+            top_scores = await TopScores.from_cache_or_sql(
+                score.player.id,
+                score.mode,
+            )
 
         # this score is our best score.
         # update any preexisting personal best
@@ -950,14 +983,36 @@ async def osuSubmitModularSelector(
         },
     )
 
+    # any resubmissions of this score are duplicates
+    duplicate_scores.add(score.client_checksum)
+
+    if score.status == SubmissionStatus.BEST and not score.player.restricted:
+        leaderboards.add_score(score)
+        await map_ranks.add_score(score)
+
+    """ Score persisted; defer the work the client doesn't need to wait on. """
+
+    await score_pipeline.submit("metrics", partial(report_score_metrics, score))
+
+    if (
+        score.status == SubmissionStatus.BEST
+        and score.bmap.has_leaderboard
+        and score.rank == 1
+        and not score.player.restricted
+    ):
+        await score_pipeline.submit(
+            "announce_first_place",
+            partial(announce_first_place, score, performance),
+        )
+
     if score.passed:
         replay_data = await replay_file.read()
 
         MIN_REPLAY_SIZE = 24
 
         if len(replay_data) >= MIN_REPLAY_SIZE:
-            replay_disk_file = REPLAYS_PATH / f"{score.id}.osr"
-            replay_disk_file.write_bytes(replay_data)
+            assert score.id is not None
+            await replays.save(score.id, replay_data)
         else:
             log(f"{score.player} submitted a score without a replay!", Ansi.LRED)
 
@@ -977,22 +1032,30 @@ async def osuSubmitModularSelector(
     prev_stats = copy.copy(stats)
 
     # stuff update for all submitted scores
-    stats.playtime += score.time_elapsed // 1000
-    stats.plays += 1
-    stats.tscore += score.score
-    stats.total_hits += score.n300 + score.n100 + score.n50
+    total_hits = score.n300 + score.n100 + score.n50
 
     if score.mode.as_vanilla in (1, 3):
         # taiko uses geki & katu for hitting big notes with 2 keys
         # mania uses geki & katu for rainbow 300 & 200
-        stats.total_hits += score.ngeki + score.nkatu
+        total_hits += score.ngeki + score.nkatu
 
-    stats_updates: dict[str, Any] = {
-        "plays": stats.plays,
-        "playtime": stats.playtime,
-        "tscore": stats.tscore,
-        "total_hits": stats.total_hits,
-    }
+    stats.playtime += score.time_elapsed // 1000
+    stats.plays += 1
+    stats.tscore += score.score
+    stats.total_hits += total_hits
+
+    # these counters are only ever incremented, so
+    # they're batched rather than written per score.
+    write_behind.record_stats(
+        score.player.id,
+        score.mode.value,
+        plays=1,
+        playtime=score.time_elapsed // 1000,
+        tscore=score.score,
+        total_hits=total_hits,
+    )
+
+    stats_updates: dict[str, Any] = {}
 
     if score.passed and score.bmap.has_leaderboard:
         # player passed & map is ranked, approved, or loved.
@@ -1032,74 +1095,54 @@ async def osuSubmitModularSelector(
             stats.rscore += additional_rscore
             stats_updates["rscore"] = stats.rscore
 
-            # fetch scores sorted by pp for total acc/pp calc
-            # NOTE: we select all plays (and not just top100)
-            # because bonus pp counts the total amount of ranked
-            # scores. I'm aware this scales horribly, and it'll
-            # likely be split into two queries in the future.
-            best_scores = await app.state.services.database.fetch_all(
-                "SELECT s.pp, s.acc FROM scores s "
-                "INNER JOIN maps m ON s.map_md5 = m.md5 "
-                "WHERE s.userid = :user_id AND s.mode = :mode "
-                "AND s.status = 2 AND m.status IN (2, 3) "  # ranked, approved
-                "ORDER BY s.pp DESC",
-                {"user_id": score.player.id, "mode": score.mode},
+            # add the score to the player's top
+            # scores, and update their total pp & acc.
+            top_scores.add(
+                TopScore(score.pp, score.acc, score.bmap.md5),
+                replaces_best=score.prev_best is not None,
             )
+            if top_scores.stale:
+                top_scores = await TopScores.from_cache_or_sql(
+                    score.player.id,
+                    score.mode,
+                )
 
-            # calculate new total weighted accuracy
-            weighted_acc = sum(
-                row["acc"] * 0.95**i for i, row in enumerate(best_scores)
-            )
-            bonus_acc = 100.0 / (20 * (1 - 0.95 ** len(best_scores)))
-            stats.acc = (weighted_acc * bonus_acc) / 100
+            stats.acc = top_scores.acc
             stats_updates["acc"] = stats.acc
 
-            # calculate new total weighted pp
-            weighted_pp = sum(
-                row["pp"] * 0.95**i for i, row in enumerate(best_scores)
-            )
-            bonus_pp = 416.6667 * (1 - 0.9994 ** len(best_scores))
-            stats.pp = round(weighted_pp + bonus_pp)
+            stats.pp = top_scores.pp
             stats_updates["pp"] = stats.pp
 
             # update global & country ranking
             stats.rank = await score.player.update_rank(score.mode)
 
-    await stats_repo.update(
-        score.player.id,
-        score.mode.value,
-        plays=stats_updates.get("plays", UNSET),
-        playtime=stats_updates.get("playtime", UNSET),
-        tscore=stats_updates.get("tscore", UNSET),
-        total_hits=stats_updates.get("total_hits", UNSET),
-        max_combo=stats_updates.get("max_combo", UNSET),
-        xh_count=stats_updates.get("xh_count", UNSET),
-        x_count=stats_updates.get("x_count", UNSET),
-        sh_count=stats_updates.get("sh_count", UNSET),
-        s_count=stats_updates.get("s_count", UNSET),
-        a_count=stats_updates.get("a_count", UNSET),
-        rscore=stats_updates.get("rscore", UNSET),
-        acc=stats_updates.get("acc", UNSET),
-        pp=stats_updates.get("pp", UNSET),
-    )
+    score.player.invalidate_status_packets()
+
+    if stats_updates:
+        await stats_repo.update(
+            score.player.id,
+            score.mode.value,
+            max_combo=stats_updates.get("max_combo", UNSET),
+            xh_count=stats_updates.get("xh_count", UNSET),
+            x_count=stats_updates.get("x_count", UNSET),
+            sh_count=stats_updates.get("sh_count", UNSET),
+            s_count=stats_updates.get("s_count", UNSET),
+            a_count=stats_updates.get("a_count", UNSET),
+            rscore=stats_updates.get("rscore", UNSET),
+            acc=stats_updates.get("acc", UNSET),
+            pp=stats_updates.get("pp", UNSET),
+        )
 
     if not score.player.restricted:
         # enqueue new stats info to all other users
-        app.state.sessions.players.enqueue(app.packets.user_stats(score.player))
+        app.state.sessions.players.enqueue(score.player.stats_packet)
 
         # update beatmap with new stats
         score.bmap.plays += 1
         if score.passed:
             score.bmap.passes += 1
 
-        await app.state.services.database.execute(
-            "UPDATE maps SET plays = :plays, passes = :passes WHERE md5 = :map_md5",
-            {
-                "plays": score.bmap.plays,
-                "passes": score.bmap.passes,
-                "map_md5": score.bmap.md5,
-            },
-        )
+        write_behind.record_map_play(score.bmap.md5, score.passed)
 
     # update their recent score
     score.player.recent_scores[score.mode] = score
@@ -1117,30 +1160,23 @@ async def osuSubmitModularSelector(
     else:
         # construct and send achievements & ranking charts to the client
         if score.bmap.awards_ranked_pp and not score.player.restricted:
-            unlocked_achievements: list[Achievement] = []
-
-            server_achievements = await achievements_usecases.fetch_many()
-            player_achievements = await user_achievements_usecases.fetch_many(
-                score.player.id,
+            unlocked_achievements = await achievements_usecases.unlock_for_score(
+                score,
             )
-
-            for server_achievement in server_achievements:
-                player_unlocked_achievement = any(
-                    player_achievement
-                    for player_achievement in player_achievements
-                    if player_achievement["achid"] == server_achievement["id"]
-                )
-                if player_unlocked_achievement:
-                    # player already has this achievement.
-                    continue
-
-                achievement_condition = server_achievement["cond"]
-                if achievement_condition(score, score.mode.as_vanilla):
-                    await user_achievements_usecases.create(
+            for achievement in unlocked_achievements:
+                await score_pipeline.submit(
+                    "unlock_achievement",
+                    partial(
+                        user_achievements_usecases.create,
+                        score.player.id,
+                        achievement["id"],
+                    ),
+                    on_failure=partial(
+                        achievements_usecases.forget_unlocked,
                         score.player.id,
-                        server_achievement["id"],
-                    )
-                    unlocked_achievements.append(server_achievement)
+                        achievement["id"],
+                    ),
+                )
 
             achievements_str = "/".join(
                 format_achievement_string(a["file"], a["name"], a["desc"])
@@ -1228,15 +1264,18 @@ async def getReplay(
     if not score:
         return Response(b"", status_code=404)
 
-    file = REPLAYS_PATH / f"{score_id}.osr"
-    if not file.exists():
+    replay_size = await replays.get_size(score_id)
+    if replay_size is None:
         return Response(b"", status_code=404)
 
     # increment replay views for this score
     if score.player is not None and player.id != score.player.id:
         app.state.loop.create_task(score.increment_replay_views())
 
-    return FileResponse(file)
+    return StreamingResponse(
+        replays.stream(score_id),
+        headers={"Content-Length": str(replay_size)},
+    )
 
 
 @router.get("/web/osu-rate.php")
@@ -1368,18 +1407,10 @@ async def get_leaderboard_scores(
             personal_best_score_row = dict(personal_best_score_rec._mapping)
 
             # calculate the rank of the score.
-            p_best_rank = 1 + await app.state.services.database.fetch_val(
-                "SELECT COUNT(*) FROM scores s "
-                "INNER JOIN users u ON u.id = s.userid "
-                "WHERE s.map_md5 = :map_md5 AND s.mode = :mode "
-                "AND s.status = 2 AND u.priv & 1 "
-                f"AND s.{scoring_metric} > :score",
-                {
-                    "map_md5": map_md5,
-                    "mode": mode,
-                    "score": personal_best_score_row["_score"],
-                },
-                column=0,  # COUNT(*)
+            p_best_rank = await map_ranks.get_placement(
+                map_md5,
+                mode,
+                personal_best_score_row["_score"],
             )
 
             # attach rank to personal best row
@@ -1444,9 +1475,10 @@ async def getScores(
     if mode != player.status.mode:
         player.status.mods = mods
         player.status.mode = mode
+        player.invalidate_status_packets()
 
         if not player.restricted:
-            app.state.sessions.players.enqueue(app.packets.user_stats(player))
+            app.state.sessions.players.enqueue(player.stats_packet)
 
     scoring_metric: Literal["pp", "score"] = (
         "pp" if mode >= GameMode.RELAX_OSU else "score"
@@ -1507,8 +1539,20 @@ async def getScores(
         return Response(f"{int(bmap.status)}|false".encode())
 
     # fetch scores & personal best
-    # TODO: create a leaderboard cache
-    if not requesting_from_editor_song_select:
+    score_rows: list[dict[str, Any]]
+    personal_best_score_row: dict[str, Any] | None
+
+    if requesting_from_editor_song_select:
+        score_rows = []
+        personal_best_score_row = None
+    elif leaderboard_type == LeaderboardType.Top and not player.restricted:
+        score_rows, personal_best_score_row = await leaderboards.get_leaderboard_scores(
+            bmap.md5,
+            mode,
+            player.id,
+            scoring_metric,
+        )
+    else:
         score_rows, personal_best_score_row = await get_leaderboard_scores(
             leaderboard_type,
             bmap.md5,
@@ -1517,9 +1561,6 @@ async def getScores(
             player,
             scoring_metric,
         )
-    else:
-        score_rows = []
-        personal_best_score_row = None
 
     # fetch beatmap rating
     rating = await bmap.fetch_rating()
@@ -1902,8 +1943,7 @@ async def register_account(
         # they want to register the account now.
         # make the md5 & bcrypt the md5 for sql.
         pw_md5 = hashlib.md5(pw_plaintext.encode()).hexdigest().encode()
-        pw_bcrypt = bcrypt.hashpw(pw_md5, bcrypt.gensalt())
-        app.state.cache.bcrypt[pw_bcrypt] = pw_md5  # cache result for login
+        pw_bcrypt = await passwords_usecases.hash_password(pw_md5)
 
         ip = app.state.services.ip_resolver.get_ip(request.headers)
 
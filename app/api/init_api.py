@@ -21,6 +21,13 @@ from starlette.requests import ClientDisconnect
 import app.bg_loops
 import app.settings
 import app.state
+import app.usecases.achievements
+import app.usecases.client_versions
+import app.usecases.duplicate_scores
+import app.usecases.performance
+import app.usecases.score_pipeline
+import app.usecases.session_snapshots
+import app.usecases.write_behind
 import app.utils
 from app.api import api_router  # type: ignore[attr-defined]
 from app.api import domains
@@ -139,8 +146,19 @@ def init_events(asgi_app: BanchoAPI) -> None:
 
         async with app.state.services.database.connection() as db_conn:
             await collections.initialize_ram_caches(db_conn)
+            await app.usecases.session_snapshots.restore(db_conn)
+
+        await app.usecases.achievements.load()
+
+        if app.settings.DISALLOW_OLD_CLIENTS:
+            app.usecases.client_versions.load_seed()
+
+        await app.usecases.performance.start()
 
         await app.bg_loops.initialize_housekeeping_tasks()
+        app.usecases.score_pipeline.start()
+        app.usecases.duplicate_scores.start()
+        await app.usecases.write_behind.start()
 
         log("Startup process complete.", Ansi.LGREEN)
         log(
@@ -154,6 +172,19 @@ def init_events(asgi_app: BanchoAPI) -> None:
         # and shut down any of the housekeeping tasks running in the background.
         await app.state.sessions.cancel_housekeeping_tasks()
 
+        # finish any deferred score submission work.
+        await app.usecases.score_pipeline.stop()
+        await app.usecases.duplicate_scores.stop()
+
+        # write any counters which haven't been flushed yet.
+        await app.usecases.write_behind.stop()
+
+        # save the online players' sessions, so that they
+        # don't need to log in again once we're back up.
+        await app.usecases.session_snapshots.save()
+
+        await app.usecases.performance.stop()
+
         # shutdown services
 
         await app.state.services.http_client.aclose()
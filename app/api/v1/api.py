@@ -1,8 +1,11 @@
 """ api: bancho.py's developer api for interacting with server state """
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import struct
+from collections.abc import AsyncIterator
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path as SystemPath
 from typing import Literal
 
@@ -12,6 +15,7 @@ from fastapi import status
 from fastapi.param_functions import Query
 from fastapi.responses import ORJSONResponse
 from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials as HTTPCredentials
 from fastapi.security import HTTPBearer
 
@@ -22,17 +26,17 @@ from app.constants import regexes
 from app.constants.gamemodes import GameMode
 from app.constants.mods import Mods
 from app.objects.beatmap import Beatmap
-from app.objects.beatmap import ensure_local_osu_file
 from app.objects.clan import Clan
 from app.objects.player import Player
 from app.repositories import players as players_repo
 from app.repositories import scores as scores_repo
 from app.repositories import stats as stats_repo
+from app.usecases import rankings
+from app.usecases import replays
+from app.usecases.osu_files import ensure_local_osu_file
 from app.usecases.performance import ScoreParams
 
 AVATARS_PATH = SystemPath.cwd() / ".data/avatars"
-BEATMAPS_PATH = SystemPath.cwd() / ".data/osu"
-REPLAYS_PATH = SystemPath.cwd() / ".data/osr"
 SCREENSHOTS_PATH = SystemPath.cwd() / ".data/ss"
 
 
@@ -143,11 +147,8 @@ async def api_calculate_pp(
             {"status": "Beatmap not found."},
             status_code=status.HTTP_400_BAD_REQUEST,
         )
-    if not await ensure_local_osu_file(
-        BEATMAPS_PATH / f"{beatmap.id}.osu",
-        beatmap.id,
-        beatmap.md5,
-    ):
+    osu_file_path = await ensure_local_osu_file(beatmap.id, beatmap.md5)
+    if osu_file_path is None:
         return ORJSONResponse(
             {"status": "Beatmap file could not be fetched."},
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -174,10 +175,22 @@ async def api_calculate_pp(
             ),
         )
 
-    results = app.usecases.performance.calculate_performances(
-        str(BEATMAPS_PATH / f"{beatmap.id}.osu"),
-        scores,
-    )
+    try:
+        results = await app.usecases.performance.calculate_performances(
+            str(osu_file_path),
+            scores,
+            beatmap.md5,
+        )
+    except asyncio.TimeoutError:
+        return ORJSONResponse(
+            {"status": "Performance calculation timed out."},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    except BrokenProcessPool:
+        return ORJSONResponse(
+            {"status": "Performance calculation failed."},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
     # "Inject" the accuracy into the list of results
     final_results = [
@@ -740,20 +753,20 @@ async def api_get_replay(
     include_headers: bool = True,
 ) -> Response:
     """Return a given replay (including headers)."""
-    # fetch replay file & make sure it exists
-    replay_file = REPLAYS_PATH / f"{score_id}.osr"
-    if not replay_file.exists():
+    # make sure the replay file exists
+    replay_size = await replays.get_size(score_id)
+    if replay_size is None:
         return ORJSONResponse(
             {"status": "Replay not found."},
             status_code=status.HTTP_404_NOT_FOUND,
         )
-    # read replay frames from file
-    raw_replay_data = replay_file.read_bytes()
     if not include_headers:
-        return Response(
-            bytes(raw_replay_data),
+        # stream the replay frames from the file
+        return StreamingResponse(
+            replays.stream(score_id),
             media_type="application/octet-stream",
             headers={
+                "Content-Length": str(replay_size),
                 "Content-Description": "File Transfer",
                 # TODO: should we do the query to fetch
                 # info for content-disposition for this..?
@@ -824,18 +837,25 @@ async def api_get_replay(
     replay_data += b"\x00"  # TODO: hp graph
     timestamp = int(row["play_time"].timestamp() * 1e7)
     replay_data += struct.pack("<q", timestamp + DATETIME_OFFSET)
-    # pack the raw replay data into the buffer
-    replay_data += struct.pack("<i", len(raw_replay_data))
-    replay_data += raw_replay_data
+    # pack the length of the raw replay data into the buffer
+    replay_data += struct.pack("<i", replay_size)
     # pack additional info buffer.
-    replay_data += struct.pack("<q", score_id)
+    replay_footer = struct.pack("<q", score_id)
     # NOTE: target practice sends extra mods, but
     # can't submit scores so should not be a problem.
+
+    async def stream_replay() -> AsyncIterator[bytes]:
+        yield bytes(replay_data)
+        async for chunk in replays.stream(score_id):
+            yield chunk
+        yield replay_footer
+
     # stream data back to the client
-    return Response(
-        bytes(replay_data),
+    return StreamingResponse(
+        stream_replay(),
         media_type="application/octet-stream",
         headers={
+            "Content-Length": str(len(replay_data) + replay_size + len(replay_footer)),
             "Content-Description": "File Transfer",
             "Content-Disposition": (
                 'attachment; filename="{username} - '
@@ -917,6 +937,11 @@ async def api_get_global_leaderboard(
 
     mode = GameMode(mode_arg)
 
+    if sort == "pp":
+        # served from the sorted sets of players' pp
+        leaderboard = await rankings.fetch_page(mode, offset, limit, country)
+        return ORJSONResponse({"status": "success", "leaderboard": leaderboard})
+
     query_conditions = ["s.mode = :mode", "u.priv & 1", f"s.{sort} > 0"]
     query_parameters: dict[str, object] = {"mode": mode}
 
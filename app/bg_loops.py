@@ -9,6 +9,7 @@ import app.state
 from app.constants.privileges import Privileges
 from app.logging import Ansi
 from app.logging import log
+from app.objects.player import Player
 
 __all__ = ("initialize_housekeeping_tasks",)
 
@@ -28,6 +29,7 @@ async def initialize_housekeeping_tasks() -> None:
                 _remove_expired_donation_privileges(interval=30 * 60),
                 _update_bot_status(interval=5 * 60),
                 _disconnect_ghosts(interval=OSU_CLIENT_MIN_PING_INTERVAL // 3),
+                _report_packet_cache_stats(interval=60),
             )
         },
     )
@@ -89,3 +91,25 @@ async def _update_bot_status(interval: int) -> None:
     while True:
         await asyncio.sleep(interval)
         app.packets.bot_stats.cache_clear()
+
+
+async def _report_packet_cache_stats(interval: int) -> None:
+    """Report the player packet cache's hits & misses, every `interval`."""
+    last_hits = last_misses = 0
+
+    while True:
+        await asyncio.sleep(interval)
+
+        hits, misses = Player.packet_cache_hits, Player.packet_cache_misses
+
+        if app.state.services.datadog:
+            app.state.services.datadog.increment(
+                "bancho.packet_cache.hits",
+                hits - last_hits,
+            )
+            app.state.services.datadog.increment(
+                "bancho.packet_cache.misses",
+                misses - last_misses,
+            )
+
+        last_hits, last_misses = hits, misses
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import importlib.metadata
 import os
 import pprint
@@ -13,10 +14,10 @@ from collections.abc import Awaitable
 from collections.abc import Callable
 from collections.abc import Mapping
 from collections.abc import Sequence
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from datetime import datetime
 from functools import wraps
-from pathlib import Path
 from time import perf_counter_ns as clock_ns
 from typing import Any
 from typing import NamedTuple
@@ -35,6 +36,9 @@ import app.logging
 import app.packets
 import app.settings
 import app.state
+import app.usecases.achievements
+import app.usecases.leaderboards
+import app.usecases.map_ranks
 import app.usecases.performance
 import app.utils
 from app.constants import regexes
@@ -44,7 +48,6 @@ from app.constants.mods import SPEED_CHANGING_MODS
 from app.constants.privileges import ClanPrivileges
 from app.constants.privileges import Privileges
 from app.objects.beatmap import Beatmap
-from app.objects.beatmap import ensure_local_osu_file
 from app.objects.beatmap import RankedStatus
 from app.objects.clan import Clan
 from app.objects.match import MapPool
@@ -58,6 +61,7 @@ from app.objects.score import SubmissionStatus
 from app.repositories import clans as clans_repo
 from app.repositories import maps as maps_repo
 from app.repositories import players as players_repo
+from app.usecases.osu_files import ensure_local_osu_file
 from app.usecases.performance import ScoreParams
 from app.utils import seconds_readable
 
@@ -65,9 +69,6 @@ if TYPE_CHECKING:
     from app.objects.channel import Channel
 
 
-BEATMAPS_PATH = Path.cwd() / ".data/osu"
-
-
 @dataclass
 class Context:
     player: Player
@@ -483,8 +484,8 @@ async def _with(ctx: Context) -> str | None:
 
     bmap: Beatmap = ctx.player.last_np["bmap"]
 
-    osu_file_path = BEATMAPS_PATH / f"{bmap.id}.osu"
-    if not await ensure_local_osu_file(osu_file_path, bmap.id, bmap.md5):
+    osu_file_path = await ensure_local_osu_file(bmap.id, bmap.md5)
+    if osu_file_path is None:
         return "Mapfile could not be found; this incident has been reported."
 
     mode_vn = ctx.player.last_np["mode_vn"]
@@ -517,10 +518,16 @@ async def _with(ctx: Context) -> str | None:
         score_args.acc = acc
         msg_fields.append(f"{acc:.2f}%")
 
-    result = app.usecases.performance.calculate_performances(
-        osu_file_path=str(osu_file_path),
-        scores=[score_args],  # calculate one score
-    )
+    try:
+        result = await app.usecases.performance.calculate_performances(
+            osu_file_path=str(osu_file_path),
+            scores=[score_args],  # calculate one score
+            map_md5=bmap.md5,
+        )
+    except asyncio.TimeoutError:
+        return "Performance calculation timed out."
+    except BrokenProcessPool:
+        return "Performance calculation failed."
 
     return "{msg}: {pp:.2f}pp ({stars:.2f}*)".format(
         msg=" ".join(msg_fields),
@@ -681,6 +688,9 @@ async def _map(ctx: Context) -> str | None:
             {"map_ids": map_ids},
         )
 
+    # the map(s) may now (or no longer) award pp to any player's top scores
+    app.state.cache.top_scores.clear()
+
     return f"{bmap.embed} updated to {new_status!s}."
 
 
@@ -1175,10 +1185,20 @@ async def wipemap(ctx: Context) -> str | None:
         "DELETE FROM scores WHERE map_md5 = :map_md5",
         {"map_md5": map_md5},
     )
+    app.state.cache.top_scores.clear()
+    app.usecases.leaderboards.invalidate_map(map_md5)
+    await app.usecases.map_ranks.invalidate_maps([map_md5])
 
     return "Scores wiped."
 
 
+@command(Privileges.DEVELOPER, hidden=True)
+async def reloadachievements(ctx: Context) -> str | None:
+    """Reload the server's achievements from sql."""
+    await app.usecases.achievements.load()
+    return "Reloaded achievements."
+
+
 @command(Privileges.DEVELOPER, aliases=["re"])
 async def reload(ctx: Context) -> str | None:
     """Reload a python module."""
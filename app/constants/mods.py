@@ -297,6 +297,19 @@ SCORE_INCREASE_MODS = (
 
 SPEED_CHANGING_MODS = Mods.DOUBLETIME | Mods.NIGHTCORE | Mods.HALFTIME
 
+# mods which may affect a beatmap's difficulty attributes (e.g. star rating)
+DIFFICULTY_CHANGING_MODS = (
+    Mods.EASY
+    | Mods.TOUCHSCREEN
+    | Mods.HIDDEN
+    | Mods.HARDROCK
+    | Mods.RELAX
+    | Mods.FLASHLIGHT
+    | Mods.AUTOPILOT
+    | SPEED_CHANGING_MODS
+    | KEY_MODS
+)
+
 OSU_SPECIFIC_MODS = Mods.AUTOPILOT | Mods.SPUNOUT | Mods.TARGET
 # taiko & catch have no specific mods
 MANIA_SPECIFIC_MODS = Mods.MIRROR | Mods.RANDOM | Mods.FADEIN | KEY_MODS
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import functools
-import hashlib
 from collections import defaultdict
 from collections.abc import Mapping
 from datetime import datetime
@@ -24,14 +23,14 @@ from app.constants.gamemodes import GameMode
 from app.logging import Ansi
 from app.logging import log
 from app.repositories import maps as maps_repo
+from app.usecases import leaderboards
+from app.usecases import map_ranks
 from app.utils import escape_enum
 from app.utils import pymysql_encode
 
 # from dataclasses import dataclass
 
-__all__ = ("ensure_local_osu_file", "RankedStatus", "Beatmap", "BeatmapSet")
-
-BEATMAPS_PATH = Path.cwd() / ".data/osu"
+__all__ = ("RankedStatus", "Beatmap", "BeatmapSet")
 
 DEFAULT_LAST_UPDATE = datetime(1970, 1, 1)
 
@@ -69,35 +68,6 @@ async def api_get_beatmaps(**params: Any) -> BeatmapApiResponse:
     return {"data": None, "status_code": response.status_code}
 
 
-async def ensure_local_osu_file(
-    osu_file_path: Path,
-    bmap_id: int,
-    bmap_md5: str,
-) -> bool:
-    """Ensure we have the latest .osu file locally,
-    downloading it from the osu!api if required."""
-    if (
-        not osu_file_path.exists()
-        or hashlib.md5(osu_file_path.read_bytes()).hexdigest() != bmap_md5
-    ):
-        # need to get the file from the osu!api
-        if app.settings.DEBUG:
-            log(f"Doing osu!api (.osu file) request {bmap_id}", Ansi.LMAGENTA)
-
-        url = f"https://old.ppy.sh/osu/{bmap_id}"
-        response = await app.state.services.http_client.get(url)
-        if response.status_code != 200:
-            if 400 <= response.status_code < 500:
-                # client error, report this to cmyui
-                stacktrace = app.utils.get_appropriate_stacktrace()
-                await app.state.services.log_strange_occurrence(stacktrace)
-            return False
-
-        osu_file_path.write_bytes(response.read())
-
-    return True
-
-
 # for some ungodly reason, different values are used to
 # represent different ranked statuses all throughout osu!
 # This drives me and probably everyone else pretty insane,
@@ -714,6 +684,10 @@ class BeatmapSet:
                     "DELETE FROM scores WHERE map_md5 IN :map_md5s",
                     {"map_md5s": map_md5s_to_delete},
                 )
+                app.state.cache.top_scores.clear()
+                for map_md5 in map_md5s_to_delete:
+                    leaderboards.invalidate_map(map_md5)
+                await map_ranks.invalidate_maps(map_md5s_to_delete)
 
             # update last_osuapi_check
             await app.state.services.database.execute(
@@ -750,6 +724,10 @@ class BeatmapSet:
                 "DELETE FROM scores WHERE map_md5 IN :map_md5s",
                 {"map_md5s": map_md5s_to_delete},
             )
+            app.state.cache.top_scores.clear()
+            for map_md5 in map_md5s_to_delete:
+                leaderboards.invalidate_map(map_md5)
+            await map_ranks.invalidate_maps(map_md5s_to_delete)
 
             # delete set
             await app.state.services.database.execute(
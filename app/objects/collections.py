@@ -11,6 +11,7 @@ import databases.core
 
 import app.settings
 import app.state
+import app.usecases.passwords
 import app.utils
 from app.constants.privileges import ClanPrivileges
 from app.constants.privileges import Privileges
@@ -143,6 +144,22 @@ class Players(list[Player]):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
 
+        # indexes for fast lookups; these are updated on append/remove,
+        # and the privilege sets when a player's privileges change.
+        self._tokens: dict[Player, str] = {}
+        self._by_token: dict[str, Player] = {}
+        # tourney clients may share an id & name with
+        # another session; the first one to log in wins.
+        self._by_id: dict[int, list[Player]] = {}
+        self._by_name: dict[str, list[Player]] = {}
+
+        self._staff: set[Player] = set()
+        self._restricted: set[Player] = set()
+        self._unrestricted: set[Player] = set()
+
+        for player in self:
+            self._index(player)
+
     def __iter__(self) -> Iterator[Player]:
         return super().__iter__()
 
@@ -150,9 +167,10 @@ class Players(list[Player]):
         # allow us to either pass in the player
         # obj, or the player name as a string.
         if isinstance(player, str):
-            return player in (player.name for player in self)
+            p = self.get(name=player)
+            return p is not None and p.name == player
         else:
-            return super().__contains__(player)
+            return player in self._tokens
 
     def __repr__(self) -> str:
         return f'[{", ".join(map(repr, self))}]'
@@ -160,22 +178,22 @@ class Players(list[Player]):
     @property
     def ids(self) -> set[int]:
         """Return a set of the current ids in the list."""
-        return {p.id for p in self}
+        return set(self._by_id)
 
     @property
     def staff(self) -> set[Player]:
         """Return a set of the current staff online."""
-        return {p for p in self if p.priv & Privileges.STAFF}
+        return set(self._staff)
 
     @property
     def restricted(self) -> set[Player]:
         """Return a set of the current restricted players."""
-        return {p for p in self if not p.priv & Privileges.UNRESTRICTED}
+        return set(self._restricted)
 
     @property
     def unrestricted(self) -> set[Player]:
         """Return a set of the current unrestricted players."""
-        return {p for p in self if p.priv & Privileges.UNRESTRICTED}
+        return set(self._unrestricted)
 
     def enqueue(self, data: bytes, immune: Sequence[Player] = []) -> None:
         """Enqueue `data` to all players, except for those in `immune`."""
@@ -190,18 +208,23 @@ class Players(list[Player]):
         name: str | None = None,
     ) -> Player | None:
         """Get a player by token, id, or name from cache."""
-        for player in self:
-            if token is not None:
-                if player.token == token:
-                    return player
-            elif id is not None:
-                if player.id == id:
-                    return player
-            elif name is not None:
-                if player.safe_name == make_safe_name(name):
-                    return player
+        if token is not None:
+            return self._by_token.get(token)
 
-        return None
+        sessions: list[Player] | None = None
+        if id is not None:
+            sessions = self._by_id.get(id)
+        elif name is not None:
+            sessions = self._by_name.get(make_safe_name(name))
+
+        return sessions[0] if sessions else None
+
+    def update_privs(self, player: Player) -> None:
+        """Update the privilege sets after a change to `player.priv`."""
+        if player not in self._tokens:
+            return
+
+        self._index_privs(player)
 
     async def get_sql(
         self,
@@ -277,7 +300,10 @@ class Players(list[Player]):
 
         assert player.pw_bcrypt is not None
 
-        if app.state.cache.bcrypt[player.pw_bcrypt] == pw_md5.encode():
+        if await app.usecases.passwords.verify_password(
+            pw_md5.encode(),
+            player.pw_bcrypt,
+        ):
             return player
 
         return None
@@ -290,6 +316,7 @@ class Players(list[Player]):
             return
 
         super().append(player)
+        self._index(player)
 
     def remove(self, player: Player) -> None:
         """Remove `p` from the list."""
@@ -299,6 +326,47 @@ class Players(list[Player]):
             return
 
         super().remove(player)
+        self._unindex(player)
+
+    def _index(self, player: Player) -> None:
+        # NOTE: the player's token may be invalidated
+        # before removal, so we keep track of it here.
+        self._tokens[player] = player.token
+        self._by_token[player.token] = player
+
+        self._by_id.setdefault(player.id, []).append(player)
+        self._by_name.setdefault(player.safe_name, []).append(player)
+
+        self._index_privs(player)
+
+    def _index_privs(self, player: Player) -> None:
+        if player.priv & Privileges.STAFF:
+            self._staff.add(player)
+        else:
+            self._staff.discard(player)
+
+        if player.priv & Privileges.UNRESTRICTED:
+            self._unrestricted.add(player)
+            self._restricted.discard(player)
+        else:
+            self._restricted.add(player)
+            self._unrestricted.discard(player)
+
+    def _unindex(self, player: Player) -> None:
+        del self._by_token[self._tokens.pop(player)]
+
+        # any other sessions with the same id & name take over
+        self._by_id[player.id].remove(player)
+        if not self._by_id[player.id]:
+            del self._by_id[player.id]
+
+        self._by_name[player.safe_name].remove(player)
+        if not self._by_name[player.safe_name]:
+            del self._by_name[player.safe_name]
+
+        self._staff.discard(player)
+        self._restricted.discard(player)
+        self._unrestricted.discard(player)
 
 
 class MapPools(list[MapPool]):
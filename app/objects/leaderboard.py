@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import bisect
+from typing import Any
+from typing import Literal
+
+import databases.core
+
+__all__ = ("LEADERBOARD_SIZE", "Leaderboard")
+
+# the number of scores shown on an in-game leaderboard
+LEADERBOARD_SIZE = 50
+
+ScoringMetric = Literal["pp", "score"]
+
+# the columns of a leaderboard score row, as sent to the client;
+# `_score` is the scoring metric the leaderboard is ranked by.
+SCORE_COLUMNS = (
+    "s.id, s.{scoring_metric} AS _score, "
+    "s.max_combo, s.n50, s.n100, s.n300, "
+    "s.nmiss, s.nkatu, s.ngeki, s.perfect, s.mods, "
+    "UNIX_TIMESTAMP(s.play_time) time, s.userid"
+)
+
+
+class Leaderboard:
+    """\
+    The global leaderboard of a beatmap in a single mode, ranked by a
+    scoring metric (pp or score), including only unrestricted players.
+
+    Only the rows of the top scores are kept; the ranks of scores
+    are found with `app.usecases.map_ranks`.
+    """
+
+    def __init__(self, scores: list[dict[str, Any]]) -> None:
+        # whether the top scores are all of the scores on the map
+        self.complete = len(scores) < LEADERBOARD_SIZE
+
+        # NOTE: sorted by _score, descending
+        self.scores = scores[:LEADERBOARD_SIZE]
+
+        # {user_id: best score row, ...} of players who've requested
+        # the leaderboard; None if they have no score on the map.
+        self.personal_bests: dict[int, dict[str, Any] | None] = {}
+
+        # whether we no longer know the top scores; the
+        # structure should be rebuilt from sql before it's reused.
+        self.stale = False
+
+    def __repr__(self) -> str:
+        return f"<Leaderboard count={len(self.scores)}>"
+
+    @property
+    def size(self) -> int:
+        """The number of score rows held in memory."""
+        return len(self.scores) + len(self.personal_bests)
+
+    def get_personal_best(self, user_id: int) -> dict[str, Any] | None:
+        """Get a player's best score row, if it's in the top scores."""
+        for row in self.scores:
+            if row["userid"] == user_id:
+                return row
+
+        return None
+
+    def add(self, row: dict[str, Any]) -> None:
+        """Add a player's new best score, replacing any previous best."""
+        user_id = row["userid"]
+
+        for i, top_row in enumerate(self.scores):
+            if top_row["userid"] == user_id:
+                del self.scores[i]
+                break
+
+        # NOTE: placed after any scores with an equal value
+        idx = bisect.bisect(self.scores, -row["_score"], key=lambda r: -r["_score"])
+
+        if idx == len(self.scores) < LEADERBOARD_SIZE and not self.complete:
+            # the player's previous best was in the top scores, &
+            # we don't have the scores beneath this one in memory,
+            # so we can't be sure this belongs in the top scores.
+            self.stale = True
+        elif idx < LEADERBOARD_SIZE:
+            self.scores.insert(idx, row)
+            if len(self.scores) > LEADERBOARD_SIZE:
+                del self.scores[LEADERBOARD_SIZE:]
+                self.complete = False
+
+        self.personal_bests[user_id] = row
+
+    @classmethod
+    async def from_sql(
+        cls,
+        map_md5: str,
+        mode: int,
+        scoring_metric: ScoringMetric,
+        db_conn: databases.core.Connection,
+    ) -> Leaderboard:
+        """Fetch a beatmap's leaderboard in a given mode from sql."""
+        rows = await db_conn.fetch_all(
+            f"SELECT {SCORE_COLUMNS.format(scoring_metric=scoring_metric)}, "
+            "COALESCE(CONCAT('[', c.tag, '] ', u.name), u.name) AS name "
+            "FROM scores s "
+            "INNER JOIN users u ON u.id = s.userid "
+            "LEFT JOIN clans c ON c.id = u.clan_id "
+            "WHERE s.map_md5 = :map_md5 AND s.mode = :mode "
+            "AND s.status = 2 AND u.priv & 1 "
+            f"ORDER BY _score DESC LIMIT {LEADERBOARD_SIZE}",
+            {"map_md5": map_md5, "mode": mode},
+        )
+
+        return cls([dict(r._mapping) for r in rows])
+
+    async def fetch_personal_best(
+        self,
+        map_md5: str,
+        mode: int,
+        scoring_metric: ScoringMetric,
+        user_id: int,
+        db_conn: databases.core.Connection,
+    ) -> dict[str, Any] | None:
+        """Fetch a player's best score row from the leaderboard, or sql."""
+        if user_id in self.personal_bests:
+            return self.personal_bests[user_id]
+
+        row = self.get_personal_best(user_id)
+        if row is None and not self.complete:
+            rec = await db_conn.fetch_one(
+                f"SELECT {SCORE_COLUMNS.format(scoring_metric=scoring_metric)} "
+                "FROM scores s "
+                "WHERE s.map_md5 = :map_md5 AND s.mode = :mode "
+                "AND s.userid = :user_id AND s.status = 2 "
+                "ORDER BY _score DESC LIMIT 1",
+                {"map_md5": map_md5, "mode": mode, "user_id": user_id},
+            )
+            row = dict(rec._mapping) if rec is not None else None
+
+        self.personal_bests[user_id] = row
+        return row
@@ -3,6 +3,9 @@ from __future__ import annotations
 import asyncio
 import time
 import uuid
+from collections.abc import Iterable
+from collections.abc import Mapping
+from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import date
 from enum import Enum
@@ -35,6 +38,9 @@ from app.objects.match import Slot
 from app.objects.match import SlotStatus
 from app.objects.score import Grade
 from app.repositories import stats as stats_repo
+from app.usecases import leaderboards
+from app.usecases import map_ranks
+from app.usecases import write_behind
 from app.utils import escape_enum
 from app.utils import make_safe_name
 from app.utils import pymysql_encode
@@ -204,8 +210,19 @@ class Player:
         at the tail end of their next connection to the server.
         XXX: cls.enqueue() will add data to this queue, and
              cls.dequeue() will return the data, and remove it.
+
+    _presence_packet & _stats_packet: `bytes | None`
+        The player's encoded presence & stats packets, built on demand
+        and cached until the data they're built from changes.
+        XXX: changes to `priv` and `geoloc` invalidate these automatically,
+             while in-place changes to `status` or `stats` must be followed
+             by a call to cls.invalidate_status_packets().
     """
 
+    # hit & miss counters for the cached presence & stats packets.
+    packet_cache_hits = 0
+    packet_cache_misses = 0
+
     def __init__(
         self,
         id: int,
@@ -217,6 +234,10 @@ class Player:
         self.name = name
         self.safe_name = self.make_safe(self.name)
 
+        # cached packets; built on demand
+        self._presence_packet: bytes | None = None
+        self._stats_packet: bytes | None = None
+
         if "pw_bcrypt" in extras:
             self.pw_bcrypt: bytes | None = extras["pw_bcrypt"]
         else:
@@ -233,7 +254,7 @@ class Player:
         self.priv = priv if isinstance(priv, Privileges) else Privileges(priv)
 
         self.stats: dict[GameMode, ModeData] = {}
-        self.status = Status()
+        self.status: Status = Status()
 
         # userids, not player objects
         self.friends: set[int] = set()
@@ -248,7 +269,7 @@ class Player:
         self.clan: Clan | None = extras.get("clan")
         self.clan_priv: ClanPrivileges | None = extras.get("clan_priv")
 
-        self.geoloc: app.state.services.Geolocation = extras.get(
+        self.geoloc = extras.get(
             "geoloc",
             {
                 "latitude": 0.0,
@@ -257,7 +278,7 @@ class Player:
             },
         )
 
-        self.utc_offset = extras.get("utc_offset", 0)
+        self.utc_offset: int = extras.get("utc_offset", 0)
         self.pm_private = extras.get("pm_private", False)
         self.away_msg: str | None = None
         self.silence_end = extras.get("silence_end", 0)
@@ -337,6 +358,62 @@ class Player:
         """Whether or not the player is silenced."""
         return self.remaining_silence != 0
 
+    @property
+    def priv(self) -> Privileges:
+        """The player's privileges on the server."""
+        return self._priv
+
+    @priv.setter
+    def priv(self, value: Privileges) -> None:
+        self._priv = value
+
+        if "bancho_priv" in self.__dict__:
+            del self.bancho_priv  # wipe cached_property
+
+        self._presence_packet = None
+
+        # keep the online player list's privilege sets up to date
+        app.state.sessions.players.update_privs(self)
+
+    @property
+    def geoloc(self) -> app.state.services.Geolocation:
+        """The player's geolocation data."""
+        return self._geoloc
+
+    @geoloc.setter
+    def geoloc(self, value: app.state.services.Geolocation) -> None:
+        self._geoloc = value
+        self._presence_packet = None
+
+    @property
+    def presence_packet(self) -> bytes:
+        """The player's encoded user presence packet."""
+        if self._presence_packet is None:
+            Player.packet_cache_misses += 1
+            self._presence_packet = app.packets.user_presence(self)
+        else:
+            Player.packet_cache_hits += 1
+
+        return self._presence_packet
+
+    @property
+    def stats_packet(self) -> bytes:
+        """The player's encoded user stats packet."""
+        if self._stats_packet is None:
+            Player.packet_cache_misses += 1
+            self._stats_packet = app.packets.user_stats(self)
+        else:
+            Player.packet_cache_hits += 1
+
+        return self._stats_packet
+
+    def invalidate_status_packets(self) -> None:
+        """Invalidate the cached packets after a change to `status` or `stats`."""
+        # NOTE: the presence packet contains the
+        # player's current mode and global rank.
+        self._presence_packet = None
+        self._stats_packet = None
+
     @cached_property
     def bancho_priv(self) -> ClientPrivileges:
         """The player's privileges according to the client."""
@@ -429,9 +506,6 @@ class Player:
             {"priv": self.priv, "user_id": self.id},
         )
 
-        if "bancho_priv" in self.__dict__:
-            del self.bancho_priv  # wipe cached_property
-
     async def add_privs(self, bits: Privileges) -> None:
         """Update `self`'s privileges, adding `bits`."""
         self.priv |= bits
@@ -441,9 +515,6 @@ class Player:
             {"priv": self.priv, "user_id": self.id},
         )
 
-        if "bancho_priv" in self.__dict__:
-            del self.bancho_priv  # wipe cached_property
-
         if self.is_online:
             # if they're online, send a packet
             # to update their client-side privileges
@@ -458,9 +529,6 @@ class Player:
             {"priv": self.priv, "user_id": self.id},
         )
 
-        if "bancho_priv" in self.__dict__:
-            del self.bancho_priv  # wipe cached_property
-
         if self.is_online:
             # if they're online, send a packet
             # to update their client-side privileges
@@ -487,6 +555,10 @@ class Player:
                 self.id,
             )
 
+        # their scores are no longer shown on leaderboards
+        leaderboards.invalidate_all()
+        await map_ranks.remove_player(self.id)
+
         log_msg = f"{admin} restricted {self} for: {reason}."
 
         log(log_msg, Ansi.LRED)
@@ -525,6 +597,10 @@ class Player:
                 {str(self.id): stats.pp},
             )
 
+        # their scores are shown on leaderboards again
+        leaderboards.invalidate_all()
+        await map_ranks.add_player(self.id)
+
         log_msg = f"{admin} unrestricted {self} for: {reason}."
 
         log(log_msg, Ansi.LRED)
@@ -929,10 +1005,15 @@ class Player:
 
     async def relationships_from_sql(self, db_conn: databases.core.Connection) -> None:
         """Retrieve `self`'s relationships from sql."""
-        for row in await db_conn.fetch_all(
+        rows = await db_conn.fetch_all(
             "SELECT user2, type FROM relationships WHERE user1 = :user1",
             {"user1": self.id},
-        ):
+        )
+        self.relationships_from_rows(row._mapping for row in rows)
+
+    def relationships_from_rows(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        """Set `self`'s relationships from rows of the relationships table."""
+        for row in rows:
             if row["type"] == "friend":
                 self.friends.add(row["user2"])
             else:
@@ -984,7 +1065,16 @@ class Player:
 
     async def stats_from_sql_full(self, db_conn: databases.core.Connection) -> None:
         """Retrieve `self`'s stats (all modes) from sql."""
-        for row in await stats_repo.fetch_many(player_id=self.id):
+        await self.stats_from_rows(await stats_repo.fetch_many(player_id=self.id))
+
+    async def stats_from_rows(self, rows: Sequence[stats_repo.Stat]) -> None:
+        """Set `self`'s stats (all modes) from rows of the stats table."""
+        # fetch the global ranks for all modes concurrently
+        ranks = await asyncio.gather(
+            *[self.get_global_rank(GameMode(row["mode"])) for row in rows],
+        )
+
+        for row, rank in zip(rows, ranks):
             game_mode = GameMode(row["mode"])
             self.stats[game_mode] = ModeData(
                 tscore=row["tscore"],
@@ -995,7 +1085,7 @@ class Player:
                 playtime=row["playtime"],
                 max_combo=row["max_combo"],
                 total_hits=row["total_hits"],
-                rank=await self.get_global_rank(game_mode),
+                rank=rank,
                 grades={
                     Grade.XH: row["xh_count"],
                     Grade.X: row["x_count"],
@@ -1005,13 +1095,11 @@ class Player:
                 },
             )
 
+        self.invalidate_status_packets()
+
     def update_latest_activity_soon(self) -> None:
         """Update the player's latest activity in the database."""
-        task = app.state.services.database.execute(
-            "UPDATE users SET latest_activity = UNIX_TIMESTAMP() WHERE id = :user_id",
-            {"user_id": self.id},
-        )
-        app.state.loop.create_task(task)
+        write_behind.record_latest_activity(self.id)
 
     def enqueue(self, data: bytes) -> None:
         """Add data to be sent to the client."""
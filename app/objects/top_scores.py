@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import bisect
+from typing import NamedTuple
+
+import databases.core
+
+import app.state
+from app.constants.gamemodes import GameMode
+
+__all__ = ("TopScore", "TopScores")
+
+# only a player's top 100 scores are weighted;
+# the rest only count towards their bonus pp.
+MAX_WEIGHTED_SCORES = 100
+
+
+class TopScore(NamedTuple):
+    pp: float
+    acc: float
+    map_md5: str
+
+
+class TopScores:
+    """\
+    A player's best scores on ranked & approved maps in a single mode.
+
+    Only the top 100 scores (by pp) are kept, along with the total
+    number of best scores, which is all that's needed to calculate
+    their weighted pp & accuracy.
+    """
+
+    def __init__(self, scores: list[TopScore], count: int) -> None:
+        # NOTE: sorted by pp, descending
+        self.scores = scores[:MAX_WEIGHTED_SCORES]
+        self.count = count
+
+        # whether we no longer know the player's top 100; the
+        # structure should be rebuilt from sql before it's reused.
+        self.stale = False
+
+    def __repr__(self) -> str:
+        return f"<TopScores count={self.count} pp={self.pp} acc={self.acc:.2f}%>"
+
+    @property
+    def pp(self) -> int:
+        """The player's total weighted pp, including bonus pp."""
+        weighted_pp = sum(s.pp * 0.95**i for i, s in enumerate(self.scores))
+        bonus_pp = 416.6667 * (1 - 0.9994**self.count)
+        return round(weighted_pp + bonus_pp)
+
+    @property
+    def acc(self) -> float:
+        """The player's total weighted accuracy."""
+        if not self.count:
+            return 0.0
+
+        weighted_acc = sum(s.acc * 0.95**i for i, s in enumerate(self.scores))
+        bonus_acc = 100.0 / (20 * (1 - 0.95**self.count))
+        return (weighted_acc * bonus_acc) / 100
+
+    def add(self, score: TopScore, replaces_best: bool) -> None:
+        """\
+        Add a new best score, replacing any previous best on the map.
+
+        `replaces_best` should be True if the player had a previous best
+        on the map; it may be outside of the top 100 we have in memory.
+        """
+        for i, top_score in enumerate(self.scores):
+            if top_score.map_md5 == score.map_md5:
+                del self.scores[i]
+                break
+        else:
+            if not replaces_best:
+                self.count += 1
+
+        idx = bisect.bisect(self.scores, -score.pp, key=lambda s: -s.pp)
+
+        if idx == MAX_WEIGHTED_SCORES:
+            # not in the top 100
+            return
+
+        if idx == len(self.scores) and self.count > len(self.scores) + 1:
+            # we don't have the scores beneath this one in memory,
+            # so we can't be sure this belongs in the top 100.
+            self.stale = True
+            return
+
+        self.scores.insert(idx, score)
+        del self.scores[MAX_WEIGHTED_SCORES:]
+
+    @classmethod
+    async def from_sql(
+        cls,
+        user_id: int,
+        mode: GameMode,
+        db_conn: databases.core.Connection,
+    ) -> TopScores:
+        """Fetch a player's top scores in a given mode from sql."""
+        params = {"user_id": user_id, "mode": mode}
+
+        rows = await db_conn.fetch_all(
+            "SELECT s.pp, s.acc, s.map_md5 FROM scores s "
+            "INNER JOIN maps m ON s.map_md5 = m.md5 "
+            "WHERE s.userid = :user_id AND s.mode = :mode "
+            "AND s.status = 2 AND m.status IN (2, 3) "  # ranked, approved
+            f"ORDER BY s.pp DESC LIMIT {MAX_WEIGHTED_SCORES}",
+            params,
+        )
+
+        count: int = await db_conn.fetch_val(
+            "SELECT COUNT(*) FROM scores s "
+            "INNER JOIN maps m ON s.map_md5 = m.md5 "
+            "WHERE s.userid = :user_id AND s.mode = :mode "
+            "AND s.status = 2 AND m.status IN (2, 3)",
+            params,
+        )
+
+        return cls([TopScore(r["pp"], r["acc"], r["map_md5"]) for r in rows], count)
+
+    @classmethod
+    async def from_cache_or_sql(cls, user_id: int, mode: GameMode) -> TopScores:
+        """Fetch a player's top scores in a given mode from the cache, or sql."""
+        key = (user_id, mode)
+
+        top_scores = app.state.cache.top_scores.get(key)
+        if top_scores is None or top_scores.stale:
+            async with app.state.services.database.connection() as db_conn:
+                top_scores = await cls.from_sql(user_id, mode, db_conn)
+
+            app.state.cache.top_scores[key] = top_scores
+
+        return top_scores
@@ -290,16 +290,45 @@ class BasePacket(ABC):
 PacketMap = dict[ClientPackets, type[BasePacket]]
 
 
+# precompiled struct formats used by the packet reader; these are
+# all read with `unpack_from` at an offset to avoid slicing the body.
+_HEADER_FMT = struct.Struct("<HxI")
+
+_I8_FMT = struct.Struct("<b")
+_I16_FMT = struct.Struct("<h")
+_U16_FMT = struct.Struct("<H")
+_I32_FMT = struct.Struct("<i")
+_U32_FMT = struct.Struct("<I")
+_I64_FMT = struct.Struct("<q")
+_U64_FMT = struct.Struct("<Q")
+_F16_FMT = struct.Struct("<e")
+_F32_FMT = struct.Struct("<f")
+_F64_FMT = struct.Struct("<d")
+
+_REPLAYFRAME_FMT = struct.Struct("<BBffi")
+_MATCH_HEAD_FMT = struct.Struct("<hbbi")  # id, in_progress, powerplay, mods
+_MATCH_SLOTS_FMT = struct.Struct("<16b16b")  # slot statuses, slot teams
+_MATCH_TAIL_FMT = struct.Struct("<ibbbb")  # host id, mode, wincon, teamtype, fm
+_MATCH_SLOT_MODS_FMT = struct.Struct("<16i")
+
+
 class BanchoPacketReader:
     """\
     A class for reading bancho packets
     from the osu! client's request body.
 
+    The reader never re-slices the body; it keeps a single
+    integer cursor into the buffer and reads every field
+    with a precompiled `struct.Struct.unpack_from`.
+
     Attributes
     -----------
     body_view: `memoryview`
         A readonly view of the request's body.
 
+    offset: `int`
+        The current position of the reader within `body_view`.
+
     packet_map: `dict[ClientPackets, BasePacket]`
         The map of registered packets the reader may handle.
 
@@ -316,22 +345,26 @@ class BanchoPacketReader:
         self.body_view = body_view  # readonly
         self.packet_map = packet_map
 
+        self.offset = 0
         self.current_len = 0  # last read packet's length
 
     def __iter__(self) -> Iterator[BasePacket]:
         return self
 
     def __next__(self) -> BasePacket:
+        body_len = len(self.body_view)
+
         # do not break until we've read the
         # header of a packet we can handle.
-        while self.body_view:  # len(self.view) < 7?
-            p_type, p_len = self._read_header()
-
-            if p_type not in self.packet_map:
-                # packet type not handled, remove
-                # from internal buffer and continue.
-                if p_len != 0:
-                    self.body_view = self.body_view[p_len:]
+        while self.offset < body_len:
+            p_type, p_len = _HEADER_FMT.unpack_from(self.body_view, self.offset)
+            self.offset += 7
+
+            packet_cls = self.packet_map.get(p_type)
+            if packet_cls is None:
+                # packet type not handled, skip
+                # over it's body and continue.
+                self.offset += p_len
             else:
                 # we can handle this one.
                 break
@@ -339,82 +372,87 @@ class BanchoPacketReader:
             raise StopIteration
 
         # we have a packet handler for this.
-        packet_cls = self.packet_map[p_type]
         self.current_len = p_len
+        packet_end = self.offset + p_len
 
-        return packet_cls(self)
+        packet = packet_cls(self)
+
+        # always resume from the end of the packet, regardless
+        # of how much of it the handler actually consumed.
+        self.offset = packet_end
+        return packet
 
     def _read_header(self) -> tuple[ClientPackets, int]:
         """Read the header of an osu! packet (id & length)."""
         # read type & length from the body
-        data = struct.unpack("<HxI", self.body_view[:7])
-        self.body_view = self.body_view[7:]
-        return ClientPackets(data[0]), data[1]
+        p_type, p_len = _HEADER_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 7
+        return ClientPackets(p_type), p_len
 
     """ public API (exposed for packet handler's __init__ methods) """
 
     def read_raw(self) -> memoryview:
-        val = self.body_view[: self.current_len]
-        self.body_view = self.body_view[self.current_len :]
+        val = self.body_view[self.offset : self.offset + self.current_len]
+        self.offset += self.current_len
         return val
 
     # integral types
 
     def read_i8(self) -> int:
-        val = self.body_view[0]
-        self.body_view = self.body_view[1:]
-        return val - 256 if val > 127 else val
+        (val,) = _I8_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 1
+        return cast(int, val)
 
     def read_u8(self) -> int:
-        val = self.body_view[0]
-        self.body_view = self.body_view[1:]
+        val = self.body_view[self.offset]
+        self.offset += 1
         return val
 
     def read_i16(self) -> int:
-        val = int.from_bytes(self.body_view[:2], "little", signed=True)
-        self.body_view = self.body_view[2:]
-        return val
+        (val,) = _I16_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 2
+        return cast(int, val)
 
     def read_u16(self) -> int:
-        val = int.from_bytes(self.body_view[:2], "little", signed=False)
-        self.body_view = self.body_view[2:]
-        return val
+        (val,) = _U16_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 2
+        return cast(int, val)
 
     def read_i32(self) -> int:
-        val = int.from_bytes(self.body_view[:4], "little", signed=True)
-        self.body_view = self.body_view[4:]
-        return val
+        (val,) = _I32_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 4
+        return cast(int, val)
 
     def read_u32(self) -> int:
-        val = int.from_bytes(self.body_view[:4], "little", signed=False)
-        self.body_view = self.body_view[4:]
-        return val
+        (val,) = _U32_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 4
+        return cast(int, val)
 
     def read_i64(self) -> int:
-        val = int.from_bytes(self.body_view[:8], "little", signed=True)
-        self.body_view = self.body_view[8:]
-        return val
+        (val,) = _I64_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 8
+        return cast(int, val)
 
     def read_u64(self) -> int:
-        val = int.from_bytes(self.body_view[:8], "little", signed=False)
-        self.body_view = self.body_view[8:]
-        return val
+        (val,) = _U64_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 8
+        return cast(int, val)
 
     # floating-point types
 
     def read_f16(self) -> float:
-        (val,) = struct.unpack_from("<e", self.body_view[:2])
-        self.body_view = self.body_view[2:]
+        (val,) = _F16_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 2
         return cast(float, val)
 
     def read_f32(self) -> float:
-        (val,) = struct.unpack_from("<f", self.body_view[:4])
-        self.body_view = self.body_view[4:]
+        (val,) = _F32_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 4
         return cast(float, val)
 
     def read_f64(self) -> float:
-        (val,) = struct.unpack_from("<d", self.body_view[:8])
-        self.body_view = self.body_view[8:]
+        (val,) = _F64_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 8
         return cast(float, val)
 
     # complex types
@@ -422,35 +460,39 @@ class BanchoPacketReader:
     # XXX: some osu! packets use i16 for
     # array length, while others use i32
     def read_i32_list_i16l(self) -> tuple[int, ...]:
-        length = int.from_bytes(self.body_view[:2], "little")
-        self.body_view = self.body_view[2:]
+        (length,) = _U16_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 2
 
-        val = struct.unpack(f'<{"I" * length}', self.body_view[: length * 4])
-        self.body_view = self.body_view[length * 4 :]
+        val = struct.unpack_from(f"<{length}I", self.body_view, self.offset)
+        self.offset += length * 4
         return val
 
     def read_i32_list_i32l(self) -> tuple[int, ...]:
-        length = int.from_bytes(self.body_view[:4], "little")
-        self.body_view = self.body_view[4:]
+        (length,) = _U32_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 4
 
-        val = struct.unpack(f'<{"I" * length}', self.body_view[: length * 4])
-        self.body_view = self.body_view[length * 4 :]
+        val = struct.unpack_from(f"<{length}I", self.body_view, self.offset)
+        self.offset += length * 4
         return val
 
     def read_string(self) -> str:
-        exists = self.body_view[0] == 0x0B
-        self.body_view = self.body_view[1:]
+        body_view = self.body_view
+        offset = self.offset
+
+        exists = body_view[offset] == 0x0B
+        offset += 1
 
         if not exists:
             # no string sent.
+            self.offset = offset
             return ""
 
         # non-empty string, decode str length (uleb128)
         length = shift = 0
 
         while True:
-            byte = self.body_view[0]
-            self.body_view = self.body_view[1:]
+            byte = body_view[offset]
+            offset += 1
 
             length |= (byte & 0x7F) << shift
             if (byte & 0x80) == 0:
@@ -458,8 +500,8 @@ class BanchoPacketReader:
 
             shift += 7
 
-        val = self.body_view[:length].tobytes().decode()  # copy
-        self.body_view = self.body_view[length:]
+        val = str(body_view[offset : offset + length], "utf-8")
+        self.offset = offset + length
         return val
 
     # custom osu! types
@@ -483,41 +525,57 @@ class BanchoPacketReader:
 
     def read_match(self) -> MultiplayerMatch:
         """Read an osu! match from the internal buffer."""
+        id, in_progress, powerplay, mods = _MATCH_HEAD_FMT.unpack_from(
+            self.body_view,
+            self.offset,
+        )
+        self.offset += _MATCH_HEAD_FMT.size
+
         match = MultiplayerMatch(
-            id=self.read_i16(),
-            in_progress=self.read_i8() == 1,
-            powerplay=self.read_i8(),
-            mods=self.read_i32(),
+            id=id,
+            in_progress=in_progress == 1,
+            powerplay=powerplay,
+            mods=mods,
             name=self.read_string(),
             passwd=self.read_string(),
             map_name=self.read_string(),
             map_id=self.read_i32(),
             map_md5=self.read_string(),
-            slot_statuses=[self.read_i8() for _ in range(16)],
-            slot_teams=[self.read_i8() for _ in range(16)],
-            # ^^ up to slot_ids, as it relies on slot_statuses ^^
         )
 
+        slots = _MATCH_SLOTS_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += _MATCH_SLOTS_FMT.size
+        match.slot_statuses = list(slots[:16])
+        match.slot_teams = list(slots[16:])
+        # ^^ up to slot_ids, as it relies on slot_statuses ^^
+
         for status in match.slot_statuses:
             if status & 124 != 0:  # slot has a player
                 match.slot_ids.append(self.read_i32())
 
-        match.host_id = self.read_i32()
-        match.mode = self.read_i8()
-        match.win_condition = self.read_i8()
-        match.team_type = self.read_i8()
-        match.freemods = self.read_i8() == 1
+        (
+            match.host_id,
+            match.mode,
+            match.win_condition,
+            match.team_type,
+            freemods,
+        ) = _MATCH_TAIL_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += _MATCH_TAIL_FMT.size
+        match.freemods = freemods == 1
 
         if match.freemods:
-            match.slot_mods = [self.read_i32() for _ in range(16)]
+            match.slot_mods = list(
+                _MATCH_SLOT_MODS_FMT.unpack_from(self.body_view, self.offset),
+            )
+            self.offset += _MATCH_SLOT_MODS_FMT.size
 
         match.seed = self.read_i32()  # used for mania random mod
 
         return match
 
     def read_scoreframe(self) -> ScoreFrame:
-        sf = ScoreFrame(*SCOREFRAME_FMT.unpack_from(self.body_view[:29]))
-        self.body_view = self.body_view[29:]
+        sf = ScoreFrame(*SCOREFRAME_FMT.unpack_from(self.body_view, self.offset))
+        self.offset += SCOREFRAME_FMT.size
 
         if sf.score_v2:
             sf.combo_portion = self.read_f64()
@@ -526,17 +584,15 @@ class BanchoPacketReader:
         return sf
 
     def read_replayframe(self) -> ReplayFrame:
-        return ReplayFrame(
-            button_state=self.read_u8(),
-            taiko_byte=self.read_u8(),  # pre-taiko support (<=2008)
-            x=self.read_f32(),
-            y=self.read_f32(),
-            time=self.read_i32(),
+        frame = ReplayFrame._make(
+            _REPLAYFRAME_FMT.unpack_from(self.body_view, self.offset),
         )
+        self.offset += _REPLAYFRAME_FMT.size
+        return frame
 
     def read_replayframe_bundle(self) -> ReplayFrameBundle:
         # save raw format to distribute to the other clients
-        raw_data = self.body_view[: self.current_len]
+        raw_data = self.body_view[self.offset : self.offset + self.current_len]
 
         extra = self.read_i32()  # bancho proto >= 18
         framecount = self.read_u16()
@@ -581,10 +637,7 @@ def write_string(s: str) -> bytes:
 def write_i32_list(l: Collection[int]) -> bytearray:
     """Write `l` into bytes (int32 list)."""
     ret = bytearray(len(l).to_bytes(2, "little"))
-
-    for i in l:
-        ret += i.to_bytes(4, "little", signed=True)
-
+    ret += struct.pack(f"<{len(l)}i", *l)
     return ret
 
 
@@ -621,10 +674,15 @@ def write_channel(name: str, topic: str, count: int) -> bytearray:
 #    return ret
 
 
+_MATCH_HEAD_WRITE_FMT = struct.Struct("<HbbI")  # id, in_progress, type, mods
+_MATCH_TAIL_WRITE_FMT = struct.Struct("<I4B")  # host id, mode, wincon, teamtype, fm
+_MATCH_SLOT_MODS_WRITE_FMT = struct.Struct("<16I")
+
+
 def write_match(m: Match, send_pw: bool = True) -> bytearray:
     """Write `m` into bytes (osu! match)."""
     # 0 is for match type
-    ret = bytearray(struct.pack("<HbbI", m.id, m.in_progress, 0, m.mods))
+    ret = bytearray(_MATCH_HEAD_WRITE_FMT.pack(m.id, m.in_progress, 0, m.mods))
     ret += write_string(m.name)
 
     # osu expects \x0b\x00 if there's a password, but it's
@@ -638,7 +696,7 @@ def write_match(m: Match, send_pw: bool = True) -> bytearray:
         ret += b"\x00"
 
     ret += write_string(m.map_name)
-    ret += m.map_id.to_bytes(4, "little", signed=True)
+    ret += _I32_FMT.pack(m.map_id)
     ret += write_string(m.map_md5)
 
     ret.extend([s.status for s in m.slots])
@@ -647,16 +705,22 @@ def write_match(m: Match, send_pw: bool = True) -> bytearray:
     for s in m.slots:
         if s.status & 0b01111100 != 0:  # SlotStatus.has_player
             assert s.player is not None
-            ret += s.player.id.to_bytes(4, "little")
-
-    ret += m.host.id.to_bytes(4, "little")
-    ret.extend((m.mode, m.win_condition, m.team_type, m.freemods))
+            ret += _U32_FMT.pack(s.player.id)
+
+    # NOTE: use host_id directly rather than m.host,
+    # which would look the host up in the player list.
+    ret += _MATCH_TAIL_WRITE_FMT.pack(
+        m.host_id,
+        m.mode,
+        m.win_condition,
+        m.team_type,
+        m.freemods,
+    )
 
     if m.freemods:
-        for s in m.slots:
-            ret += s.mods.to_bytes(4, "little")
+        ret += _MATCH_SLOT_MODS_WRITE_FMT.pack(*[s.mods for s in m.slots])
 
-    ret += m.seed.to_bytes(4, "little")
+    ret += _U32_FMT.pack(m.seed)
     return ret
 
 
@@ -714,7 +778,9 @@ _expand_types: dict[osuTypes, Callable[..., bytearray]] = {
 
 def write(packid: int, *args: tuple[Any, osuTypes]) -> bytes:
     """Write `args` into bytes."""
-    ret = bytearray(struct.pack("<Hx", packid))
+    # the header is reserved up front, and the
+    # length is filled in once the body is written.
+    ret = bytearray(_HEADER_FMT.pack(packid, 0))
 
     for p_args, p_type in args:
         if p_type == osuTypes.raw:
@@ -725,10 +791,124 @@ def write(packid: int, *args: tuple[Any, osuTypes]) -> bytes:
             ret += _expand_types[p_type](*p_args)
 
     # add size
-    ret[3:3] = struct.pack("<I", len(ret) - 3)
+    _U32_FMT.pack_into(ret, 3, len(ret) - 7)
     return bytes(ret)
 
 
+# packet schemas
+
+# struct format characters for osu!'s fixed-size types;
+# consecutive runs of these are fused into a single struct.
+_FIXED_FORMATS: dict[osuTypes, str] = {
+    osuTypes.i8: "b",
+    osuTypes.u8: "B",
+    osuTypes.i16: "h",
+    osuTypes.u16: "H",
+    osuTypes.i32: "i",
+    osuTypes.u32: "I",
+    osuTypes.f32: "f",
+    osuTypes.i64: "q",
+    osuTypes.u64: "Q",
+    osuTypes.f64: "d",
+}
+
+
+def _write_raw(data: bytes) -> bytes:
+    return data
+
+
+def _expand(writer: Callable[..., bytearray]) -> Callable[[Any], bytearray]:
+    def wrapper(args: tuple[Any, ...]) -> bytearray:
+        return writer(*args)
+
+    return wrapper
+
+
+_variable_writers: dict[osuTypes, Callable[[Any], bytes | bytearray]] = {
+    osuTypes.raw: _write_raw,
+    **_noexpand_types,
+    **{p_type: _expand(writer) for p_type, writer in _expand_types.items()},
+}
+
+
+class PacketSchema:
+    """\
+    A declarative layout for the body of a server packet,
+    compiled once into a specialised encoder for that packet.
+
+    Runs of consecutive fixed-size fields are fused into a single
+    `struct.Struct`; the leading run also includes the packet header,
+    so the header is reserved up front and only its length is patched
+    in once the body is written. Schemas made entirely of fixed-size
+    fields are encoded with a single `pack` call.
+
+    Values are passed to `encode` in field order, with composite
+    types (message, channel, match) passed as a tuple of their args.
+
+    Intended Usage:
+    >>> USER_ID = PacketSchema(ServerPackets.USER_ID, osuTypes.i32)
+    >>> USER_ID.encode(1001)
+    b'\x05\x00\x00\x04\x00\x00\x00\xe9\x03\x00\x00'
+    """
+
+    def __init__(self, packet_id: ServerPackets, *fields: osuTypes) -> None:
+        self.packet_id = packet_id
+        self.fields = fields
+
+        # split the fields into a fused fixed-size prefix
+        # (including the header), and the remaining steps.
+        prefix_fmt = ""
+        idx = 0
+        while idx < len(fields) and fields[idx] in _FIXED_FORMATS:
+            prefix_fmt += _FIXED_FORMATS[fields[idx]]
+            idx += 1
+
+        self._prefix = struct.Struct(_HEADER_FMT.format + prefix_fmt)
+        self._prefix_len = len(prefix_fmt)
+
+        # (number of values consumed, encoder)
+        self._steps: list[tuple[int, Callable[..., bytes | bytearray]]] = []
+
+        fixed_fmt = ""
+        for p_type in fields[idx:]:
+            if p_type in _FIXED_FORMATS:
+                fixed_fmt += _FIXED_FORMATS[p_type]
+                continue
+
+            if fixed_fmt:
+                self._steps.append(
+                    (len(fixed_fmt), struct.Struct("<" + fixed_fmt).pack)
+                )
+                fixed_fmt = ""
+
+            self._steps.append((1, _variable_writers[p_type]))
+
+        if fixed_fmt:
+            self._steps.append((len(fixed_fmt), struct.Struct("<" + fixed_fmt).pack))
+
+        self._fixed_body_len = self._prefix.size - _HEADER_FMT.size
+
+    def __repr__(self) -> str:
+        return f"<PacketSchema {self.packet_id!r}>"
+
+    def encode(self, *args: Any) -> bytes:
+        """Encode `args` into a packet, in the order of the schema's fields."""
+        if not self._steps:
+            # the entire packet is of a fixed size.
+            return self._prefix.pack(self.packet_id, self._fixed_body_len, *args)
+
+        idx = self._prefix_len
+        ret = bytearray(self._prefix.pack(self.packet_id, 0, *args[:idx]))
+
+        for arg_count, encoder in self._steps:
+            ret += encoder(*args[idx : idx + arg_count])
+            idx += arg_count
+
+        # add size
+        _U32_FMT.pack_into(ret, 3, len(ret) - 7)
+        return bytes(ret)
+
+
 #
 # packets
 #
@@ -753,11 +933,17 @@ def user_id(user_id: int) -> bytes:
 
 
 # packet id: 7
+SEND_MESSAGE_SCHEMA = PacketSchema(
+    ServerPackets.SEND_MESSAGE,
+    osuTypes.string,  # sender
+    osuTypes.string,  # msg
+    osuTypes.string,  # recipient
+    osuTypes.i32,  # sender_id
+)
+
+
 def send_message(sender: str, msg: str, recipient: str, sender_id: int) -> bytes:
-    return write(
-        ServerPackets.SEND_MESSAGE,
-        ((sender, msg, recipient, sender_id), osuTypes.message),
-    )
+    return SEND_MESSAGE_SCHEMA.encode(sender, msg, recipient, sender_id)
 
 
 # packet id: 8
@@ -792,30 +978,47 @@ BOT_STATUSES = (
 # `bg_loops.reroll_bot_status` to keep fresh.
 
 
+# packet id: 11
+USER_STATS_SCHEMA = PacketSchema(
+    ServerPackets.USER_STATS,
+    osuTypes.i32,  # id
+    osuTypes.u8,  # action
+    osuTypes.string,  # info_text
+    osuTypes.string,  # map_md5
+    osuTypes.i32,  # mods
+    osuTypes.u8,  # mode
+    osuTypes.i32,  # map_id
+    osuTypes.i64,  # rscore
+    osuTypes.f32,  # acc
+    osuTypes.i32,  # plays
+    osuTypes.i64,  # tscore
+    osuTypes.i32,  # rank
+    osuTypes.i16,  # pp (why not u16 peppy :()
+)
+
+
 @cache
 def bot_stats(player: Player) -> bytes:
     # pick at random from list of potential statuses.
     status_id, status_txt = random.choice(BOT_STATUSES)
 
-    return write(
-        ServerPackets.USER_STATS,
-        (player.id, osuTypes.i32),  # id
-        (status_id, osuTypes.u8),  # action
-        (status_txt, osuTypes.string),  # info_text
-        ("", osuTypes.string),  # map_md5
-        (0, osuTypes.i32),  # mods
-        (0, osuTypes.u8),  # mode
-        (0, osuTypes.i32),  # map_id
-        (0, osuTypes.i64),  # rscore
-        (0.0, osuTypes.f32),  # acc
-        (0, osuTypes.i32),  # plays
-        (0, osuTypes.i64),  # tscore
-        (0, osuTypes.i32),  # rank
-        (0, osuTypes.i16),  # pp
+    return USER_STATS_SCHEMA.encode(
+        player.id,
+        status_id,
+        status_txt,
+        "",
+        0,
+        0,
+        0,
+        0,
+        0.0,
+        0,
+        0,
+        0,
+        0,
     )
 
 
-# packet id: 11
 def _user_stats(
     user_id: int,
     action: int,
@@ -837,21 +1040,20 @@ def _user_stats(
         ranked_score = pp
         pp = 0
 
-    return write(
-        ServerPackets.USER_STATS,
-        (user_id, osuTypes.i32),
-        (action, osuTypes.u8),
-        (info_text, osuTypes.string),
-        (map_md5, osuTypes.string),
-        (mods, osuTypes.i32),
-        (mode, osuTypes.u8),
-        (map_id, osuTypes.i32),
-        (ranked_score, osuTypes.i64),
-        (accuracy / 100.0, osuTypes.f32),
-        (plays, osuTypes.i32),
-        (total_score, osuTypes.i64),
-        (global_rank, osuTypes.i32),
-        (pp, osuTypes.i16),  # why not u16 peppy :(
+    return USER_STATS_SCHEMA.encode(
+        user_id,
+        action,
+        info_text,
+        map_md5,
+        mods,
+        mode,
+        map_id,
+        ranked_score,
+        accuracy / 100.0,
+        plays,
+        total_score,
+        global_rank,
+        pp,
     )
 
 
@@ -867,21 +1069,21 @@ def user_stats(player: Player) -> bytes:
         rscore = gm_stats.rscore
         pp = gm_stats.pp
 
-    return write(
-        ServerPackets.USER_STATS,
-        (player.id, osuTypes.i32),
-        (player.status.action, osuTypes.u8),
-        (player.status.info_text, osuTypes.string),
-        (player.status.map_md5, osuTypes.string),
-        (player.status.mods, osuTypes.i32),
-        (player.status.mode.as_vanilla, osuTypes.u8),
-        (player.status.map_id, osuTypes.i32),
-        (rscore, osuTypes.i64),
-        (gm_stats.acc / 100.0, osuTypes.f32),
-        (gm_stats.plays, osuTypes.i32),
-        (gm_stats.tscore, osuTypes.i64),
-        (gm_stats.rank, osuTypes.i32),
-        (pp, osuTypes.i16),  # why not u16 peppy :(
+    status = player.status
+    return USER_STATS_SCHEMA.encode(
+        player.id,
+        status.action,
+        status.info_text,
+        status.map_md5,
+        status.mods,
+        status.mode.as_vanilla,
+        status.map_id,
+        rscore,
+        gm_stats.acc / 100.0,
+        gm_stats.plays,
+        gm_stats.tscore,
+        gm_stats.rank,
+        pp,
     )
 
 
@@ -938,8 +1140,11 @@ def notification(msg: str) -> bytes:
 
 
 # packet id: 26
+UPDATE_MATCH_SCHEMA = PacketSchema(ServerPackets.UPDATE_MATCH, osuTypes.match)
+
+
 def update_match(m: Match, send_pw: bool = True) -> bytes:
-    return write(ServerPackets.UPDATE_MATCH, ((m, send_pw), osuTypes.match))
+    return UPDATE_MATCH_SCHEMA.encode((m, send_pw))
 
 
 # packet id: 27
@@ -1107,26 +1312,38 @@ def match_player_skipped(user_id: int) -> bytes:
     return write(ServerPackets.MATCH_PLAYER_SKIPPED, (user_id, osuTypes.i32))
 
 
+# packet id: 83
+USER_PRESENCE_SCHEMA = PacketSchema(
+    ServerPackets.USER_PRESENCE,
+    osuTypes.i32,  # id
+    osuTypes.string,  # name
+    osuTypes.u8,  # utc offset (+24)
+    osuTypes.u8,  # country code
+    osuTypes.u8,  # bancho privileges | (mode << 5)
+    osuTypes.f32,  # longitude
+    osuTypes.f32,  # latitude
+    osuTypes.i32,  # global rank
+)
+
+
 # since the bot is always online and is
 # also automatically added to all player's
 # friends list, their presence is requested
 # *very* frequently; only build it once.
 @cache
 def bot_presence(player: Player) -> bytes:
-    return write(
-        ServerPackets.USER_PRESENCE,
-        (player.id, osuTypes.i32),
-        (player.name, osuTypes.string),
-        (-5 + 24, osuTypes.u8),
-        (245, osuTypes.u8),  # satellite provider
-        (31, osuTypes.u8),
-        (1234.0, osuTypes.f32),  # send coordinates waaay
-        (4321.0, osuTypes.f32),  # off the map for the bot
-        (0, osuTypes.i32),
+    return USER_PRESENCE_SCHEMA.encode(
+        player.id,
+        player.name,
+        -5 + 24,
+        245,  # satellite provider
+        31,
+        1234.0,  # send coordinates waaay
+        4321.0,  # off the map for the bot
+        0,
     )
 
 
-# packet id: 83
 def _user_presence(
     user_id: int,
     name: str,
@@ -1138,31 +1355,29 @@ def _user_presence(
     longitude: int,
     global_rank: int,
 ) -> bytes:
-    return write(
-        ServerPackets.USER_PRESENCE,
-        (user_id, osuTypes.i32),
-        (name, osuTypes.string),
-        (utc_offset + 24, osuTypes.u8),
-        (country_code, osuTypes.u8),
-        (bancho_privileges | (mode << 5), osuTypes.u8),
-        (longitude, osuTypes.f32),
-        (latitude, osuTypes.f32),
-        (global_rank, osuTypes.i32),
+    return USER_PRESENCE_SCHEMA.encode(
+        user_id,
+        name,
+        utc_offset + 24,
+        country_code,
+        bancho_privileges | (mode << 5),
+        longitude,
+        latitude,
+        global_rank,
     )
 
 
 # TODO: this is implementation-specific, move it out
 def user_presence(player: Player) -> bytes:
-    return write(
-        ServerPackets.USER_PRESENCE,
-        (player.id, osuTypes.i32),
-        (player.name, osuTypes.string),
-        (player.utc_offset + 24, osuTypes.u8),
-        (player.geoloc["country"]["numeric"], osuTypes.u8),
-        (player.bancho_priv | (player.status.mode.as_vanilla << 5), osuTypes.u8),
-        (player.geoloc["longitude"], osuTypes.f32),
-        (player.geoloc["latitude"], osuTypes.f32),
-        (player.gm_stats.rank, osuTypes.i32),
+    return USER_PRESENCE_SCHEMA.encode(
+        player.id,
+        player.name,
+        player.utc_offset + 24,
+        player.geoloc["country"]["numeric"],
+        player.bancho_priv | (player.status.mode.as_vanilla << 5),
+        player.geoloc["longitude"],
+        player.geoloc["latitude"],
+        player.gm_stats.rank,
     )
 
 
@@ -1,19 +1,14 @@
 from __future__ import annotations
 
 import textwrap
-from collections.abc import Callable
 from typing import Any
 from typing import cast
-from typing import TYPE_CHECKING
 from typing import TypedDict
 
 import app.state.services
 from app._typing import _UnsetSentinel
 from app._typing import UNSET
 
-if TYPE_CHECKING:
-    from app.objects.score import Score
-
 # +-------+--------------+------+-----+---------+----------------+
 # | Field | Type         | Null | Key | Default | Extra          |
 # +-------+--------------+------+-----+---------+----------------+
@@ -36,7 +31,7 @@ class Achievement(TypedDict):
     file: str
     name: str
     desc: str
-    cond: Callable[[Score, int], bool]
+    cond: str  # a python expression of `score` & `mode_vn`
 
 
 class AchievementUpdateFields(TypedDict, total=False):
@@ -76,9 +71,7 @@ async def create(
     rec = await app.state.services.database.fetch_one(query, params)
     assert rec is not None
 
-    achievement = dict(rec._mapping)
-    achievement["cond"] = eval(f'lambda score, mode_vn: {rec["cond"]}')
-    return cast(Achievement, achievement)
+    return cast(Achievement, dict(rec._mapping))
 
 
 async def fetch_one(
@@ -104,9 +97,7 @@ async def fetch_one(
     if rec is None:
         return None
 
-    achievement = dict(rec._mapping)
-    achievement["cond"] = eval(f'lambda score, mode_vn: {rec["cond"]}')
-    return cast(Achievement, achievement)
+    return cast(Achievement, dict(rec._mapping))
 
 
 async def fetch_count() -> int:
@@ -143,14 +134,7 @@ async def fetch_many(
 
     records = await app.state.services.database.fetch_all(query, params)
 
-    achievements: list[dict[str, Any]] = []
-
-    for rec in records:
-        achievement = dict(rec._mapping)
-        achievement["cond"] = eval(f'lambda score, mode_vn: {rec["cond"]}')
-        achievements.append(achievement)
-
-    return cast(list[Achievement], achievements)
+    return cast(list[Achievement], [dict(rec._mapping) for rec in records])
 
 
 async def update(
@@ -190,9 +174,7 @@ async def update(
     rec = await app.state.services.database.fetch_one(query, params)
     assert rec is not None
 
-    achievement = dict(rec._mapping)
-    achievement["cond"] = eval(f'lambda score, mode_vn: {rec["cond"]}')
-    return cast(Achievement, achievement)
+    return cast(Achievement, dict(rec._mapping))
 
 
 async def delete(
@@ -220,6 +202,4 @@ async def delete(
     }
     await app.state.services.database.execute(query, params)
 
-    achievement = dict(rec._mapping)
-    achievement["cond"] = eval(f'lambda score, mode_vn: {rec["cond"]}')
-    return cast(Achievement, achievement)
+    return cast(Achievement, dict(rec._mapping))
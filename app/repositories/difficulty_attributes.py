@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import textwrap
+from typing import Any
+from typing import cast
+from typing import TypedDict
+
+import app.state.services
+
+# create table difficulty_attributes
+# (
+# 	map_md5 char(32) not null,
+# 	mode tinyint(1) not null,
+# 	mods int not null,
+# 	calc_version varchar(32) not null,
+# 	stars float not null,
+# 	aim float null,
+# 	speed float null,
+# 	flashlight float null,
+# 	slider_factor float null,
+# 	speed_note_count float null,
+# 	stamina float null,
+# 	color float null,
+# 	rhythm float null,
+# 	peak float null,
+# 	primary key (map_md5, mode, mods)
+# );
+
+READ_PARAMS = textwrap.dedent(
+    """\
+        map_md5, mode, mods, calc_version, stars, aim, speed, flashlight,
+        slider_factor, speed_note_count, stamina, color, rhythm, peak
+    """,
+)
+
+
+class DifficultyAttributes(TypedDict):
+    map_md5: str
+    mode: int
+    mods: int
+    calc_version: str
+    stars: float
+    aim: float | None
+    speed: float | None
+    flashlight: float | None
+    slider_factor: float | None
+    speed_note_count: float | None
+    stamina: float | None
+    color: float | None
+    rhythm: float | None
+    peak: float | None
+
+
+async def create_or_update(attributes: DifficultyAttributes) -> None:
+    """Create (or replace) a beatmap's difficulty attributes with some mods."""
+    query = f"""\
+        REPLACE INTO difficulty_attributes ({READ_PARAMS})
+             VALUES (:map_md5, :mode, :mods, :calc_version, :stars, :aim,
+                     :speed, :flashlight, :slider_factor, :speed_note_count,
+                     :stamina, :color, :rhythm, :peak)
+    """
+    params: dict[str, Any] = dict(attributes)
+    await app.state.services.database.execute(query, params)
+
+
+async def fetch_one(
+    map_md5: str,
+    mode: int,
+    mods: int,
+    calc_version: str,
+) -> DifficultyAttributes | None:
+    """\
+    Fetch a beatmap's difficulty attributes with some mods.
+
+    Attributes calculated by another version of the calculator are ignored.
+    """
+    query = f"""\
+        SELECT {READ_PARAMS}
+          FROM difficulty_attributes
+         WHERE map_md5 = :map_md5
+           AND mode = :mode
+           AND mods = :mods
+           AND calc_version = :calc_version
+    """
+    params: dict[str, Any] = {
+        "map_md5": map_md5,
+        "mode": mode,
+        "mods": mods,
+        "calc_version": calc_version,
+    }
+    attributes = await app.state.services.database.fetch_one(query, params)
+    if attributes is None:
+        return None
+
+    return cast(DifficultyAttributes, dict(attributes._mapping))
+
+
+async def fetch_calculated_md5s(calc_version: str) -> set[str]:
+    """Fetch the md5s of the beatmaps with calculated difficulty attributes."""
+    query = """\
+        SELECT DISTINCT map_md5
+          FROM difficulty_attributes
+         WHERE calc_version = :calc_version
+    """
+    params: dict[str, Any] = {"calc_version": calc_version}
+    rows = await app.state.services.database.fetch_all(query, params)
+    return {row["map_md5"] for row in rows}
+
+
+async def delete_stale(calc_version: str) -> None:
+    """\
+    Delete the attributes of beatmaps which no longer exist (e.g. their
+    .osu file was updated), or which were calculated by another version
+    of the calculator.
+    """
+    query = """\
+        DELETE FROM difficulty_attributes
+         WHERE calc_version != :calc_version
+            OR map_md5 NOT IN (SELECT md5 FROM maps)
+    """
+    params: dict[str, Any] = {"calc_version": calc_version}
+    await app.state.services.database.execute(query, params)
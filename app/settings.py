@@ -63,10 +63,34 @@ REDIRECT_OSU_URLS = read_bool(os.environ["REDIRECT_OSU_URLS"])
 
 PP_CACHED_ACCURACIES = [int(acc) for acc in read_list(os.environ["PP_CACHED_ACCS"])]
 
+PERFORMANCE_MAX_PROCESSES = int(os.environ["PERFORMANCE_MAX_PROCESSES"])
+PERFORMANCE_CALC_TIMEOUT = float(os.environ["PERFORMANCE_CALC_TIMEOUT"])
+PERFORMANCE_BEATMAP_CACHE_MB = int(os.environ["PERFORMANCE_BEATMAP_CACHE_MB"])
+PERFORMANCE_DIFFICULTY_CACHE_SIZE = int(os.environ["PERFORMANCE_DIFFICULTY_CACHE_SIZE"])
+
+MMD_DB_PATH = os.environ.get("MMD_DB_PATH")
+
 DISALLOWED_NAMES = read_list(os.environ["DISALLOWED_NAMES"])
 DISALLOWED_PASSWORDS = read_list(os.environ["DISALLOWED_PASSWORDS"])
 DISALLOW_OLD_CLIENTS = read_bool(os.environ["DISALLOW_OLD_CLIENTS"])
 
+LOGIN_PRESENCE_BUNDLE = read_bool(os.environ["LOGIN_PRESENCE_BUNDLE"])
+
+LOGIN_MAX_CONCURRENCY = int(os.environ["LOGIN_MAX_CONCURRENCY"])
+LOGIN_MAX_QUEUED = int(os.environ["LOGIN_MAX_QUEUED"])
+
+SESSION_SNAPSHOT_STORAGE = os.environ["SESSION_SNAPSHOT_STORAGE"]
+
+BCRYPT_MAX_THREADS = int(os.environ["BCRYPT_MAX_THREADS"])
+BCRYPT_CACHE_SIZE = int(os.environ["BCRYPT_CACHE_SIZE"])
+BCRYPT_CACHE_TTL = int(os.environ["BCRYPT_CACHE_TTL"])
+
+SCORE_PIPELINE_WORKERS = int(os.environ["SCORE_PIPELINE_WORKERS"])
+SCORE_PIPELINE_MAX_QUEUED = int(os.environ["SCORE_PIPELINE_MAX_QUEUED"])
+
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ["WRITE_BEHIND_FLUSH_INTERVAL"])
+WRITE_BEHIND_MAX_PENDING = int(os.environ["WRITE_BEHIND_MAX_PENDING"])
+
 DISCORD_AUDIT_LOG_WEBHOOK = os.environ["DISCORD_AUDIT_LOG_WEBHOOK"]
 
 AUTOMATICALLY_REPORT_PROBLEMS = read_bool(os.environ["AUTOMATICALLY_REPORT_PROBLEMS"])
@@ -81,4 +105,4 @@ DEVELOPER_MODE = read_bool(os.environ["DEVELOPER_MODE"])
 ## WARNING touch this if you know how
 ##          the migrations system works.
 ##          you'll regret it.
-VERSION = "4.8.1"
+VERSION = "4.8.3"
@@ -2,12 +2,42 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import app.settings
+from app.utils import LRUCache
+
 if TYPE_CHECKING:
+    from app.constants.gamemodes import GameMode
     from app.objects.beatmap import Beatmap, BeatmapSet
+    from app.objects.leaderboard import Leaderboard
+    from app.objects.top_scores import TopScores
 
 
-bcrypt: dict[bytes, bytes] = {}  # {bcrypt: md5, ...}
+bcrypt: LRUCache[bytes, bytes] = LRUCache(  # {bcrypt: md5, ...}
+    maxsize=app.settings.BCRYPT_CACHE_SIZE,
+    ttl=app.settings.BCRYPT_CACHE_TTL,
+)
 beatmap: dict[str | int, Beatmap] = {}  # {md5: map, id: map, ...}
 beatmapset: dict[int, BeatmapSet] = {}  # {bsid: map_set}
 unsubmitted: set[str] = set()  # {md5, ...}
 needs_update: set[str] = set()  # {md5, ...}
+
+# players' top scores, from which their pp & accuracy are calculated;
+# expired so that recalculations (e.g. by tools/recalc.py) are picked up.
+top_scores: LRUCache[tuple[int, GameMode], TopScores] = LRUCache(
+    maxsize=10_000,
+    ttl=60 * 60,
+)  # {(user_id, mode): top_scores, ...}
+
+# the ids of players' unlocked achievements; expired so that
+# achievements granted or revoked in sql by hand are picked up.
+user_achievements: LRUCache[int, set[int]] = LRUCache(
+    maxsize=10_000,
+    ttl=60 * 60,
+)  # {user_id: {achievement_id, ...}, ...}
+
+# beatmaps' in-game leaderboards, sized by the score rows they hold;
+# expired so that scores edited in sql by hand are picked up.
+leaderboards: LRUCache[tuple[str, int, str], Leaderboard] = LRUCache(
+    maxsize=1_000_000,
+    ttl=60 * 60,
+)  # {(map_md5, mode, scoring_metric): leaderboard, ...}
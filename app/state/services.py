@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import ipaddress
 import pickle
 import re
 import secrets
 from collections.abc import AsyncGenerator
+from collections.abc import Coroutine
 from collections.abc import Mapping
-from collections.abc import MutableMapping
 from pathlib import Path
+from typing import Any
 from typing import TYPE_CHECKING
 from typing import TypedDict
+from typing import TypeVar
 
 import databases
 import datadog as datadog_module
@@ -25,10 +29,19 @@ from app.logging import Ansi
 from app.logging import log
 from app.logging import printc
 from app.logging import Rainbow
+from app.utils import LRUCache
+
+try:
+    import maxminddb
+
+    HAS_MAXMINDDB = True
+except ModuleNotFoundError:
+    HAS_MAXMINDDB = False
 
 if TYPE_CHECKING:
     import databases.core
 
+T = TypeVar("T")
 
 STRANGE_LOG_DIR = Path.cwd() / ".data/logs"
 
@@ -52,6 +65,34 @@ if str(app.settings.DATADOG_API_KEY) and str(app.settings.DATADOG_APP_KEY):
 
 ip_resolver: IPResolver
 
+geoip_reader: maxminddb.Reader | None = None
+if app.settings.MMD_DB_PATH:
+    if HAS_MAXMINDDB:
+        geoip_reader = maxminddb.open_database(
+            app.settings.MMD_DB_PATH,
+            mode=maxminddb.MODE_MMAP,
+        )
+
+        # NOTE: only city databases include the locations of ips
+        if "City" not in geoip_reader.metadata().database_type:
+            log(
+                "MMD_DB_PATH is not a city database; ip-api will be used instead.",
+                Ansi.LYELLOW,
+            )
+    else:
+        log("MMD_DB_PATH is set, but maxminddb is not installed.", Ansi.LYELLOW)
+
+
+def create_task_with_own_connection(
+    coro: Coroutine[Any, Any, T],
+) -> asyncio.Task[T]:
+    """Run `coro` in a task which uses its own pooled database connection."""
+    # NOTE: `databases` stores the current connection in a contextvar,
+    # which tasks inherit from their creator; without an empty context,
+    # the task would share (and serialize its queries on) our connection.
+    return asyncio.create_task(coro, context=contextvars.Context())
+
+
 """ session usecases """
 
 
@@ -104,9 +145,16 @@ country_codes = {
 # fmt: on
 
 
+# {ip: geoloc, ...}; only for geolocations resolved from the ip
+geoloc_cache: LRUCache[IPAddress, Geolocation] = LRUCache(
+    maxsize=10_000,
+    ttl=24 * 60 * 60,
+)
+
+
 class IPResolver:
     def __init__(self) -> None:
-        self.cache: MutableMapping[str, IPAddress] = {}
+        self.cache: LRUCache[str, IPAddress] = LRUCache(maxsize=10_000)
 
     def get_ip(self, headers: Mapping[str, str]) -> IPAddress:
         """Resolve the IP address from the headers."""
@@ -195,6 +243,51 @@ def __fetch_geoloc_nginx(headers: Mapping[str, str]) -> Geolocation | None:
 
 
 async def _fetch_geoloc_from_ip(ip: IPAddress) -> Geolocation | None:
+    """Fetch geolocation data based on ip, from cache if possible."""
+    geoloc = geoloc_cache.get(ip)
+    if geoloc is not None:
+        return geoloc
+
+    if geoip_reader is not None:
+        geoloc = _fetch_geoloc_from_mmdb(ip)
+
+    if geoloc is None:
+        geoloc = await _fetch_geoloc_from_ip_api(ip)
+
+    if geoloc is not None:
+        geoloc_cache[ip] = geoloc
+
+    return geoloc
+
+
+def _fetch_geoloc_from_mmdb(ip: IPAddress) -> Geolocation | None:
+    """Fetch geolocation data based on ip (using a local geoip database)."""
+    assert geoip_reader is not None
+
+    record: Any = geoip_reader.get(str(ip))
+    if not record:
+        return None
+
+    country = record.get("country") or record.get("registered_country")
+    location = record.get("location")
+    if not country or not location:
+        return None
+
+    acronym = country["iso_code"].lower()
+    if acronym not in country_codes:
+        return None
+
+    return {
+        "latitude": location["latitude"],
+        "longitude": location["longitude"],
+        "country": {
+            "acronym": acronym,
+            "numeric": country_codes[acronym],
+        },
+    }
+
+
+async def _fetch_geoloc_from_ip_api(ip: IPAddress) -> Geolocation | None:
     """Fetch geolocation data based on ip (using ip-api)."""
     if not ip.is_private:
         url = f"http://ip-api.com/line/{ip}"
@@ -1,8 +1,27 @@
 from __future__ import annotations
 
+import ast
+from collections.abc import Iterable
+from types import CodeType
+from typing import TYPE_CHECKING
+
 import app.repositories.achievements
+import app.repositories.user_achievements
+import app.state
+from app.logging import Ansi
+from app.logging import log
 from app.repositories.achievements import Achievement
 
+if TYPE_CHECKING:
+    from app.objects.score import Score
+
+VANILLA_MODES = range(4)
+
+_achievements: dict[int, Achievement] = {}
+
+# {mode_vn: [(achievement id, compiled condition), ...], ...}
+_checks: dict[int, list[tuple[int, CodeType]]] = {}
+
 
 async def create(
     file: str,
@@ -16,6 +35,7 @@ async def create(
         desc,
         cond,
     )
+    await load()
     return achievement
 
 
@@ -28,3 +48,127 @@ async def fetch_many(
         page_size,
     )
     return achievements
+
+
+def _get_condition_mode(condition: ast.expr) -> int | None:
+    """\
+    Get the mode an achievement's condition is restricted to, if it
+    requires `mode_vn == <mode>` (on its own, or as part of an `and`).
+    """
+    if isinstance(condition, ast.BoolOp) and isinstance(condition.op, ast.And):
+        for value in condition.values:
+            mode = _get_condition_mode(value)
+            if mode is not None:
+                return mode
+
+    if (
+        isinstance(condition, ast.Compare)
+        and len(condition.ops) == 1
+        and isinstance(condition.ops[0], ast.Eq)
+    ):
+        left, right = condition.left, condition.comparators[0]
+        if isinstance(left, ast.Constant):
+            left, right = right, left
+
+        if (
+            isinstance(left, ast.Name)
+            and left.id == "mode_vn"
+            and isinstance(right, ast.Constant)
+            and right.value in VANILLA_MODES
+        ):
+            return int(right.value)
+
+    return None
+
+
+def load_achievements(achievements: Iterable[Achievement]) -> None:
+    """Compile a set of achievements' conditions, replacing the current ones."""
+    valid_achievements: dict[int, Achievement] = {}
+    checks: dict[int, list[tuple[int, CodeType]]] = {m: [] for m in VANILLA_MODES}
+
+    for achievement in achievements:
+        filename = f"<achievement {achievement['id']}>"
+        try:
+            tree = ast.parse(achievement["cond"], filename, mode="eval")
+            code = compile(tree, filename, mode="eval")
+        except (SyntaxError, ValueError):
+            log(f"Invalid condition for achievement {achievement['name']}", Ansi.LRED)
+            continue
+
+        valid_achievements[achievement["id"]] = achievement
+
+        mode = _get_condition_mode(tree.body)
+        for mode_vn in VANILLA_MODES if mode is None else (mode,):
+            checks[mode_vn].append((achievement["id"], code))
+
+    _achievements.clear()
+    _achievements.update(valid_achievements)
+
+    _checks.clear()
+    _checks.update(checks)
+
+
+async def load() -> None:
+    """(Re)load & compile all achievements from sql."""
+    load_achievements(await app.repositories.achievements.fetch_many())
+
+
+async def fetch_unlocked(user_id: int) -> set[int]:
+    """Fetch the ids of a player's unlocked achievements."""
+    unlocked = app.state.cache.user_achievements.get(user_id)
+    if unlocked is None:
+        user_achievements = await app.repositories.user_achievements.fetch_many(
+            user_id,
+        )
+
+        # another request may have fetched (& updated) them in the meantime
+        unlocked = app.state.cache.user_achievements.get(user_id)
+        if unlocked is None:
+            unlocked = {a["achid"] for a in user_achievements}
+            app.state.cache.user_achievements[user_id] = unlocked
+
+    return unlocked
+
+
+async def unlock_for_score(score: Score) -> list[Achievement]:
+    """\
+    Check which achievements a player has newly unlocked with a score.
+
+    The achievements are marked as unlocked in the player's cached set;
+    the caller is responsible for persisting them, & for calling
+    `forget_unlocked` for any which fail to be.
+    """
+    assert score.player is not None
+
+    unlocked = await fetch_unlocked(score.player.id)
+
+    mode_vn = score.mode.as_vanilla
+    namespace = {"score": score, "mode_vn": mode_vn}
+
+    newly_unlocked: list[Achievement] = []
+    for achievement_id, condition in _checks.get(mode_vn, []):
+        if achievement_id in unlocked:
+            continue
+
+        try:
+            if not eval(condition, namespace):
+                continue
+        except Exception as exc:
+            log(
+                f"Failed to check achievement {achievement_id} "
+                f"for {score.player}: {exc!r}",
+                Ansi.LRED,
+            )
+            continue
+
+        unlocked.add(achievement_id)
+        newly_unlocked.append(_achievements[achievement_id])
+
+    return newly_unlocked
+
+
+def forget_unlocked(user_id: int, achievement_id: int) -> None:
+    """Unmark an achievement which failed to be persisted as unlocked."""
+    unlocked = app.state.cache.user_achievements.get(user_id)
+    if unlocked is not None:
+        unlocked.discard(achievement_id)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import date
+from pathlib import Path
+
+import orjson
+
+import app.state
+from app.logging import Ansi
+from app.logging import log
+
+OSU_API_V2_CHANGELOG_URL = "https://osu.ppy.sh/api/v2/changelog"
+
+# the allowlists are persisted here after each refresh, and used
+# to seed the cache on startup (e.g. for offline boots & tests).
+SEED_PATH = Path.cwd() / ".data/client_versions.json"
+
+# allowlists older than this are served while being refreshed in the background
+ALLOWLIST_TTL = 10 * 60
+
+# after a failed refresh, the osu! api isn't retried for this long
+FAILED_REFRESH_TTL = 30
+
+# {stream: (fetched_at, versions), ...}
+_allowlists: dict[str, tuple[float, frozenset[date]]] = {}
+_refreshes: dict[str, asyncio.Task[frozenset[date] | None]] = {}
+
+# {stream: failed_at, ...}
+_failed_refreshes: dict[str, float] = {}
+
+
+def load_seed(path: Path | None = None) -> None:
+    """Seed the allowlist cache from a local file, if it exists."""
+    path = path or SEED_PATH
+    if not path.exists():
+        return
+
+    seed: dict[str, list[str]] = orjson.loads(path.read_bytes())
+    for stream, versions in seed.items():
+        # treat seeded allowlists as stale, so they're refreshed on first use
+        _allowlists[stream] = (0.0, frozenset(map(date.fromisoformat, versions)))
+
+
+async def _save_seed() -> None:
+    seed = {
+        stream: sorted(v.isoformat() for v in versions)
+        for stream, (_, versions) in _allowlists.items()
+    }
+    await asyncio.to_thread(SEED_PATH.write_bytes, orjson.dumps(seed))
+
+
+async def _fetch_allowed_versions(stream: str) -> frozenset[date]:
+    """Fetch the allowed client versions for `stream` from the osu! api."""
+    response = await app.state.services.http_client.get(
+        OSU_API_V2_CHANGELOG_URL,
+        params={"stream": stream},
+    )
+    response.raise_for_status()
+
+    allowed_versions = set()
+
+    for build in response.json()["builds"]:
+        version = date(
+            int(build["version"][0:4]),
+            int(build["version"][4:6]),
+            int(build["version"][6:8]),
+        )
+        allowed_versions.add(version)
+
+        if any(entry["major"] for entry in build["changelog_entries"]):
+            # this build is a major iteration to the client
+            # don't allow anything older than this
+            break
+
+    return frozenset(allowed_versions)
+
+
+async def _refresh(stream: str) -> frozenset[date] | None:
+    try:
+        versions = await _fetch_allowed_versions(stream)
+    except Exception as exc:
+        log(f"Failed to refresh {stream} client versions: {exc!r}", Ansi.LRED)
+        _failed_refreshes[stream] = time.time()
+        return None
+    finally:
+        del _refreshes[stream]
+
+    _allowlists[stream] = (time.time(), versions)
+    _failed_refreshes.pop(stream, None)
+
+    try:
+        await _save_seed()
+    except OSError as exc:
+        log(f"Failed to save client versions: {exc!r}", Ansi.LYELLOW)
+
+    return versions
+
+
+def _failed_recently(stream: str) -> bool:
+    failed_at = _failed_refreshes.get(stream)
+    return failed_at is not None and time.time() - failed_at < FAILED_REFRESH_TTL
+
+
+def _refresh_soon(stream: str) -> asyncio.Task[frozenset[date] | None]:
+    """Refresh `stream`'s allowlist, unless a refresh is already underway."""
+    task = _refreshes.get(stream)
+    if task is None:
+        task = asyncio.create_task(_refresh(stream))
+        _refreshes[stream] = task
+
+    return task
+
+
+async def get_allowed_versions(stream: str) -> frozenset[date] | None:
+    """\
+    Get the allowed client versions for `stream`.
+
+    Stale allowlists are returned immediately & refreshed in the background;
+    None is returned if no allowlist is available (e.g. the osu! api is down).
+    """
+    cached = _allowlists.get(stream)
+    if cached is None:
+        if _failed_recently(stream):
+            return None
+
+        # NOTE: shielded, as other requests may be waiting on the refresh
+        return await asyncio.shield(_refresh_soon(stream))
+
+    fetched_at, versions = cached
+    if time.time() - fetched_at > ALLOWLIST_TTL and not _failed_recently(stream):
+        _refresh_soon(stream)
+
+    return versions
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+
+import app.state
+from app.logging import Ansi
+from app.logging import log
+from app.utils import BloomFilter
+
+# the filter is sized for (at least) this many times the number of scores
+# at the time it's built, leaving room for new submissions before it needs
+# to be rebuilt; it's rebuilt once it's full.
+CAPACITY_FACTOR = 2
+MIN_CAPACITY = 1_000_000
+ERROR_RATE = 0.001
+
+# scores are loaded in batches, & added to the filter in smaller
+# ones, so that the event loop isn't blocked while it's built.
+LOAD_BATCH_SIZE = 10_000
+ADD_BATCH_SIZE = 1_000
+
+# a filter of the online checksums of all submitted scores; if a checksum
+# isn't in the filter, the score is certainly not a duplicate.
+_filter: BloomFilter | None = None
+
+# a filter being built from sql, to replace the current one
+_loading: BloomFilter | None = None
+_load_task: asyncio.Task[None] | None = None
+
+
+async def _load() -> None:
+    global _filter, _loading
+
+    max_id = await app.state.services.database.fetch_val(
+        "SELECT COALESCE(MAX(id), 0) FROM scores",
+    )
+    _loading = BloomFilter(
+        capacity=max(max_id * CAPACITY_FACTOR, MIN_CAPACITY),
+        error_rate=ERROR_RATE,
+    )
+
+    try:
+        last_id = 0
+        while True:
+            rows = await app.state.services.database.fetch_all(
+                "SELECT id, online_checksum FROM scores "
+                "WHERE id > :last_id ORDER BY id LIMIT :limit",
+                {"last_id": last_id, "limit": LOAD_BATCH_SIZE},
+            )
+            if not rows:
+                break
+
+            for i in range(0, len(rows), ADD_BATCH_SIZE):
+                for row in rows[i : i + ADD_BATCH_SIZE]:
+                    _loading.add(row["online_checksum"])
+
+                # let other tasks run between batches
+                await asyncio.sleep(0)
+
+            last_id = rows[-1]["id"]
+    except Exception as exc:
+        log(f"Failed to load the duplicate score filter: {exc!r}", Ansi.LRED)
+    else:
+        _filter = _loading
+        log(f"Loaded {len(_filter)} score checksums.", Ansi.LCYAN)
+    finally:
+        _loading = None
+
+
+def start() -> None:
+    """Start building the duplicate score filter from sql, in the background."""
+    global _load_task
+
+    if _load_task is not None and not _load_task.done():
+        return
+
+    _load_task = app.state.services.create_task_with_own_connection(_load())
+
+
+async def stop() -> None:
+    """Stop building the duplicate score filter, if it's still underway."""
+    if _load_task is not None and not _load_task.done():
+        _load_task.cancel()
+        await asyncio.gather(_load_task, return_exceptions=True)
+
+
+def add(checksum: str) -> None:
+    """Add a newly submitted score's online checksum to the filter."""
+    for checksum_filter in (_filter, _loading):
+        if checksum_filter is not None:
+            checksum_filter.add(checksum)
+
+    if _filter is not None and len(_filter) > _filter.capacity:
+        # the filter's error rate grows beyond its capacity
+        start()
+
+
+async def is_duplicate(checksum: str) -> bool:
+    """Check whether a score with an online checksum has already been submitted."""
+    if _filter is not None and checksum not in _filter:
+        if app.state.services.datadog:
+            app.state.services.datadog.increment(
+                "bancho.duplicate_scores.filter",
+                tags=["result:negative"],
+            )
+        return False
+
+    if _filter is not None and app.state.services.datadog:
+        app.state.services.datadog.increment(
+            "bancho.duplicate_scores.filter",
+            tags=["result:positive"],
+        )
+
+    return (
+        await app.state.services.database.fetch_one(
+            "SELECT 1 FROM scores WHERE online_checksum = :checksum",
+            {"checksum": checksum},
+        )
+        is not None
+    )
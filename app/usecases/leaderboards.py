@@ -0,0 +1,179 @@
+"""\
+A cache of beatmaps' in-game global leaderboards.
+
+Leaderboards are loaded from sql on their first request, then kept up to
+date by score submission; they're invalidated whenever scores change in
+other ways (e.g. restrictions, or wiped maps).
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+from typing import Any
+
+import app.state
+from app.objects.leaderboard import Leaderboard
+from app.objects.leaderboard import ScoringMetric
+from app.usecases import map_ranks
+
+if TYPE_CHECKING:
+    from app.objects.score import Score
+
+LeaderboardKey = tuple[str, int, ScoringMetric]  # (map_md5, mode, scoring_metric)
+
+# {key: load, ...}
+_loads: dict[LeaderboardKey, asyncio.Task[Leaderboard]] = {}
+
+# loads which began before a change to their leaderboard,
+# & so may be out of date; they're not added to the cache.
+_stale_loads: set[LeaderboardKey] = set()
+
+
+def _report(result: str) -> None:
+    if app.state.services.datadog:
+        app.state.services.datadog.increment(
+            "bancho.leaderboards.cache",
+            tags=[f"result:{result}"],
+        )
+
+
+async def _load(key: LeaderboardKey) -> Leaderboard:
+    try:
+        async with app.state.services.database.connection() as db_conn:
+            leaderboard = await Leaderboard.from_sql(*key, db_conn)
+
+        if key not in _stale_loads:
+            app.state.cache.leaderboards.set(
+                key, leaderboard, size=leaderboard.size + 1
+            )
+
+        return leaderboard
+    finally:
+        _stale_loads.discard(key)
+        del _loads[key]
+
+
+async def fetch(
+    map_md5: str,
+    mode: int,
+    scoring_metric: ScoringMetric,
+) -> Leaderboard:
+    """Fetch a beatmap's leaderboard in a given mode from the cache, or sql."""
+    key = (map_md5, mode, scoring_metric)
+
+    leaderboard = app.state.cache.leaderboards.get(key)
+    if leaderboard is not None and not leaderboard.stale:
+        _report("hit")
+        return leaderboard
+
+    _report("miss")
+
+    # only load each leaderboard once, however many players request it
+    load = _loads.get(key)
+    if load is None:
+        load = app.state.services.create_task_with_own_connection(_load(key))
+        _loads[key] = load
+
+    return await asyncio.shield(load)
+
+
+async def get_leaderboard_scores(
+    map_md5: str,
+    mode: int,
+    user_id: int,
+    scoring_metric: ScoringMetric,
+) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
+    """\
+    Get the top scores on a beatmap's global leaderboard, & a player's
+    personal best (with its rank), if they have one.
+
+    The player must be unrestricted; restricted players' own scores
+    are shown on their leaderboards, which the cache doesn't include.
+    """
+    leaderboard = await fetch(map_md5, mode, scoring_metric)
+    if not leaderboard.scores:
+        return [], None
+
+    # NOTE: players' best scores are looked up in the map's ranks first,
+    # so that those of players without one aren't queried from sql.
+    if await map_ranks.get_best_score(map_md5, mode, user_id) is None:
+        return leaderboard.scores, None
+
+    async with app.state.services.database.connection() as db_conn:
+        personal_best = await leaderboard.fetch_personal_best(
+            map_md5,
+            mode,
+            scoring_metric,
+            user_id,
+            db_conn,
+        )
+
+    _resize((map_md5, mode, scoring_metric), leaderboard)
+
+    if personal_best is not None:
+        rank = await map_ranks.get_placement(map_md5, mode, personal_best["_score"])
+
+        # NOTE: the client is sent the requesting player's own name & id
+        personal_best = {
+            k: v for k, v in personal_best.items() if k not in ("userid", "name")
+        } | {"rank": rank}
+
+    return leaderboard.scores, personal_best
+
+
+def _resize(key: LeaderboardKey, leaderboard: Leaderboard) -> None:
+    # NOTE: the leaderboard may have been replaced in the meantime
+    if app.state.cache.leaderboards.get(key) is leaderboard:
+        app.state.cache.leaderboards.resize(key, leaderboard.size + 1)
+
+
+def add_score(score: Score) -> None:
+    """Add a new best score to its beatmap's cached leaderboard."""
+    assert score.id is not None
+    assert score.bmap is not None
+    assert score.player is not None
+
+    scoring_metric = map_ranks.get_scoring_metric(score.mode)
+    key = (score.bmap.md5, int(score.mode), scoring_metric)
+
+    if key in _loads:
+        _stale_loads.add(key)
+
+    leaderboard = app.state.cache.leaderboards.get(key)
+    if leaderboard is None:
+        return
+
+    leaderboard.add(
+        {
+            "id": score.id,
+            "_score": round(score.pp, 3) if scoring_metric == "pp" else score.score,
+            "max_combo": score.max_combo,
+            "n50": score.n50,
+            "n100": score.n100,
+            "n300": score.n300,
+            "nmiss": score.nmiss,
+            "nkatu": score.nkatu,
+            "ngeki": score.ngeki,
+            "perfect": int(score.perfect),
+            "mods": int(score.mods),
+            "time": int(score.server_time.timestamp()),
+            "userid": score.player.id,
+            "name": score.player.full_name,
+        },
+    )
+    _resize(key, leaderboard)
+
+
+def invalidate_map(map_md5: str) -> None:
+    """Remove a beatmap's leaderboards (in all modes) from the cache."""
+    for key in app.state.cache.leaderboards.keys():
+        if key[0] == map_md5:
+            app.state.cache.leaderboards.pop(key)
+
+    _stale_loads.update(key for key in _loads if key[0] == map_md5)
+
+
+def invalidate_all() -> None:
+    """Remove all leaderboards from the cache."""
+    app.state.cache.leaderboards.clear()
+    _stale_loads.update(_loads)
@@ -0,0 +1,222 @@
+"""\
+Per-map redis sorted sets of unrestricted players' best scores, used to
+find the placement of a score on a beatmap's leaderboard.
+
+Each set holds {user_id: metric} for a map & mode, with leaderboards in
+relax & autopilot ranked by pp, and the others by score. Sets are built
+from sql the first time they're needed, then kept up to date by score
+submission, restrictions, and anything else which deletes scores.
+
+A built set always contains a sentinel member, so that a built set with
+no scores can be told apart from one which has not been built.
+
+Sets expire when they've not been used for a while, so only the sets of
+maps which are being played are kept in redis.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import uuid
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+import app.state
+from app.constants.gamemodes import GameMode
+
+if TYPE_CHECKING:
+    from app.objects.leaderboard import ScoringMetric
+    from app.objects.score import Score
+
+KEY_PREFIX = "bancho:map_ranks"
+
+# the sentinel member; its score is below any real score's
+SENTINEL = ""
+
+# the seconds after their last use that sets expire
+TTL = 60 * 60 * 24 * 7
+
+# the modes which have leaderboards
+MODES = (
+    GameMode.VANILLA_OSU,
+    GameMode.VANILLA_TAIKO,
+    GameMode.VANILLA_CATCH,
+    GameMode.VANILLA_MANIA,
+    GameMode.RELAX_OSU,
+    GameMode.RELAX_TAIKO,
+    GameMode.RELAX_CATCH,
+    GameMode.AUTOPILOT_OSU,
+)
+
+# {key: build, ...}
+_builds: dict[str, asyncio.Task[None]] = {}
+
+# builds which began before a change to their map's scores,
+# & so may be out of date; their sets are discarded.
+_stale_builds: set[str] = set()
+
+
+def get_scoring_metric(mode: int) -> ScoringMetric:
+    """Get the metric leaderboards in a given mode are ranked by."""
+    return "pp" if mode >= GameMode.RELAX_OSU else "score"
+
+
+def get_key(map_md5: str, mode: int) -> str:
+    return f"{KEY_PREFIX}:{map_md5}:{int(mode)}"
+
+
+async def fetch_best_scores(map_md5: str, mode: int) -> dict[str, float]:
+    """Fetch the metric of each unrestricted player's best score from sql."""
+    scoring_metric = get_scoring_metric(mode)
+    rows = await app.state.services.database.fetch_all(
+        f"SELECT s.userid, s.{scoring_metric} FROM scores s "
+        "INNER JOIN users u ON u.id = s.userid "
+        "WHERE s.map_md5 = :map_md5 AND s.mode = :mode "
+        "AND s.status = 2 AND u.priv & 1",
+        {"map_md5": map_md5, "mode": mode},
+    )
+    return {str(row[0]): row[1] for row in rows}
+
+
+async def store(key: str, scores: dict[str, float], replace: bool = False) -> None:
+    """\
+    Atomically store a built set of best scores.
+
+    Unless `replace` is True, the set is left as-is if it's already built.
+    """
+    build_key = f"{key}:build:{uuid.uuid4()}"
+
+    async with app.state.services.redis.pipeline() as pipe:
+        pipe.zadd(build_key, {SENTINEL: -math.inf} | scores)
+        if replace:
+            pipe.rename(build_key, key)
+        else:
+            pipe.renamenx(build_key, key)
+        pipe.delete(build_key)
+        pipe.expire(key, TTL)
+        await pipe.execute()
+
+
+async def _build(map_md5: str, mode: int) -> None:
+    key = get_key(map_md5, mode)
+    try:
+        scores = await fetch_best_scores(map_md5, mode)
+        if key not in _stale_builds:
+            await store(key, scores)
+    finally:
+        _stale_builds.discard(key)
+        del _builds[key]
+
+
+async def ensure_built(map_md5: str, mode: int) -> str:
+    """\
+    Build the set for a map & mode if it isn't built, or refresh its
+    expiry if it is; return its key.
+    """
+    key = get_key(map_md5, mode)
+
+    # NOTE: the set may not exist after a build, if it was discarded
+    while not await app.state.services.redis.expire(key, TTL):
+        # only build each set once, however many requests need it
+        build = _builds.get(key)
+        if build is None:
+            build = app.state.services.create_task_with_own_connection(
+                _build(map_md5, mode),
+            )
+            _builds[key] = build
+
+        await asyncio.shield(build)
+
+    return key
+
+
+async def get_placement(map_md5: str, mode: int, value: float) -> int:
+    """Get the placement a score with a given metric would have on a map."""
+    key = await ensure_built(map_md5, mode)
+
+    num_better_scores: int = await app.state.services.redis.zcount(
+        key,
+        f"({value}",
+        "+inf",
+    )
+    return num_better_scores + 1
+
+
+async def get_best_score(map_md5: str, mode: int, user_id: int) -> float | None:
+    """Get the metric of a player's best score on a map, if they have one."""
+    key = await ensure_built(map_md5, mode)
+
+    value: float | None = await app.state.services.redis.zscore(key, str(user_id))
+    return value
+
+
+async def add_score(score: Score) -> None:
+    """\
+    Set a player's new best score on its map & mode.
+
+    The score must already be saved in sql; if the set hasn't been
+    built yet, it will be built with the score included.
+    """
+    assert score.bmap is not None
+    assert score.player is not None
+
+    # NOTE: pp is stored with 3 decimal places in sql
+    if get_scoring_metric(score.mode) == "pp":
+        value: float = round(score.pp, 3)
+    else:
+        value = score.score
+
+    key = await ensure_built(score.bmap.md5, score.mode)
+    await app.state.services.redis.zadd(key, {str(score.player.id): value})
+
+
+async def _fetch_player_best_scores(user_id: int) -> list[tuple[str, int, float]]:
+    rows = await app.state.services.database.fetch_all(
+        "SELECT map_md5, mode, score, pp FROM scores "
+        "WHERE userid = :user_id AND status = 2",
+        {"user_id": user_id},
+    )
+    return [
+        (row["map_md5"], row["mode"], row[get_scoring_metric(row["mode"])])
+        for row in rows
+    ]
+
+
+async def remove_player(user_id: int) -> None:
+    """Remove a (newly restricted) player's best scores from all sets."""
+    # sets being built may have been fetched with the player's scores
+    _stale_builds.update(_builds)
+
+    best_scores = await _fetch_player_best_scores(user_id)
+
+    async with app.state.services.redis.pipeline(transaction=False) as pipe:
+        for map_md5, mode, _ in best_scores:
+            pipe.zrem(get_key(map_md5, mode), str(user_id))
+        await pipe.execute()
+
+
+async def add_player(user_id: int) -> None:
+    """Add a (newly unrestricted) player's best scores to all built sets."""
+    # sets being built may have been fetched without the player's scores
+    _stale_builds.update(_builds)
+
+    best_scores = await _fetch_player_best_scores(user_id)
+
+    async with app.state.services.redis.pipeline(transaction=False) as pipe:
+        for map_md5, mode, _ in best_scores:
+            pipe.exists(get_key(map_md5, mode))
+        built = await pipe.execute()
+
+        for (map_md5, mode, value), is_built in zip(best_scores, built):
+            if is_built:
+                pipe.zadd(get_key(map_md5, mode), {str(user_id): value})
+        await pipe.execute()
+
+
+async def invalidate_maps(map_md5s: Iterable[str]) -> None:
+    """Remove the sets of maps (in all modes), after their scores changed."""
+    keys = [get_key(map_md5, mode) for map_md5 in map_md5s for mode in MODES]
+    _stale_builds.update(key for key in keys if key in _builds)
+
+    if keys:
+        await app.state.services.redis.delete(*keys)
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+import app.settings
+import app.state
+import app.utils
+from app.logging import Ansi
+from app.logging import log
+from app.utils import LRUCache
+
+OSU_FILES_PATH = Path.cwd() / ".data/osu"
+
+# .osu files are sharded into this many subdirectories by beatmap id,
+# to avoid a single directory with hundreds of thousands of files.
+SHARD_COUNT = 1000
+
+
+class OsuFileInfo(NamedTuple):
+    size: int
+    mtime_ns: int
+    md5: str
+
+
+# the md5s of the .osu files we've read; a file is only
+# hashed again if its size or modification time changes.
+_index: LRUCache[Path, OsuFileInfo] = LRUCache(maxsize=100_000)
+
+# {bmap_id: download, ...}
+_downloads: dict[int, asyncio.Task[bool]] = {}
+
+
+def get_osu_file_path(bmap_id: int) -> Path:
+    """Get the path of a beatmap's .osu file in the store."""
+    return OSU_FILES_PATH / f"{bmap_id % SHARD_COUNT:03d}" / f"{bmap_id}.osu"
+
+
+def _stat(path: Path) -> os.stat_result | None:
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+
+def _hash_file(path: Path) -> str:
+    return hashlib.md5(path.read_bytes()).hexdigest()
+
+
+async def _get_md5(path: Path) -> str | None:
+    """Get the md5 of a .osu file, hashing it only if it's changed."""
+    stat = _stat(path)
+    if stat is None:
+        return None
+
+    info = _index.get(path)
+    if info is None or (info.size, info.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+        md5 = await asyncio.to_thread(_hash_file, path)
+        info = OsuFileInfo(stat.st_size, stat.st_mtime_ns, md5)
+        _index[path] = info
+
+    return info.md5
+
+
+def _write_file(path: Path, content: bytes) -> os.stat_result:
+    path.parent.mkdir(exist_ok=True)
+
+    # write atomically, so a partially written
+    # file is never read by another request.
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_bytes(content)
+    tmp_path.replace(path)
+
+    return path.stat()
+
+
+async def _download_osu_file(bmap_id: int) -> bool:
+    """Download a beatmap's .osu file from the osu!api into the store."""
+    if app.settings.DEBUG:
+        log(f"Doing osu!api (.osu file) request {bmap_id}", Ansi.LMAGENTA)
+
+    url = f"https://old.ppy.sh/osu/{bmap_id}"
+    response = await app.state.services.http_client.get(url)
+    if response.status_code != 200:
+        if 400 <= response.status_code < 500:
+            # client error, report this to cmyui
+            stacktrace = app.utils.get_appropriate_stacktrace()
+            await app.state.services.log_strange_occurrence(stacktrace)
+        return False
+
+    content = response.read()
+    path = get_osu_file_path(bmap_id)
+
+    stat = await asyncio.to_thread(_write_file, path, content)
+    md5 = hashlib.md5(content).hexdigest()
+    _index[path] = OsuFileInfo(stat.st_size, stat.st_mtime_ns, md5)
+
+    return True
+
+
+async def _download_once(bmap_id: int) -> bool:
+    """Download a beatmap's .osu file, unless a download is already underway."""
+    task = _downloads.get(bmap_id)
+    if task is None:
+        task = asyncio.create_task(_download_osu_file(bmap_id))
+        _downloads[bmap_id] = task
+        task.add_done_callback(lambda _: _downloads.pop(bmap_id, None))
+
+    return await asyncio.shield(task)
+
+
+async def ensure_local_osu_file(bmap_id: int, bmap_md5: str) -> Path | None:
+    """\
+    Ensure we have the latest .osu file for a beatmap locally,
+    downloading it from the osu!api if required.
+
+    Returns the path of the file, or None if it could not be downloaded.
+    """
+    path = get_osu_file_path(bmap_id)
+
+    if await _get_md5(path) == bmap_md5:
+        return path
+
+    # move .osu files from the old (flat) layout into the store
+    legacy_path = OSU_FILES_PATH / f"{bmap_id}.osu"
+    if legacy_path.exists():
+        path.parent.mkdir(exist_ok=True)
+        legacy_path.replace(path)
+
+        if await _get_md5(path) == bmap_md5:
+            return path
+
+    if not await _download_once(bmap_id):
+        return None
+
+    return path
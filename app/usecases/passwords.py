@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+import bcrypt
+
+import app.settings
+import app.state
+
+T = TypeVar("T")
+
+# bcrypt is intentionally slow (~200ms per call), so we run it in a
+# bounded pool of threads to avoid blocking the event loop.
+_executor = ThreadPoolExecutor(
+    max_workers=app.settings.BCRYPT_MAX_THREADS,
+    thread_name_prefix="bcrypt",
+)
+
+# the number of bcrypt calls submitted which are yet to complete
+pending = 0
+
+
+async def _run_in_executor(func: Callable[..., T], *args: object) -> T:
+    global pending
+
+    pending += 1
+    queue_depth = max(0, pending - app.settings.BCRYPT_MAX_THREADS)
+
+    if app.state.services.datadog:
+        app.state.services.datadog.gauge("bancho.bcrypt.queue_depth", queue_depth)
+
+    st = time.perf_counter_ns()
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, func, *args)
+    finally:
+        pending -= 1
+
+        if app.state.services.datadog:
+            time_taken = (time.perf_counter_ns() - st) / 1e6
+            app.state.services.datadog.histogram("bancho.bcrypt.time", time_taken)
+
+
+async def verify_password(pw_md5: bytes, pw_bcrypt: bytes) -> bool:
+    """Check `pw_md5` against `pw_bcrypt`, using the cache if possible."""
+    cached_md5 = app.state.cache.bcrypt.get(pw_bcrypt)
+    if cached_md5 is not None:  # ~0.01 ms
+        return pw_md5 == cached_md5
+
+    # ~200ms
+    if not await _run_in_executor(bcrypt.checkpw, pw_md5, pw_bcrypt):
+        return False
+
+    app.state.cache.bcrypt[pw_bcrypt] = pw_md5
+    return True
+
+
+async def hash_password(pw_md5: bytes) -> bytes:
+    """Hash `pw_md5` with bcrypt, caching the result for login."""
+    pw_bcrypt = await _run_in_executor(bcrypt.hashpw, pw_md5, bcrypt.gensalt())
+    app.state.cache.bcrypt[pw_bcrypt] = pw_md5
+    return pw_bcrypt
@@ -1,14 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.metadata
 import math
+import multiprocessing
+import os
+import time
 from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
+from typing import Any
+from typing import NamedTuple
 from typing import TypedDict
 
 from akatsuki_pp_py import Beatmap
 from akatsuki_pp_py import Calculator
+from akatsuki_pp_py import DifficultyAttributes
 
+import app.settings
+import app.state
+from app.constants.mods import DIFFICULTY_CHANGING_MODS
 from app.constants.mods import Mods
+from app.logging import Ansi
+from app.logging import log
+from app.repositories import difficulty_attributes as difficulty_attributes_repo
+from app.utils import LRUCache
+
+# difficulty attributes are persisted for each version of the calculator
+CALCULATOR_VERSION = importlib.metadata.version("akatsuki-pp-py")
 
 
 @dataclass
@@ -56,11 +76,57 @@ class PerformanceResult(TypedDict):
     difficulty: DifficultyRating
 
 
-def calculate_performances(
+def difficulty_mods(mods: int) -> int:
+    """Return only the mods which may affect a beatmap's difficulty."""
+    if mods & Mods.NIGHTCORE:
+        mods = (mods & ~Mods.NIGHTCORE) | Mods.DOUBLETIME
+
+    return mods & DIFFICULTY_CHANGING_MODS
+
+
+# parsed beatmaps, and their difficulty attributes for each mode & mods
+# combination are cached by each process calculating performance. the
+# memory used by a parsed beatmap is estimated from its .osu file's size.
+PARSED_BEATMAP_SIZE_FACTOR = 4
+
+_beatmaps: LRUCache[str, Beatmap] = LRUCache(  # {md5: beatmap, ...}
+    maxsize=app.settings.PERFORMANCE_BEATMAP_CACHE_MB * 1024 * 1024,
+)
+_difficulties: LRUCache[tuple[str, int, int], DifficultyAttributes] = LRUCache(
+    maxsize=app.settings.PERFORMANCE_DIFFICULTY_CACHE_SIZE,
+)  # {(md5, mode, mods): difficulty, ...}
+
+
+class CacheStats(NamedTuple):
+    beatmap_hits: int
+    beatmap_misses: int
+    difficulty_hits: int
+    difficulty_misses: int
+
+
+def _get_beatmap(osu_file_path: str, map_md5: str | None) -> Beatmap:
+    if map_md5 is None:
+        return Beatmap(path=osu_file_path)
+
+    calc_bmap = _beatmaps.get(map_md5)
+    if calc_bmap is None:
+        calc_bmap = Beatmap(path=osu_file_path)
+
+        size = os.path.getsize(osu_file_path) * PARSED_BEATMAP_SIZE_FACTOR
+        _beatmaps.set(map_md5, calc_bmap, size=size)
+
+    return calc_bmap
+
+
+def _calculate_performances(
     osu_file_path: str,
     scores: Iterable[ScoreParams],
-) -> list[PerformanceResult]:
-    calc_bmap = Beatmap(path=osu_file_path)
+    map_md5: str | None,
+) -> tuple[list[PerformanceResult], CacheStats]:
+    beatmap_hits, beatmap_misses = _beatmaps.hits, _beatmaps.misses
+    difficulty_hits, difficulty_misses = _difficulties.hits, _difficulties.misses
+
+    calc_bmap = _get_beatmap(osu_file_path, map_md5)
 
     results: list[PerformanceResult] = []
 
@@ -93,8 +159,20 @@ def calculate_performances(
             n_katu=score.nkatu,
             n_misses=score.nmiss,
         )
+
+        difficulty = None
+        if map_md5 is not None:
+            difficulty_key = (map_md5, score.mode, difficulty_mods(score.mods or 0))
+
+            difficulty = _difficulties.get(difficulty_key)
+            if difficulty is not None:
+                calculator.set_difficulty(difficulty)
+
         result = calculator.performance(calc_bmap)
 
+        if map_md5 is not None and difficulty is None:
+            _difficulties[difficulty_key] = result.difficulty
+
         pp = result.pp
 
         if math.isnan(pp) or math.isinf(pp):
@@ -129,4 +207,258 @@ def calculate_performances(
             },
         )
 
+    cache_stats = CacheStats(
+        beatmap_hits=_beatmaps.hits - beatmap_hits,
+        beatmap_misses=_beatmaps.misses - beatmap_misses,
+        difficulty_hits=_difficulties.hits - difficulty_hits,
+        difficulty_misses=_difficulties.misses - difficulty_misses,
+    )
+    return results, cache_stats
+
+
+# NOTE: pp calculation is cpu-bound (tens of ms for harder maps) and holds
+# the gil, so it's run in a pool of processes to keep the event loop free.
+_executor: ProcessPoolExecutor | None = None
+
+# the number of calculations submitted which are yet to complete
+pending = 0
+
+# calculations are only given to the pool once a worker is free for them,
+# so that their timeouts don't include the time spent waiting for one.
+_idle_workers = asyncio.Semaphore(app.settings.PERFORMANCE_MAX_PROCESSES)
+
+
+def _warm_up() -> None:
+    """No-op, used to start the worker processes ahead of time."""
+
+
+def _create_executor() -> ProcessPoolExecutor:
+    # NOTE: we avoid forking, as the server has threads running (e.g. datadog)
+    return ProcessPoolExecutor(
+        max_workers=app.settings.PERFORMANCE_MAX_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+async def start() -> None:
+    """Start the performance calculation worker processes."""
+    global _executor, _idle_workers
+
+    _executor = _create_executor()
+    _idle_workers = asyncio.Semaphore(app.settings.PERFORMANCE_MAX_PROCESSES)
+
+    # spawn (and import the server in) each of
+    # the workers now, rather than on first use.
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        *(
+            loop.run_in_executor(_executor, _warm_up)
+            for _ in range(app.settings.PERFORMANCE_MAX_PROCESSES)
+        ),
+    )
+
+
+async def stop() -> None:
+    """Stop the performance calculation worker processes."""
+    global _executor
+
+    if _executor is not None:
+        executor, _executor = _executor, None
+
+        # NOTE: waiting for the workers to exit blocks
+        await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+
+
+def _report_utilization() -> None:
+    if app.state.services.datadog:
+        busy_workers = min(pending, app.settings.PERFORMANCE_MAX_PROCESSES)
+        app.state.services.datadog.gauge(
+            "bancho.performance.utilization",
+            busy_workers / app.settings.PERFORMANCE_MAX_PROCESSES,
+        )
+        app.state.services.datadog.gauge(
+            "bancho.performance.queue_depth",
+            pending - busy_workers,
+        )
+
+
+def _report_cache_stats(cache_stats: CacheStats) -> None:
+    if app.state.services.datadog:
+        for cache, hits, misses in (
+            ("beatmap", cache_stats.beatmap_hits, cache_stats.beatmap_misses),
+            ("difficulty", cache_stats.difficulty_hits, cache_stats.difficulty_misses),
+        ):
+            tags = [f"cache:{cache}"]
+            app.state.services.datadog.increment(
+                "bancho.performance.cache.hits",
+                hits,
+                tags=tags,
+            )
+            app.state.services.datadog.increment(
+                "bancho.performance.cache.misses",
+                misses,
+                tags=tags,
+            )
+
+
+async def calculate_performances(
+    osu_file_path: str,
+    scores: Iterable[ScoreParams],
+    map_md5: str | None = None,
+) -> list[PerformanceResult]:
+    """\
+    Calculate the performance of one or more scores on a beatmap.
+
+    If `map_md5` is given, the parsed beatmap & its difficulty attributes
+    will be cached for future calls, and the attributes saved to sql.
+
+    Raises `asyncio.TimeoutError` if the calculation takes longer than
+    `PERFORMANCE_CALC_TIMEOUT` seconds, or `BrokenProcessPool` if the
+    worker processes die during it (after retrying once).
+    """
+    scores = list(scores)
+
+    results = await _calculate_performances_in_pool(osu_file_path, scores, map_md5)
+
+    if map_md5 is not None:
+        await _save_difficulties(map_md5, scores, results)
+
+    return results
+
+
+async def _calculate_performances_in_pool(
+    osu_file_path: str,
+    scores: list[ScoreParams],
+    map_md5: str | None,
+    retry: bool = True,
+) -> list[PerformanceResult]:
+    global _executor
+
+    executor = _executor
+    if executor is None:
+        # the worker processes aren't running (e.g. in tools & tests)
+        results, cache_stats = _calculate_performances(
+            osu_file_path,
+            scores,
+            map_md5,
+        )
+        _report_cache_stats(cache_stats)
+        return results
+
+    try:
+        return await _run_in_executor(executor, osu_file_path, scores, map_md5)
+    except BrokenProcessPool:
+        # a worker died (e.g. a crash in the calculator); replace the pool
+        if _executor is executor:
+            log("Performance calculation pool broke; restarting it.", Ansi.LRED)
+
+            executor.shutdown(wait=False)
+            _executor = _create_executor()
+
+        if not retry:
+            raise
+
+        # NOTE: the worker may have died calculating another score
+        return await _calculate_performances_in_pool(
+            osu_file_path,
+            scores,
+            map_md5,
+            retry=False,
+        )
+
+
+async def _run_in_executor(
+    executor: ProcessPoolExecutor,
+    osu_file_path: str,
+    scores: list[ScoreParams],
+    map_md5: str | None,
+) -> list[PerformanceResult]:
+    global pending
+
+    pending += 1
+    _report_utilization()
+
+    st = time.perf_counter_ns()
+
+    try:
+        idle_workers = _idle_workers
+        await idle_workers.acquire()
+
+        loop = asyncio.get_running_loop()
+        try:
+            calculation = loop.run_in_executor(
+                executor,
+                _calculate_performances,
+                osu_file_path,
+                scores,
+                map_md5,
+            )
+        except BaseException:
+            idle_workers.release()
+            raise
+
+        def on_done(calculation: asyncio.Future[Any]) -> None:
+            # NOTE: the worker is busy until the calculation
+            # finishes, even if we've stopped waiting for it.
+            idle_workers.release()
+            if not calculation.cancelled():
+                calculation.exception()  # (mark it as retrieved)
+
+        calculation.add_done_callback(on_done)
+
+        results, cache_stats = await asyncio.wait_for(
+            asyncio.shield(calculation),
+            timeout=app.settings.PERFORMANCE_CALC_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        # NOTE: the worker will continue until the calculation finishes
+        log(f"Performance calculation timed out for {osu_file_path}.", Ansi.LRED)
+
+        if app.state.services.datadog:
+            app.state.services.datadog.increment("bancho.performance.timeouts")
+
+        raise
+    finally:
+        pending -= 1
+        _report_utilization()
+
+        if app.state.services.datadog:
+            time_taken = (time.perf_counter_ns() - st) / 1e6
+            app.state.services.datadog.histogram("bancho.performance.time", time_taken)
+
+    _report_cache_stats(cache_stats)
     return results
+
+
+# the difficulty attributes persisted by this process
+_saved_difficulties: LRUCache[tuple[str, int, int], bool] = LRUCache(
+    maxsize=app.settings.PERFORMANCE_DIFFICULTY_CACHE_SIZE,
+)  # {(md5, mode, mods): True, ...}
+
+
+async def _save_difficulties(
+    map_md5: str,
+    scores: list[ScoreParams],
+    results: list[PerformanceResult],
+) -> None:
+    if not app.state.services.database.is_connected:
+        # e.g. in tools, which use their own database connections
+        return
+
+    for score, result in zip(scores, results):
+        mods = difficulty_mods(score.mods or 0)
+
+        key = (map_md5, score.mode, mods)
+        if key in _saved_difficulties:
+            continue
+
+        await difficulty_attributes_repo.create_or_update(
+            {
+                "map_md5": map_md5,
+                "mode": score.mode,
+                "mods": mods,
+                "calc_version": CALCULATOR_VERSION,
+                **result["difficulty"],
+            },
+        )
+        _saved_difficulties[key] = True
@@ -0,0 +1,154 @@
+"""\
+Global & country player rankings, served from the redis sorted sets of
+unrestricted players' pp (bancho:leaderboard:{mode}[:{country}]), which
+are kept up to date by score submission & restrictions.
+
+A page of the rankings is a ZREVRANGE of the set, with the players' rows
+then fetched from sql in a single query; so fetching a page is O(log n)
+in the number of ranked players, however deep it is.
+
+The sets only include players whose stats have changed since they were
+last built, so a mode's sets are rebuilt from sql on their first read
+if they haven't been built (e.g. after redis' data is lost).
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Iterable
+from typing import Any
+
+import app.state
+from app.constants.gamemodes import GameMode
+
+
+def get_key(mode: GameMode, country: str | None = None) -> str:
+    """Get the key of the sorted set for a mode's global (or country) rankings."""
+    if country is not None:
+        return f"bancho:leaderboard:{mode.value}:{country.lower()}"
+
+    return f"bancho:leaderboard:{mode.value}"
+
+
+def get_built_key(mode: GameMode) -> str:
+    """Get the key marking a mode's rankings as built from sql."""
+    return f"bancho:leaderboard_built:{mode.value}"
+
+
+# {mode: rebuild, ...}
+_rebuilds: dict[GameMode, asyncio.Task[int]] = {}
+
+
+async def _rebuild(mode: GameMode) -> int:
+    try:
+        return await rebuild(mode)
+    finally:
+        del _rebuilds[mode]
+
+
+async def ensure_built(mode: GameMode) -> None:
+    """Rebuild a mode's rankings from sql, if they haven't been built."""
+    if await app.state.services.redis.exists(get_built_key(mode)):
+        return
+
+    # only rebuild each mode once, however many requests need it
+    rebuild_task = _rebuilds.get(mode)
+    if rebuild_task is None:
+        rebuild_task = app.state.services.create_task_with_own_connection(
+            _rebuild(mode),
+        )
+        _rebuilds[mode] = rebuild_task
+
+    await asyncio.shield(rebuild_task)
+
+
+async def fetch_page(
+    mode: GameMode,
+    offset: int,
+    limit: int,
+    country: str | None = None,
+) -> list[dict[str, Any]]:
+    """Fetch a page of a mode's global (or country) rankings by pp."""
+    await ensure_built(mode)
+
+    entries: list[tuple[bytes, float]] = await app.state.services.redis.zrevrange(
+        get_key(mode, country),
+        offset,
+        offset + limit - 1,
+        withscores=True,
+    )
+
+    # players without any pp aren't ranked; they're at the end of the set
+    user_ids = [int(user_id) for user_id, pp in entries if pp > 0]
+    if not user_ids:
+        return []
+
+    return await fetch_rows(mode, user_ids)
+
+
+async def fetch_rows(mode: GameMode, user_ids: Iterable[int]) -> list[dict[str, Any]]:
+    """Fetch the rankings rows of some players, in the order given."""
+    user_ids = list(user_ids)
+
+    rows = await app.state.services.database.fetch_all(
+        "SELECT u.id as player_id, u.name, u.country, s.tscore, s.rscore, "
+        "s.pp, s.plays, s.playtime, s.acc, s.max_combo, "
+        "s.xh_count, s.x_count, s.sh_count, s.s_count, s.a_count, "
+        "c.id as clan_id, c.name as clan_name, c.tag as clan_tag "
+        "FROM stats s "
+        "LEFT JOIN users u USING (id) "
+        "LEFT JOIN clans c ON u.clan_id = c.id "
+        "WHERE s.mode = :mode AND s.id IN :user_ids AND u.priv & 1",
+        {"mode": mode, "user_ids": user_ids},
+    )
+
+    rows_by_id = {row["player_id"]: dict(row._mapping) for row in rows}
+    return [rows_by_id[user_id] for user_id in user_ids if user_id in rows_by_id]
+
+
+async def rebuild(mode: GameMode) -> int:
+    """\
+    Rebuild a mode's global & country rankings from the stats in sql,
+    for sets which have fallen out of sync (e.g. after a redis flush).
+
+    Returns the number of ranked players.
+    """
+    rows = await app.state.services.database.fetch_all(
+        "SELECT s.id, s.pp, u.country FROM stats s "
+        "INNER JOIN users u USING (id) "
+        "WHERE s.mode = :mode AND u.priv & 1",
+        {"mode": mode},
+    )
+
+    # {key: {user_id: pp, ...}, ...}
+    rankings: dict[str, dict[str, float]] = {get_key(mode): {}}
+    for row in rows:
+        for key in (get_key(mode), get_key(mode, row["country"])):
+            rankings.setdefault(key, {})[str(row["id"])] = row["pp"]
+
+    # remove the rankings of countries which no longer have any players
+    stale_keys = [
+        key.decode()
+        async for key in app.state.services.redis.scan_iter(
+            match=f"{get_key(mode)}:*",
+        )
+    ]
+
+    async with app.state.services.redis.pipeline() as pipe:
+        for key in stale_keys:
+            if key not in rankings:
+                pipe.delete(key)
+
+        for key, players in rankings.items():
+            # NOTE: the new sets replace the old ones atomically
+            pipe.delete(f"{key}:rebuild")
+            if players:
+                pipe.zadd(f"{key}:rebuild", players)
+                pipe.rename(f"{key}:rebuild", key)
+            else:
+                pipe.delete(key)
+
+        pipe.set(get_built_key(mode), int(time.time()))
+        await pipe.execute()
+
+    return len(rows)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+import struct
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import BinaryIO
+
+REPLAYS_PATH = Path.cwd() / ".data/osr"
+
+# replays are sharded into this many subdirectories by score id,
+# to avoid a single directory with millions of files.
+SHARD_COUNT = 1000
+
+# the size of the chunks replays are streamed in.
+CHUNK_SIZE = 64 * 1024
+
+# NOTE: the replay frames sent by the client are already lzma compressed,
+# so compression mostly helps with older, rarely watched replays; it's done
+# out of band by tools/migrate_replays.py rather than on submission.
+COMPRESSION_LEVEL = 6
+
+
+def get_replay_path(score_id: int, compressed: bool = False) -> Path:
+    """Get the path of a score's replay in the store."""
+    suffix = ".osr.gz" if compressed else ".osr"
+    return REPLAYS_PATH / f"{score_id % SHARD_COUNT:03d}" / f"{score_id}{suffix}"
+
+
+def get_legacy_replay_path(score_id: int) -> Path:
+    """Get the path of a score's replay in the old (flat) layout."""
+    return REPLAYS_PATH / f"{score_id}.osr"
+
+
+def _find(score_id: int) -> Path | None:
+    for path in (
+        get_replay_path(score_id),
+        get_replay_path(score_id, compressed=True),
+        get_legacy_replay_path(score_id),
+    ):
+        if path.exists():
+            return path
+
+    return None
+
+
+def _open(path: Path) -> BinaryIO:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")  # type: ignore[return-value]
+    else:
+        return path.open("rb")
+
+
+def _get_size(path: Path) -> int:
+    if path.suffix == ".gz":
+        # the uncompressed size (mod 2^32) is stored in the last 4 bytes
+        with path.open("rb") as f:
+            f.seek(-4, os.SEEK_END)
+            size: int = struct.unpack("<I", f.read(4))[0]
+            return size
+    else:
+        return path.stat().st_size
+
+
+def _write_file(path: Path, content: bytes) -> None:
+    path.parent.mkdir(exist_ok=True)
+
+    # write atomically, so a partially written
+    # replay is never read by another request.
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_bytes(content)
+    tmp_path.replace(path)
+
+
+def _read_file(path: Path) -> bytes:
+    with _open(path) as f:
+        return f.read()
+
+
+async def save(score_id: int, replay: bytes) -> None:
+    """Save a score's replay to the store."""
+    await asyncio.to_thread(_write_file, get_replay_path(score_id), replay)
+
+
+async def exists(score_id: int) -> bool:
+    """Check whether we have a score's replay."""
+    return await asyncio.to_thread(_find, score_id) is not None
+
+
+async def get_size(score_id: int) -> int | None:
+    """Get the (uncompressed) size of a score's replay, if we have it."""
+
+    def _get_size_if_exists() -> int | None:
+        path = _find(score_id)
+        if path is None:
+            return None
+
+        return _get_size(path)
+
+    return await asyncio.to_thread(_get_size_if_exists)
+
+
+async def read(score_id: int) -> bytes | None:
+    """Read a score's (uncompressed) replay, if we have it."""
+
+    def _read_if_exists() -> bytes | None:
+        path = _find(score_id)
+        if path is None:
+            return None
+
+        return _read_file(path)
+
+    return await asyncio.to_thread(_read_if_exists)
+
+
+async def stream(score_id: int) -> AsyncIterator[bytes]:
+    """\
+    Stream a score's (uncompressed) replay in chunks.
+
+    The caller should check that the replay exists beforehand;
+    FileNotFoundError is raised if it doesn't.
+    """
+
+    def _open_if_exists() -> BinaryIO:
+        path = _find(score_id)
+        if path is None:
+            raise FileNotFoundError(f"Replay for score {score_id} not found")
+
+        return _open(path)
+
+    f = await asyncio.to_thread(_open_if_exists)
+    try:
+        while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+def migrate(score_id: int) -> bool:
+    """\
+    Move a score's replay from the old (flat) layout into the store.
+
+    Returns whether the replay was moved.
+    """
+    legacy_path = get_legacy_replay_path(score_id)
+    if not legacy_path.exists():
+        return False
+
+    path = get_replay_path(score_id)
+    path.parent.mkdir(exist_ok=True)
+    legacy_path.replace(path)
+    return True
+
+
+def compress(score_id: int) -> bool:
+    """\
+    Compress a score's replay in the store.
+
+    Returns whether the replay was compressed.
+    """
+    path = get_replay_path(score_id)
+    if not path.exists():
+        return False
+
+    compressed = gzip.compress(path.read_bytes(), compresslevel=COMPRESSION_LEVEL)
+    _write_file(get_replay_path(score_id, compressed=True), compressed)
+    path.unlink()
+    return True
@@ -0,0 +1,206 @@
+"""\
+Decryption of the score data sent by osu! clients on score submission.
+
+The data is encrypted with Rijndael using 256-bit blocks (which isn't AES,
+so isn't supported by the usual crypto libraries) in CBC mode, with a key
+derived from the client's osu! version.
+"""
+from __future__ import annotations
+
+import struct
+from typing import Protocol
+
+from py3rijndael import Pkcs7Padding
+from py3rijndael import Rijndael
+from py3rijndael import RijndaelCbc
+from py3rijndael.constants import Si
+from py3rijndael.constants import T5
+from py3rijndael.constants import T6
+from py3rijndael.constants import T7
+from py3rijndael.constants import T8
+
+from app.logging import Ansi
+from app.logging import log
+from app.utils import LRUCache
+
+BLOCK_SIZE = 32
+BLOCK_WORDS = BLOCK_SIZE // 4
+
+# NOTE: osu_version is sent by the client, so only a few
+# key schedules (one per recent osu! version) are kept.
+KEY_SCHEDULE_CACHE_SIZE = 16
+
+
+def get_key(osu_version: str) -> bytes:
+    """Get the key a client on a given osu! version encrypts scores with."""
+    return f"osu!-scoreburgr---------{osu_version}".encode()
+
+
+def _unpad(data: bytes) -> bytes:
+    # pkcs #7
+    if not data or not 1 <= data[-1] <= BLOCK_SIZE:
+        raise ValueError("Invalid padding")
+
+    return data[: -data[-1]]
+
+
+class RijndaelBackend(Protocol):
+    name: str
+
+    def decrypt(self, osu_version: str, iv: bytes, data: bytes) -> bytes:
+        """Decrypt (& unpad) some data, encrypted in CBC mode."""
+        ...
+
+
+class Py3RijndaelBackend:
+    """\
+    Decrypts data with py3rijndael's block cipher, which is slow, but has
+    been verified against the client; kept as a fallback & a reference.
+    """
+
+    name = "py3rijndael"
+
+    def __init__(self) -> None:
+        self._ciphers: LRUCache[str, Rijndael] = LRUCache(KEY_SCHEDULE_CACHE_SIZE)
+
+    def _get_cipher(self, osu_version: str) -> Rijndael:
+        cipher = self._ciphers.get(osu_version)
+        if cipher is None:
+            cipher = Rijndael(get_key(osu_version), block_size=BLOCK_SIZE)
+            self._ciphers[osu_version] = cipher
+
+        return cipher
+
+    def decrypt(self, osu_version: str, iv: bytes, data: bytes) -> bytes:
+        if len(data) % BLOCK_SIZE or len(iv) != BLOCK_SIZE:
+            raise ValueError("Invalid data length")
+
+        cipher = self._get_cipher(osu_version)
+
+        plaintext = bytearray()
+        prev_block = iv
+        for offset in range(0, len(data), BLOCK_SIZE):
+            block = data[offset : offset + BLOCK_SIZE]
+            decrypted = cipher.decrypt(block)
+            plaintext += (
+                int.from_bytes(decrypted, "big") ^ int.from_bytes(prev_block, "big")
+            ).to_bytes(BLOCK_SIZE, "big")
+            prev_block = block
+
+        return _unpad(bytes(plaintext))
+
+
+class TableRijndaelBackend:
+    """\
+    Decrypts data with an implementation of the Rijndael-256 block cipher
+    which works on whole words & lookup tables, with the rounds unrolled
+    into local variables; avoiding the per-byte work (& allocations) done
+    by py3rijndael.
+    """
+
+    name = "table"
+
+    def __init__(self) -> None:
+        # {osu_version: decryption round keys, ...}
+        self._round_keys: LRUCache[str, list[list[int]]] = LRUCache(
+            KEY_SCHEDULE_CACHE_SIZE,
+        )
+
+    def _get_round_keys(self, osu_version: str) -> list[list[int]]:
+        round_keys = self._round_keys.get(osu_version)
+        if round_keys is None:
+            # py3rijndael's key expansion is only done once per key
+            cipher = Rijndael(get_key(osu_version), block_size=BLOCK_SIZE)
+            round_keys = cipher.Kd
+            self._round_keys[osu_version] = round_keys
+
+        return round_keys
+
+    def decrypt(self, osu_version: str, iv: bytes, data: bytes) -> bytes:
+        if len(data) % BLOCK_SIZE or len(iv) != BLOCK_SIZE:
+            raise ValueError("Invalid data length")
+
+        first_key, *middle_keys, last_key = self._get_round_keys(osu_version)
+        k0, k1, k2, k3, k4, k5, k6, k7 = first_key
+        l0, l1, l2, l3, l4, l5, l6, l7 = last_key
+
+        words = struct.unpack(f">{len(data) // 4}I", data)
+        p0, p1, p2, p3, p4, p5, p6, p7 = struct.unpack(f">{BLOCK_WORDS}I", iv)
+        plaintext: list[int] = []
+
+        # fmt: off
+        for offset in range(0, len(words), BLOCK_WORDS):
+            block = words[offset : offset + BLOCK_WORDS]
+            c0, c1, c2, c3, c4, c5, c6, c7 = block
+
+            t0, t1, t2, t3 = c0 ^ k0, c1 ^ k1, c2 ^ k2, c3 ^ k3
+            t4, t5, t6, t7 = c4 ^ k4, c5 ^ k5, c6 ^ k6, c7 ^ k7
+
+            # each output word takes a byte from words i, i+7, i+5 & i+4
+            # (mod 8) of the state, the inverse of ShiftRows for 256-bit blocks
+            for r0, r1, r2, r3, r4, r5, r6, r7 in middle_keys:
+                t0, t1, t2, t3, t4, t5, t6, t7 = (
+                    T5[t0 >> 24] ^ T6[t7 >> 16 & 255] ^ T7[t5 >> 8 & 255] ^ T8[t4 & 255] ^ r0,
+                    T5[t1 >> 24] ^ T6[t0 >> 16 & 255] ^ T7[t6 >> 8 & 255] ^ T8[t5 & 255] ^ r1,
+                    T5[t2 >> 24] ^ T6[t1 >> 16 & 255] ^ T7[t7 >> 8 & 255] ^ T8[t6 & 255] ^ r2,
+                    T5[t3 >> 24] ^ T6[t2 >> 16 & 255] ^ T7[t0 >> 8 & 255] ^ T8[t7 & 255] ^ r3,
+                    T5[t4 >> 24] ^ T6[t3 >> 16 & 255] ^ T7[t1 >> 8 & 255] ^ T8[t0 & 255] ^ r4,
+                    T5[t5 >> 24] ^ T6[t4 >> 16 & 255] ^ T7[t2 >> 8 & 255] ^ T8[t1 & 255] ^ r5,
+                    T5[t6 >> 24] ^ T6[t5 >> 16 & 255] ^ T7[t3 >> 8 & 255] ^ T8[t2 & 255] ^ r6,
+                    T5[t7 >> 24] ^ T6[t6 >> 16 & 255] ^ T7[t4 >> 8 & 255] ^ T8[t3 & 255] ^ r7,
+                )
+
+            # the last round has no MixColumns step; then undo the chaining
+            plaintext += (
+                (Si[t0 >> 24] << 24 | Si[t7 >> 16 & 255] << 16 | Si[t5 >> 8 & 255] << 8 | Si[t4 & 255]) ^ l0 ^ p0,
+                (Si[t1 >> 24] << 24 | Si[t0 >> 16 & 255] << 16 | Si[t6 >> 8 & 255] << 8 | Si[t5 & 255]) ^ l1 ^ p1,
+                (Si[t2 >> 24] << 24 | Si[t1 >> 16 & 255] << 16 | Si[t7 >> 8 & 255] << 8 | Si[t6 & 255]) ^ l2 ^ p2,
+                (Si[t3 >> 24] << 24 | Si[t2 >> 16 & 255] << 16 | Si[t0 >> 8 & 255] << 8 | Si[t7 & 255]) ^ l3 ^ p3,
+                (Si[t4 >> 24] << 24 | Si[t3 >> 16 & 255] << 16 | Si[t1 >> 8 & 255] << 8 | Si[t0 & 255]) ^ l4 ^ p4,
+                (Si[t5 >> 24] << 24 | Si[t4 >> 16 & 255] << 16 | Si[t2 >> 8 & 255] << 8 | Si[t1 & 255]) ^ l5 ^ p5,
+                (Si[t6 >> 24] << 24 | Si[t5 >> 16 & 255] << 16 | Si[t3 >> 8 & 255] << 8 | Si[t2 & 255]) ^ l6 ^ p6,
+                (Si[t7 >> 24] << 24 | Si[t6 >> 16 & 255] << 16 | Si[t4 >> 8 & 255] << 8 | Si[t3 & 255]) ^ l7 ^ p7,
+            )
+            p0, p1, p2, p3, p4, p5, p6, p7 = block
+        # fmt: on
+
+        return _unpad(struct.pack(f">{len(plaintext)}I", *plaintext))
+
+
+def _verify(backend: RijndaelBackend) -> bool:
+    """Check that a backend decrypts data encrypted by py3rijndael's cipher."""
+    plaintext = b"727:cmyui:" + bytes(range(256))
+    iv = bytes(range(BLOCK_SIZE))
+
+    cipher = RijndaelCbc(
+        key=get_key("20231030"),
+        iv=iv,
+        padding=Pkcs7Padding(BLOCK_SIZE),
+        block_size=BLOCK_SIZE,
+    )
+
+    try:
+        return backend.decrypt("20231030", iv, cipher.encrypt(plaintext)) == plaintext
+    except Exception:
+        return False
+
+
+def _select_backend() -> RijndaelBackend:
+    """Select the fastest backend which decrypts data correctly."""
+    backends: list[RijndaelBackend] = [TableRijndaelBackend(), Py3RijndaelBackend()]
+
+    for backend in backends:
+        if _verify(backend):
+            return backend
+
+        log(f"Score decryption backend {backend.name} failed verification", Ansi.LRED)
+
+    raise RuntimeError("No working score decryption backend")
+
+
+backend = _select_backend()
+
+
+def decrypt(osu_version: str, iv: bytes, data: bytes) -> bytes:
+    """Decrypt some data encrypted by an osu! client on a given version."""
+    return backend.decrypt(osu_version, iv, data)
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable
+from collections.abc import Callable
+from typing import Any
+from typing import NamedTuple
+
+import app.settings
+import app.state
+from app.logging import Ansi
+from app.logging import log
+
+# jobs are retried this many times in total, sleeping
+# for RETRY_BACKOFF seconds (doubled each time) in between.
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5
+
+
+class Job(NamedTuple):
+    name: str
+    # NOTE: a factory rather than a coroutine, so that the job can be retried
+    func: Callable[[], Awaitable[Any]]
+    # called if the job fails on every attempt
+    on_failure: Callable[[], Any] | None = None
+
+
+_queue: asyncio.Queue[Job] = asyncio.Queue(
+    maxsize=app.settings.SCORE_PIPELINE_MAX_QUEUED,
+)
+_workers: set[asyncio.Task[None]] = set()
+
+
+def _report_queue_depth() -> None:
+    if app.state.services.datadog:
+        app.state.services.datadog.gauge(
+            "bancho.score_pipeline.queue_depth",
+            _queue.qsize(),
+        )
+
+
+async def _run(job: Job) -> None:
+    tags = [f"job:{job.name}"]
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        st = time.perf_counter_ns()
+
+        try:
+            await job.func()
+        except Exception as exc:
+            if attempt == MAX_ATTEMPTS:
+                log(f"Score job {job.name} failed: {exc!r}", Ansi.LRED)
+
+                if app.state.services.datadog:
+                    app.state.services.datadog.increment(
+                        "bancho.score_pipeline.failures",
+                        tags=tags,
+                    )
+
+                if job.on_failure is not None:
+                    job.on_failure()
+                return
+
+            if app.state.services.datadog:
+                app.state.services.datadog.increment(
+                    "bancho.score_pipeline.retries",
+                    tags=tags,
+                )
+
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        else:
+            if app.state.services.datadog:
+                time_taken = (time.perf_counter_ns() - st) / 1e6
+                app.state.services.datadog.histogram(
+                    "bancho.score_pipeline.time",
+                    time_taken,
+                    tags=tags,
+                )
+            return
+
+
+async def _worker() -> None:
+    while True:
+        job = await _queue.get()
+        _report_queue_depth()
+
+        try:
+            await _run(job)
+        finally:
+            _queue.task_done()
+
+
+async def submit(
+    name: str,
+    func: Callable[[], Awaitable[Any]],
+    on_failure: Callable[[], Any] | None = None,
+) -> None:
+    """\
+    Defer `func` to the score pipeline's workers.
+
+    If the queue is full, we wait for space in it (applying backpressure
+    to score submission); if no workers are running, `func` is run inline.
+    If `func` fails on every attempt, `on_failure` is called.
+    """
+    job = Job(name, func, on_failure)
+
+    if not _workers:
+        await _run(job)
+        return
+
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        if app.state.services.datadog:
+            app.state.services.datadog.increment("bancho.score_pipeline.backpressure")
+
+        await _queue.put(job)
+
+    _report_queue_depth()
+
+
+def start() -> None:
+    """Start the score pipeline's workers."""
+    for _ in range(app.settings.SCORE_PIPELINE_WORKERS):
+        # each worker runs its jobs on its own database connection
+        task = app.state.services.create_task_with_own_connection(_worker())
+        _workers.add(task)
+
+
+async def stop(timeout: float = 10.0) -> None:
+    """Finish the score pipeline's queued jobs, & stop its workers."""
+    if _queue.qsize():
+        log(f"-> Finishing {_queue.qsize()} score jobs.", Ansi.LMAGENTA)
+
+    try:
+        await asyncio.wait_for(_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        log(f"Dropped {_queue.qsize()} unfinished score jobs.", Ansi.LRED)
+
+    for task in _workers:
+        task.cancel()
+
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
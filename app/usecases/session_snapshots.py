@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import ipaddress
+import time
+from collections import defaultdict
+from collections.abc import Mapping
+from collections.abc import Sequence
+from datetime import date
+from pathlib import Path
+from typing import Any
+from typing import cast
+from typing import TypedDict
+
+import databases.core
+import orjson
+
+import app.settings
+import app.state
+from app.constants.gamemodes import GameMode
+from app.constants.mods import Mods
+from app.constants.privileges import ClanPrivileges
+from app.logging import Ansi
+from app.logging import log
+from app.objects.clan import Clan
+from app.objects.player import Action
+from app.objects.player import ClientDetails
+from app.objects.player import OsuStream
+from app.objects.player import OsuVersion
+from app.objects.player import Player
+from app.objects.player import PresenceFilter
+from app.repositories import stats as stats_repo
+
+SNAPSHOT_VERSION = 1
+
+# snapshots older than this are discarded; the
+# clients will have given up on the server by then.
+SNAPSHOT_MAX_AGE = 5 * 60
+
+REDIS_KEY = "bancho:session_snapshot"
+FILE_PATH = Path.cwd() / ".data/session_snapshot.json"
+
+
+class SessionSnapshot(TypedDict):
+    token: str
+    id: int
+    utc_offset: int
+    pm_private: bool
+    login_time: float
+    geoloc: app.state.services.Geolocation
+    status: dict[str, Any]
+    channels: list[str]
+    client_details: dict[str, Any] | None
+    pres_filter: int
+    spectating: int | None
+    tourney_client: bool
+    away_msg: str | None
+    stealth: bool
+    queue: str
+
+
+def _snapshot_player(player: Player) -> SessionSnapshot:
+    client_details = None
+    if player.client_details is not None:
+        details = player.client_details
+        client_details = {
+            "osu_version": {
+                "date": details.osu_version.date.isoformat(),
+                "revision": details.osu_version.revision,
+                "stream": details.osu_version.stream.value,
+            },
+            "osu_path_md5": details.osu_path_md5,
+            "adapters_md5": details.adapters_md5,
+            "uninstall_md5": details.uninstall_md5,
+            "disk_signature_md5": details.disk_signature_md5,
+            "adapters": details.adapters,
+            "ip": str(details.ip),
+        }
+
+    return {
+        "token": player.token,
+        "id": player.id,
+        "utc_offset": player.utc_offset,
+        "pm_private": player.pm_private,
+        "login_time": player.login_time,
+        "geoloc": player.geoloc,
+        "status": {
+            "action": player.status.action.value,
+            "info_text": player.status.info_text,
+            "map_md5": player.status.map_md5,
+            "mods": player.status.mods.value,
+            "mode": player.status.mode.value,
+            "map_id": player.status.map_id,
+        },
+        # instanced channels (multiplayer & spectator) are not persisted
+        "channels": [c._name for c in player.channels if not c.instance],
+        "client_details": client_details,
+        "pres_filter": player.pres_filter.value,
+        "spectating": player.spectating.id if player.spectating else None,
+        "tourney_client": player.tourney_client,
+        "away_msg": player.away_msg,
+        "stealth": player.stealth,
+        "queue": player._queue.hex(),
+    }
+
+
+async def save() -> None:
+    """Save the online players' sessions, to be restored on startup."""
+    if not app.settings.SESSION_SNAPSHOT_STORAGE:
+        return
+
+    sessions = [
+        _snapshot_player(p)
+        for p in app.state.sessions.players
+        if p is not app.state.sessions.bot
+    ]
+
+    snapshot = orjson.dumps(
+        {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": time.time(),
+            "sessions": sessions,
+        },
+    )
+
+    if app.settings.SESSION_SNAPSHOT_STORAGE == "redis":
+        await app.state.services.redis.set(REDIS_KEY, snapshot, ex=SNAPSHOT_MAX_AGE)
+    else:
+        FILE_PATH.write_bytes(snapshot)
+
+    log(f"Saved {len(sessions)} player sessions.", Ansi.LMAGENTA)
+
+
+async def _load() -> list[SessionSnapshot]:
+    if app.settings.SESSION_SNAPSHOT_STORAGE == "redis":
+        raw_snapshot = await app.state.services.redis.getdel(REDIS_KEY)
+    else:
+        if not FILE_PATH.exists():
+            return []
+
+        raw_snapshot = FILE_PATH.read_bytes()
+        FILE_PATH.unlink()
+
+    if raw_snapshot is None:
+        return []
+
+    snapshot = orjson.loads(raw_snapshot)
+
+    if (
+        snapshot["version"] != SNAPSHOT_VERSION
+        or time.time() - snapshot["saved_at"] > SNAPSHOT_MAX_AGE
+    ):
+        return []
+
+    sessions: list[SessionSnapshot] = snapshot["sessions"]
+    return sessions
+
+
+async def _restore_player(
+    session: SessionSnapshot,
+    user_info: Mapping[str, Any],
+    stats: Sequence[stats_repo.Stat],
+    relationships: Sequence[Mapping[str, Any]],
+) -> Player:
+    clan: Clan | None = None
+    clan_priv: ClanPrivileges | None = None
+    if user_info["clan_id"] != 0:
+        clan = app.state.sessions.clans.get(id=user_info["clan_id"])
+        clan_priv = ClanPrivileges(user_info["clan_priv"])
+
+    client_details = None
+    if session["client_details"] is not None:
+        details = session["client_details"]
+        client_details = ClientDetails(
+            osu_version=OsuVersion(
+                date=date.fromisoformat(details["osu_version"]["date"]),
+                revision=details["osu_version"]["revision"],
+                stream=OsuStream(details["osu_version"]["stream"]),
+            ),
+            osu_path_md5=details["osu_path_md5"],
+            adapters_md5=details["adapters_md5"],
+            uninstall_md5=details["uninstall_md5"],
+            disk_signature_md5=details["disk_signature_md5"],
+            adapters=details["adapters"],
+            ip=ipaddress.ip_address(details["ip"]),
+        )
+
+    player = Player(
+        id=user_info["id"],
+        name=user_info["name"],
+        priv=user_info["priv"],
+        pw_bcrypt=user_info["pw_bcrypt"].encode(),
+        token=session["token"],
+        clan=clan,
+        clan_priv=clan_priv,
+        geoloc=session["geoloc"],
+        utc_offset=session["utc_offset"],
+        pm_private=session["pm_private"],
+        silence_end=user_info["silence_end"],
+        donor_end=user_info["donor_end"],
+        client_details=client_details,
+        login_time=session["login_time"],
+        tourney_client=session["tourney_client"],
+        api_key=user_info["api_key"],
+    )
+
+    # give the client a full ping interval to reconnect
+    player.last_recv_time = time.time()
+
+    status = session["status"]
+    player.status.action = Action(status["action"])
+    player.status.info_text = status["info_text"]
+    player.status.map_md5 = status["map_md5"]
+    player.status.mods = Mods(status["mods"])
+    player.status.mode = GameMode(status["mode"])
+    player.status.map_id = status["map_id"]
+
+    player.pres_filter = PresenceFilter(session["pres_filter"])
+    player.away_msg = session["away_msg"]
+    player.stealth = session["stealth"]
+    player._queue += bytes.fromhex(session["queue"])
+
+    await player.stats_from_rows(stats)
+    player.relationships_from_rows(relationships)
+
+    # the client already believes it's in these channels,
+    # so we add them back without sending any packets.
+    for channel_name in session["channels"]:
+        channel = app.state.sessions.channels.get_by_name(channel_name)
+        if channel is not None and channel.can_read(player.priv):
+            channel.append(player)
+            player.channels.append(channel)
+
+    return player
+
+
+async def restore(db_conn: databases.core.Connection) -> None:
+    """Restore the player sessions saved on the last shutdown."""
+    if not app.settings.SESSION_SNAPSHOT_STORAGE:
+        return
+
+    sessions = await _load()
+    if not sessions:
+        return
+
+    # privileges & other account details may have changed while
+    # we were down, so we fetch them from sql again (for all of the
+    # sessions at once, rather than with a few queries per session).
+    params = {"user_ids": list({session["id"] for session in sessions})}
+
+    users = {
+        row["id"]: row._mapping
+        for row in await db_conn.fetch_all(
+            "SELECT * FROM users WHERE id IN :user_ids",
+            params,
+        )
+    }
+
+    stats: defaultdict[int, list[stats_repo.Stat]] = defaultdict(list)
+    for row in await db_conn.fetch_all(
+        f"SELECT {stats_repo.READ_PARAMS} FROM stats WHERE id IN :user_ids",
+        params,
+    ):
+        stats[row["id"]].append(cast(stats_repo.Stat, dict(row._mapping)))
+
+    relationships: defaultdict[int, list[Mapping[str, Any]]] = defaultdict(list)
+    for row in await db_conn.fetch_all(
+        "SELECT user1, user2, type FROM relationships WHERE user1 IN :user_ids",
+        params,
+    ):
+        relationships[row["user1"]].append(row._mapping)
+
+    restored: dict[str, Player] = {}  # {token: player, ...}
+
+    for session in sessions:
+        user_info = users.get(session["id"])
+        if user_info is None:
+            continue
+
+        player = await _restore_player(
+            session,
+            user_info,
+            stats[session["id"]],
+            relationships[session["id"]],
+        )
+
+        app.state.sessions.players.append(player)
+        restored[player.token] = player
+
+        if app.state.services.datadog and not player.restricted:
+            app.state.services.datadog.increment("bancho.online_players")
+
+    for session in sessions:
+        if session["spectating"] is None or session["token"] not in restored:
+            continue
+
+        host = app.state.sessions.players.get(id=session["spectating"])
+        if host is not None:
+            host.add_spectator(restored[session["token"]])
+
+    log(f"Restored {len(restored)} player sessions.", Ansi.LMAGENTA)
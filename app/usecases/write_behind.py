@@ -0,0 +1,329 @@
+"""\
+A write-behind buffer for hot, frequently updated counters.
+
+Rather than updating the same rows (e.g. a popular map's playcount, or a
+player's latest activity) with a separate statement on every submission,
+deltas are accumulated in memory and flushed in batched statements on an
+interval, or once enough are pending.
+
+Pending deltas are also journaled to redis, so that they can be recovered
+after a crash; a crash between committing a flush & clearing its journal
+will cause the flush to be replayed.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+from typing import Any
+
+import app.settings
+import app.state
+from app.logging import Ansi
+from app.logging import log
+
+JOURNAL_KEY_PREFIX = "bancho:write_behind:journal"
+
+# the stats columns which are only ever incremented
+STATS_COUNTERS = ("plays", "playtime", "tscore", "total_hits")
+
+# the maximum number of rows updated by a single statement
+FLUSH_BATCH_SIZE = 500
+
+
+class Buffer:
+    """\
+    A generation of pending deltas, keyed by the same fields as its journal:
+
+    - maps:{md5}:{plays|passes} -> delta
+    - stats:{user_id}:{mode}:{column} -> delta
+    - users:{user_id}:latest_activity -> timestamp
+    """
+
+    def __init__(self) -> None:
+        self.journal_key = f"{JOURNAL_KEY_PREFIX}:{uuid.uuid4()}"
+        self.fields: dict[str, int] = defaultdict(int)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+
+_buffer = Buffer()
+
+# buffers which are being (or failed to be) flushed
+_sealed: list[Buffer] = []
+_flush_lock = asyncio.Lock()
+
+# (journal key, field, value, is counter) to be written to redis
+_journal_ops: list[tuple[str, str, int, bool]] = []
+_journal_task: asyncio.Task[None] | None = None
+
+_flush_task: asyncio.Task[None] | None = None
+_threshold_flush_task: asyncio.Task[None] | None = None
+
+
+""" journal """
+
+
+async def _write_journal() -> None:
+    while _journal_ops:
+        ops = _journal_ops.copy()
+        _journal_ops.clear()
+
+        try:
+            async with app.state.services.redis.pipeline(transaction=False) as pipe:
+                for key, field, value, is_counter in ops:
+                    if is_counter:
+                        pipe.hincrby(key, field, value)
+                    else:
+                        pipe.hset(key, field, str(value))
+                await pipe.execute()
+        except Exception as exc:
+            # the deltas are still buffered in memory
+            log(f"Failed to journal counter deltas: {exc!r}", Ansi.LRED)
+
+
+def _journal(field: str, value: int, is_counter: bool) -> None:
+    global _journal_task
+
+    _journal_ops.append((_buffer.journal_key, field, value, is_counter))
+
+    if _journal_task is None or _journal_task.done():
+        _journal_task = asyncio.create_task(_write_journal())
+
+
+async def _drain_journal() -> None:
+    """Wait for all pending journal writes to complete."""
+    if _journal_task is not None and not _journal_task.done():
+        await asyncio.shield(_journal_task)
+
+
+""" recording """
+
+
+def _increment(field: str, delta: int) -> None:
+    _buffer.fields[field] += delta
+    _journal(field, delta, is_counter=True)
+    _check_threshold()
+
+
+def _check_threshold() -> None:
+    global _threshold_flush_task
+
+    if len(_buffer) < app.settings.WRITE_BEHIND_MAX_PENDING:
+        return
+
+    if _threshold_flush_task is None or _threshold_flush_task.done():
+        _threshold_flush_task = app.state.services.create_task_with_own_connection(
+            flush(),
+        )
+
+
+def record_map_play(map_md5: str, passed: bool) -> None:
+    """Record a play (& possibly a pass) of a beatmap."""
+    _increment(f"maps:{map_md5}:plays", 1)
+    if passed:
+        _increment(f"maps:{map_md5}:passes", 1)
+
+
+def record_stats(user_id: int, mode: int, **deltas: int) -> None:
+    """Record increments of a player's counter stats (e.g. plays=1)."""
+    for column, delta in deltas.items():
+        if column not in STATS_COUNTERS:
+            raise ValueError(f"{column} is not a counter stat")
+
+        if delta:
+            _increment(f"stats:{user_id}:{mode}:{column}", delta)
+
+
+def record_latest_activity(user_id: int) -> None:
+    """Record that a player was active just now."""
+    field = f"users:{user_id}:latest_activity"
+    _buffer.fields[field] = int(time.time())
+    _journal(field, _buffer.fields[field], is_counter=False)
+    _check_threshold()
+
+
+""" flushing """
+
+
+def _chunks(items: list[Any]) -> list[list[Any]]:
+    return [
+        items[i : i + FLUSH_BATCH_SIZE] for i in range(0, len(items), FLUSH_BATCH_SIZE)
+    ]
+
+
+async def _write_fields(fields: dict[str, int]) -> None:
+    """Write a set of buffered fields to sql, in a single transaction."""
+    maps: dict[str, dict[str, int]] = defaultdict(lambda: {"plays": 0, "passes": 0})
+    stats: dict[tuple[int, int], dict[str, int]] = defaultdict(
+        lambda: dict.fromkeys(STATS_COUNTERS, 0),
+    )
+    users: dict[int, int] = {}
+
+    for field, value in fields.items():
+        table, *key = field.split(":")
+        if table == "maps":
+            map_md5, column = key
+            maps[map_md5][column] += value
+        elif table == "stats":
+            user_id, mode, column = key
+            stats[(int(user_id), int(mode))][column] += value
+        elif table == "users":
+            user_id, _ = key
+            users[int(user_id)] = value
+
+    async with app.state.services.database.transaction():
+        for batch in _chunks(list(maps.items())):
+            params: dict[str, Any] = {}
+            for i, (map_md5, counts) in enumerate(batch):
+                params[f"md5_{i}"] = map_md5
+                params[f"plays_{i}"] = counts["plays"]
+                params[f"passes_{i}"] = counts["passes"]
+
+            whens = range(len(batch))
+            await app.state.services.database.execute(
+                "UPDATE maps SET "
+                "plays = plays + CASE md5 "
+                + " ".join(f"WHEN :md5_{i} THEN :plays_{i}" for i in whens)
+                + " ELSE 0 END, "
+                "passes = passes + CASE md5 "
+                + " ".join(f"WHEN :md5_{i} THEN :passes_{i}" for i in whens)
+                + " ELSE 0 END "
+                "WHERE md5 IN (" + ", ".join(f":md5_{i}" for i in whens) + ")",
+                params,
+            )
+
+        for stats_batch in _chunks(list(stats.items())):
+            params = {}
+            for i, ((user_id, mode), deltas) in enumerate(stats_batch):
+                params[f"id_{i}"] = user_id
+                params[f"mode_{i}"] = mode
+                for column, delta in deltas.items():
+                    params[f"{column}_{i}"] = delta
+
+            whens = range(len(stats_batch))
+            set_clauses = [
+                f"{column} = {column} + CASE "
+                + " ".join(
+                    f"WHEN id = :id_{i} AND mode = :mode_{i} THEN :{column}_{i}"
+                    for i in whens
+                )
+                + " ELSE 0 END"
+                for column in STATS_COUNTERS
+            ]
+            await app.state.services.database.execute(
+                f"UPDATE stats SET {', '.join(set_clauses)} "
+                "WHERE (id, mode) IN ("
+                + ", ".join(f"(:id_{i}, :mode_{i})" for i in whens)
+                + ")",
+                params,
+            )
+
+        for users_batch in _chunks(list(users.items())):
+            params = {}
+            for i, (user_id, latest_activity) in enumerate(users_batch):
+                params[f"id_{i}"] = user_id
+                params[f"latest_activity_{i}"] = latest_activity
+
+            whens = range(len(users_batch))
+            await app.state.services.database.execute(
+                "UPDATE users SET latest_activity = GREATEST(latest_activity, CASE id "
+                + " ".join(f"WHEN :id_{i} THEN :latest_activity_{i}" for i in whens)
+                + " ELSE 0 END) "
+                "WHERE id IN (" + ", ".join(f":id_{i}" for i in whens) + ")",
+                params,
+            )
+
+
+async def flush() -> None:
+    """Write all pending deltas to sql."""
+    global _buffer
+
+    async with _flush_lock:
+        if _buffer:
+            _sealed.append(_buffer)
+            _buffer = Buffer()
+
+        # make sure the sealed buffers' journals are complete, so
+        # they aren't recreated after we've cleared them below.
+        await _drain_journal()
+
+        for buffer in _sealed.copy():
+            st = time.perf_counter_ns()
+
+            try:
+                await _write_fields(buffer.fields)
+            except Exception as exc:
+                # the buffer will be retried on the next flush
+                log(f"Failed to flush counter deltas: {exc!r}", Ansi.LRED)
+                break
+
+            _sealed.remove(buffer)
+
+            try:
+                await app.state.services.redis.delete(buffer.journal_key)
+            except Exception as exc:
+                log(f"Failed to clear counter journal: {exc!r}", Ansi.LRED)
+
+            if app.state.services.datadog:
+                app.state.services.datadog.histogram(
+                    "bancho.write_behind.flush_time",
+                    (time.perf_counter_ns() - st) / 1e6,
+                )
+                app.state.services.datadog.increment(
+                    "bancho.write_behind.flushed_fields",
+                    len(buffer),
+                )
+
+
+async def recover() -> None:
+    """Flush any deltas journaled (but not flushed) before a crash."""
+    async for key in app.state.services.redis.scan_iter(
+        match=f"{JOURNAL_KEY_PREFIX}:*",
+    ):
+        buffer = Buffer()
+        buffer.journal_key = key.decode()
+
+        journal = await app.state.services.redis.hgetall(  # type: ignore[misc]
+            buffer.journal_key,
+        )
+        if not journal:
+            continue
+
+        buffer.fields.update({f.decode(): int(v) for f, v in journal.items()})
+        _sealed.append(buffer)
+
+    if _sealed:
+        log(f"Recovering {len(_sealed)} counter journals.", Ansi.LMAGENTA)
+        await flush()
+
+
+async def _flush_periodically() -> None:
+    while True:
+        await asyncio.sleep(app.settings.WRITE_BEHIND_FLUSH_INTERVAL)
+        await flush()
+
+
+async def start() -> None:
+    """Recover any journaled deltas, & start flushing on an interval."""
+    global _flush_task
+
+    await recover()
+
+    _flush_task = app.state.services.create_task_with_own_connection(
+        _flush_periodically(),
+    )
+
+
+async def stop() -> None:
+    """Stop flushing on an interval, & flush all pending deltas."""
+    if _flush_task is not None:
+        _flush_task.cancel()
+        await asyncio.gather(_flush_task, return_exceptions=True)
+
+    if _buffer or _sealed:
+        log(f"-> Flushing {len(_buffer)} counter deltas.", Ansi.LMAGENTA)
+
+    await flush()
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import ctypes
+import hashlib
 import inspect
 import io
 import ipaddress
+import math
 import os
 import shutil
 import socket
 import sys
+import time
 import types
+from collections import OrderedDict
 from collections.abc import Callable
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
+from typing import Generic
 from typing import TypedDict
 from typing import TypeVar
 
@@ -27,6 +33,8 @@ from app.logging import printc
 
 __all__ = (
     # TODO: organize/sort these
+    "LRUCache",
+    "BloomFilter",
     "make_safe_name",
     "download_achievement_images",
     "download_default_avatar",
@@ -54,6 +62,8 @@ __all__ = (
 )
 
 T = TypeVar("T")
+K = TypeVar("K")
+V = TypeVar("V")
 
 
 DATA_PATH = Path.cwd() / ".data"
@@ -62,6 +72,176 @@ DEFAULT_AVATAR_PATH = DATA_PATH / "avatars/default.jpg"
 DEBUG_HOOKS_PATH = Path.cwd() / "_testing/runtime.py"
 
 
+class LRUCache(Generic[K, V]):
+    """\
+    A size-capped mapping which evicts its least recently used entries,
+    and optionally expires entries `ttl` seconds after they're set.
+
+    Entries have a size of 1, unless otherwise specified with `set`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        # the total size of all entries
+        self.size = 0
+
+        # {key: (expires_at, value, size), ...}
+        self._data: OrderedDict[K, tuple[float, V, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        entry = self._data.get(key)  # type: ignore[arg-type]
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __getitem__(self, key: K) -> V:
+        entry = self._lookup(key)
+        if entry is None:
+            raise KeyError(key)
+
+        return entry[1]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: K) -> None:
+        self.size -= self._data.pop(key)[2]
+
+    def _lookup(self, key: K) -> tuple[float, V, int] | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry[0] <= time.monotonic():
+            del self[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: K, value: V, size: int = 1) -> None:
+        """Set the value for `key`, evicting entries to fit its `size`."""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else math.inf
+
+        self.pop(key)
+        self._data[key] = (expires_at, value, size)
+        self.size += size
+
+        self._evict()
+
+    def resize(self, key: K, size: int) -> None:
+        """Update the size of `key`'s entry, evicting entries to fit it."""
+        entry = self._data.get(key)
+        if entry is None:
+            return
+
+        expires_at, value, prev_size = entry
+        self._data[key] = (expires_at, value, size)
+        self.size += size - prev_size
+
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.size > self.maxsize:
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self.size -= evicted_size
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        """Get the value for `key`, if it exists & has not expired."""
+        entry = self._lookup(key)
+        return entry[1] if entry is not None else default
+
+    def pop(self, key: K) -> V | None:
+        """Remove `key` from the cache, returning its value if it existed."""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return None
+
+        self.size -= entry[2]
+        return entry[1]
+
+    def keys(self) -> list[K]:
+        """Get the keys of all entries, including any which have expired."""
+        return list(self._data)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
+
+    def expire(self) -> int:
+        """Remove all expired entries from the cache; return the count."""
+        now = time.monotonic()
+        expired = [key for key, entry in self._data.items() if entry[0] <= now]
+
+        for key in expired:
+            del self[key]
+
+        return len(expired)
+
+
+class BloomFilter:
+    """\
+    A probabilistic set of strings, which can tell with certainty that
+    an item was never added to it, but may (with a probability of about
+    `error_rate`) falsely report that one was, once `capacity` items
+    have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        # the number of items added
+        self.count = 0
+
+        # the optimal number of bits & hash functions for the capacity
+        self.num_bits = max(
+            8,
+            math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)),
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _indices(self, item: str) -> Iterator[int]:
+        # derive all of the hashes from two halves of a single digest
+        # (see Kirsch & Mitzenmacher, "Less Hashing, Same Performance")
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+
+        for _ in range(self.num_hashes):
+            yield h1 % self.num_bits
+            h1 += h2
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for i in self._indices(item):
+            if not bits[i >> 3] & (1 << (i & 7)):
+                return False
+
+        return True
+
+    def add(self, item: str) -> None:
+        bits = self._bits
+        for i in self._indices(item):
+            bits[i >> 3] |= 1 << (i & 7)
+
+        self.count += 1
+
+
 def make_safe_name(name: str) -> str:
     """Return a name safe for usage in sql."""
     return name.lower().replace(" ", "_")
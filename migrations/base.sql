@@ -148,6 +148,25 @@ create table maps
 		unique (md5)
 );
 
+create table difficulty_attributes
+(
+	map_md5 char(32) not null,
+	mode tinyint(1) not null,
+	mods int not null,
+	calc_version varchar(32) not null,
+	stars float not null,
+	aim float null,
+	speed float null,
+	flashlight float null,
+	slider_factor float null,
+	speed_note_count float null,
+	stamina float null,
+	color float null,
+	rhythm float null,
+	peak float null,
+	primary key (map_md5, mode, mods)
+);
+
 create table mapsets
 (
 	server enum('osu!', 'private') default 'osu!' not null,
@@ -223,6 +242,9 @@ create table scores
 	online_checksum char(32) not null
 );
 
+create index scores_online_checksum_index
+	on scores (online_checksum);
+
 create table startups
 (
 	id int auto_increment
@@ -409,3 +409,27 @@ alter table maps drop primary key;
 alter table maps add primary key (id);
 alter table maps modify column server enum('osu!', 'private') not null default 'osu!' after id;
 unlock tables;
+
+# v4.8.2
+create table difficulty_attributes
+(
+	map_md5 char(32) not null,
+	mode tinyint(1) not null,
+	mods int not null,
+	calc_version varchar(32) not null,
+	stars float not null,
+	aim float null,
+	speed float null,
+	flashlight float null,
+	slider_factor float null,
+	speed_note_count float null,
+	stamina float null,
+	color float null,
+	rhythm float null,
+	peak float null,
+	primary key (map_md5, mode, mods)
+);
+
+# v4.8.3
+create index scores_online_checksum_index
+	on scores (online_checksum);
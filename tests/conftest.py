@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import contextlib
+import fnmatch
 from collections.abc import AsyncIterator
+from collections.abc import Callable
+from typing import Any
 
 import pytest
 from asgi_lifespan import LifespanManager
 from asgi_lifespan._types import ASGIApp
 
 from app.api.init_api import asgi_app
+from app.state import services
 
 # TODO: fixtures for postgres database connection(s) for itests
 
@@ -21,4 +26,213 @@ async def app() -> AsyncIterator[ASGIApp]:
         yield manager.app
 
 
+class FakeRow(dict[str, Any]):
+    """A row of a query's results."""
+
+    @property
+    def _mapping(self) -> dict[str, Any]:
+        return self
+
+
+class FakeDatabase:
+    """\
+    An in-memory stand-in for the database service, which records
+    the queries it's sent, & answers them by calling `results`.
+
+    While `fail` is set, all queries raise a `ConnectionError`.
+    """
+
+    def __init__(self) -> None:
+        self.queries: list[tuple[str, dict[str, Any]]] = []
+        self.results: Callable[[str, dict[str, Any]], list[Any]] = lambda q, v: []
+        self.fail = False
+
+    def _query(self, query: str, values: dict[str, Any] | None) -> list[Any]:
+        if self.fail:
+            raise ConnectionError("database is down")
+
+        self.queries.append((query, values or {}))
+        return self.results(query, values or {})
+
+    @contextlib.asynccontextmanager
+    async def connection(self) -> AsyncIterator[FakeDatabase]:
+        yield self
+
+    @contextlib.asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        yield
+
+    async def execute(self, query: str, values: dict[str, Any] | None = None) -> int:
+        self._query(query, values)
+        return 0
+
+    async def fetch_one(
+        self,
+        query: str,
+        values: dict[str, Any] | None = None,
+    ) -> Any:
+        rows = self._query(query, values)
+        return rows[0] if rows else None
+
+    async def fetch_all(
+        self,
+        query: str,
+        values: dict[str, Any] | None = None,
+    ) -> list[Any]:
+        return self._query(query, values)
+
+
+@pytest.fixture
+def database(monkeypatch: pytest.MonkeyPatch) -> FakeDatabase:
+    database = FakeDatabase()
+    monkeypatch.setattr(services, "database", database)
+    return database
+
+
+class FakePipeline:
+    """A pipeline of a `FakeRedis`' commands, run in order on execution."""
+
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+    async def __aenter__(self) -> FakePipeline:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self) -> list[Any]:
+        commands, self.commands = self.commands, []
+        return [
+            await getattr(self.redis, name)(*args, **kwargs)
+            for name, args, kwargs in commands
+        ]
+
+
+class FakeRedis:
+    """An in-memory stand-in for the redis service."""
+
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.sets: dict[str, dict[str, float]] = {}  # sorted sets
+        self.strings: dict[str, str] = {}
+        self.expiries: dict[str, int] = {}  # {key: ttl, ...}
+
+    def _stores(self) -> list[dict[str, Any]]:
+        return [self.hashes, self.sets, self.strings]
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    async def exists(self, *keys: str) -> int:
+        return sum(key in store for key in keys for store in self._stores())
+
+    async def delete(self, *keys: str) -> int:
+        for key in keys:
+            self.expiries.pop(key, None)
+
+        return sum(
+            store.pop(key, None) is not None for key in keys for store in self._stores()
+        )
+
+    async def rename(self, src: str, dst: str) -> None:
+        await self.delete(dst)
+        for store in self._stores():
+            if src in store:
+                store[dst] = store.pop(src)
+
+        if src in self.expiries:
+            self.expiries[dst] = self.expiries.pop(src)
+
+    async def renamenx(self, src: str, dst: str) -> bool:
+        if await self.exists(dst):
+            return False
+
+        await self.rename(src, dst)
+        return True
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        if not await self.exists(key):
+            return False
+
+        self.expiries[key] = seconds
+        return True
+
+    async def scan_iter(self, match: str) -> AsyncIterator[bytes]:
+        for store in self._stores():
+            for key in list(store):
+                if fnmatch.fnmatchcase(key, match):
+                    yield key.encode()
+
+    async def get(self, key: str) -> bytes | None:
+        value = self.strings.get(key)
+        return value.encode() if value is not None else None
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.delete(key)
+        self.strings[key] = str(value)
+
+    async def hgetall(self, key: str) -> dict[bytes, bytes]:
+        return {f.encode(): v.encode() for f, v in self.hashes.get(key, {}).items()}
+
+    async def hset(self, key: str, field: str, value: Any) -> None:
+        self.hashes.setdefault(key, {})[field] = str(value)
+
+    async def hincrby(self, key: str, field: str, amount: int) -> int:
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, "0")) + amount)
+        return int(fields[field])
+
+    async def zadd(self, key: str, mapping: dict[str, float]) -> int:
+        members = self.sets.setdefault(key, {})
+        added = len(mapping.keys() - members.keys())
+        members.update(mapping)
+        return added
+
+    async def zrem(self, key: str, *members: str) -> int:
+        removed = sum(self.sets.get(key, {}).pop(m, None) is not None for m in members)
+        if not self.sets.get(key, True):
+            await self.delete(key)
+
+        return removed
+
+    async def zrevrange(
+        self,
+        key: str,
+        start: int,
+        end: int,
+        withscores: bool = False,
+    ) -> list[Any]:
+        members = sorted(self.sets.get(key, {}).items(), key=lambda m: -m[1])
+        return [
+            (member.encode(), value) if withscores else member.encode()
+            for member, value in members[start : end + 1]
+        ]
+
+    async def zrevrank(self, key: str, member: str) -> int | None:
+        members = self.sets.get(key, {})
+        if member not in members:
+            return None
+
+        return sum(v > members[member] for v in members.values())
+
+    async def zscore(self, key: str, member: str) -> float | None:
+        return self.sets.get(key, {}).get(member)
+
+    async def zcount(self, key: str, min: str, max: str) -> int:
+        assert min.startswith("(") and max == "+inf"
+        return sum(v > float(min[1:]) for v in self.sets.get(key, {}).values())
+
+
+@pytest.fixture
+def redis(monkeypatch: pytest.MonkeyPatch) -> FakeRedis:
+    redis = FakeRedis()
+    monkeypatch.setattr(services, "redis", redis)
+    return redis
+
+
 pytest_plugins = []
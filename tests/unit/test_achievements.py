@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import ast
+import random
+import re
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+import app.state
+from app.constants.gamemodes import GameMode
+from app.repositories.achievements import Achievement
+from app.usecases import achievements as achievements_usecases
+
+BASE_SQL_PATH = Path(__file__).parents[2] / "migrations/base.sql"
+
+ACHIEVEMENT_REGEX = re.compile(
+    r"insert into achievements \(id, file, name, `desc`, cond\) "
+    r"values \((\d+), '((?:[^']|'')*)', '((?:[^']|'')*)', "
+    r"'((?:[^']|'')*)', '((?:[^']|'')*)'\);",
+)
+
+
+def load_default_achievements() -> list[Achievement]:
+    achievements: list[Achievement] = []
+    for match in ACHIEVEMENT_REGEX.finditer(BASE_SQL_PATH.read_text()):
+        id, file, name, desc, cond = (v.replace("''", "'") for v in match.groups())
+        achievements.append(
+            {"id": int(id), "file": file, "name": name, "desc": desc, "cond": cond},
+        )
+
+    return achievements
+
+
+def make_score(rng: random.Random, user_id: int = 3) -> Any:
+    return SimpleNamespace(
+        player=SimpleNamespace(id=user_id),
+        mode=GameMode(rng.randrange(4)),
+        mods=rng.getrandbits(16),
+        sr=rng.uniform(0, 12),
+        perfect=rng.random() < 0.5,
+        max_combo=rng.randrange(5000),
+    )
+
+
+@pytest.fixture
+def achievements(monkeypatch: pytest.MonkeyPatch) -> list[Achievement]:
+    monkeypatch.setattr(achievements_usecases, "_achievements", {})
+    monkeypatch.setattr(achievements_usecases, "_checks", {})
+
+    achievements = load_default_achievements()
+    achievements_usecases.load_achievements(achievements)
+
+    app.state.cache.user_achievements.clear()
+    return achievements
+
+
+async def test_unlock_for_score_matches_conditions(
+    achievements: list[Achievement],
+) -> None:
+    assert len(achievements) > 50
+
+    rng = random.Random(727)
+    for user_id in range(1, 501):
+        score = make_score(rng, user_id)
+        app.state.cache.user_achievements[user_id] = set()
+
+        expected = [
+            a
+            for a in achievements
+            if eval(a["cond"], {"score": score, "mode_vn": score.mode.as_vanilla})
+        ]
+
+        assert await achievements_usecases.unlock_for_score(score) == expected
+
+
+async def test_unlocked_achievements_are_cached(
+    achievements: list[Achievement],
+) -> None:
+    score: Any = SimpleNamespace(
+        player=SimpleNamespace(id=3),
+        mode=GameMode.VANILLA_OSU,
+        mods=0,
+        sr=1.5,
+        perfect=True,
+        max_combo=727,
+    )
+    app.state.cache.user_achievements[3] = set()
+
+    unlocked = await achievements_usecases.unlock_for_score(score)
+    assert unlocked
+    assert app.state.cache.user_achievements[3] == {a["id"] for a in unlocked}
+
+    # achievements are only unlocked once
+    assert await achievements_usecases.unlock_for_score(score) == []
+
+    # unless they failed to be persisted
+    achievements_usecases.forget_unlocked(3, unlocked[0]["id"])
+    assert await achievements_usecases.unlock_for_score(score) == unlocked[:1]
+
+
+@pytest.mark.parametrize(
+    ("condition", "mode"),
+    [
+        ("score.sr > 1 and mode_vn == 2", 2),
+        ("0 == mode_vn", 0),
+        ("score.sr > 1 or mode_vn == 2", None),
+        ("score.mods & 8", None),
+    ],
+)
+def test_get_condition_mode(condition: str, mode: int | None) -> None:
+    expr = ast.parse(condition, mode="eval").body
+    assert achievements_usecases._get_condition_mode(expr) == mode
+
+
+def test_invalid_conditions_are_skipped(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(achievements_usecases, "_achievements", {})
+    monkeypatch.setattr(achievements_usecases, "_checks", {})
+
+    achievements_usecases.load_achievements(
+        [
+            {"id": 1, "file": "a", "name": "a", "desc": "a", "cond": "score.("},
+            {"id": 2, "file": "b", "name": "b", "desc": "b", "cond": "True"},
+            {"id": 3, "file": "c", "name": "c", "desc": "c", "cond": "True # c"},
+        ],
+    )
+
+    assert list(achievements_usecases._achievements) == [2, 3]
+
+
+async def test_failing_conditions_are_skipped(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(achievements_usecases, "_achievements", {})
+    monkeypatch.setattr(achievements_usecases, "_checks", {})
+
+    achievements_usecases.load_achievements(
+        [
+            {"id": 1, "file": "a", "name": "a", "desc": "a", "cond": "score.pp > 1"},
+            {"id": 2, "file": "b", "name": "b", "desc": "b", "cond": "1 / 0"},
+            {"id": 3, "file": "c", "name": "c", "desc": "c", "cond": "score.sr > 1"},
+        ],
+    )
+
+    score: Any = SimpleNamespace(
+        player=SimpleNamespace(id=3),
+        mode=GameMode.VANILLA_OSU,
+        sr=1.5,
+    )
+    app.state.cache.user_achievements[3] = set()
+
+    # one achievement's condition raising doesn't affect the others
+    unlocked = await achievements_usecases.unlock_for_score(score)
+    assert [a["id"] for a in unlocked] == [3]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+from pathlib import Path
+
+import orjson
+import pytest
+
+import app.usecases.client_versions as client_versions
+
+
+async def test_allowlist_seed_and_refresh(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    seed_path = tmp_path / "client_versions.json"
+    seed_path.write_bytes(orjson.dumps({"stable40": ["2023-10-01", "2023-10-11"]}))
+    monkeypatch.setattr(client_versions, "SEED_PATH", seed_path)
+    monkeypatch.setattr(client_versions, "_allowlists", {})
+
+    fetches: list[str] = []
+
+    async def fetch_allowed_versions(stream: str) -> frozenset[date]:
+        fetches.append(stream)
+        return frozenset({date(2023, 10, 20)})
+
+    monkeypatch.setattr(
+        client_versions,
+        "_fetch_allowed_versions",
+        fetch_allowed_versions,
+    )
+
+    client_versions.load_seed()
+
+    # the seeded allowlist is stale; it's served while being refreshed
+    versions = await client_versions.get_allowed_versions("stable40")
+    assert versions == frozenset({date(2023, 10, 1), date(2023, 10, 11)})
+
+    await client_versions._refreshes["stable40"]
+    assert await client_versions.get_allowed_versions("stable40") == frozenset(
+        {date(2023, 10, 20)},
+    )
+    assert fetches == ["stable40"]
+    assert orjson.loads(seed_path.read_bytes()) == {"stable40": ["2023-10-20"]}
+
+    # unseeded streams are fetched on first use
+    assert await client_versions.get_allowed_versions("cuttingedge") == frozenset(
+        {date(2023, 10, 20)},
+    )
+
+
+async def test_failed_refreshes_are_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(client_versions, "_allowlists", {})
+    monkeypatch.setattr(client_versions, "_failed_refreshes", {})
+
+    fetches: list[str] = []
+
+    async def fetch_allowed_versions(stream: str) -> frozenset[date]:
+        fetches.append(stream)
+        raise ConnectionError
+
+    monkeypatch.setattr(
+        client_versions,
+        "_fetch_allowed_versions",
+        fetch_allowed_versions,
+    )
+
+    # the osu! api isn't retried until some time after a failure
+    for _ in range(3):
+        assert await client_versions.get_allowed_versions("stable40") is None
+    assert fetches == ["stable40"]
+
+    client_versions._failed_refreshes["stable40"] -= client_versions.FAILED_REFRESH_TTL
+    assert await client_versions.get_allowed_versions("stable40") is None
+    assert fetches == ["stable40", "stable40"]
+
+
+async def test_cancelled_requests_dont_cancel_refreshes(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(client_versions, "SEED_PATH", tmp_path / "versions.json")
+    monkeypatch.setattr(client_versions, "_allowlists", {})
+
+    fetched = asyncio.Event()
+
+    async def fetch_allowed_versions(stream: str) -> frozenset[date]:
+        await fetched.wait()
+        return frozenset({date(2023, 10, 20)})
+
+    monkeypatch.setattr(
+        client_versions,
+        "_fetch_allowed_versions",
+        fetch_allowed_versions,
+    )
+
+    first = asyncio.create_task(client_versions.get_allowed_versions("stable40"))
+    second = asyncio.create_task(client_versions.get_allowed_versions("stable40"))
+    await asyncio.sleep(0)
+
+    # the request which began the refresh is cancelled (e.g. it disconnected)
+    first.cancel()
+    fetched.set()
+
+    assert await second == frozenset({date(2023, 10, 20)})
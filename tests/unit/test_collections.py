@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from collections.abc import Container
+
+from app.constants.privileges import Privileges
+from app.objects.collections import Players
+from app.objects.player import Player
+
+
+def test_players_indexes():
+    players = Players()
+    cmyui = Player(id=3, name="cmyui", priv=Privileges.UNRESTRICTED)
+    rxhddt = Player(id=4, name="Rx HDDT", priv=Privileges.VERIFIED)
+
+    players.append(cmyui)
+    players.append(rxhddt)
+
+    assert players.get(token=cmyui.token) is cmyui
+    assert players.get(id=4) is rxhddt
+    assert players.get(name="rx hddt") is rxhddt
+    # players may also be found by name
+    names: Container[object] = players
+    assert "Rx HDDT" in names and "rx hddt" not in names
+    assert players.ids == {3, 4}
+    assert players.unrestricted == {cmyui}
+    assert players.restricted == {rxhddt}
+    assert players.staff == set()
+
+    rxhddt.priv = Privileges.UNRESTRICTED | Privileges.MODERATOR
+    players.update_privs(rxhddt)
+    assert players.unrestricted == {cmyui, rxhddt}
+    assert players.restricted == set()
+    assert players.staff == {rxhddt}
+
+    # the sets returned are copies
+    players.staff.add(cmyui)
+    assert players.staff == {rxhddt}
+
+    # tokens are invalidated before removal on logout
+    token = cmyui.token
+    cmyui.token = ""
+    players.remove(cmyui)
+
+    assert players.get(token=token) is None
+    assert players.get(id=3) is None
+    assert cmyui not in players
+    assert players.unrestricted == {rxhddt}
+
+
+def test_players_shared_id():
+    # tourney clients share an id & name with the player's main session
+    players = Players()
+    main = Player(id=3, name="cmyui", priv=Privileges.UNRESTRICTED)
+    tourney = Player(id=3, name="cmyui", priv=Privileges.UNRESTRICTED)
+
+    players.append(main)
+    players.append(tourney)
+    assert players.get(id=3) is main
+
+    players.remove(main)
+    assert players.get(id=3) is tourney
+    assert players.get(name="cmyui") is tourney
+    assert players.get(token=tourney.token) is tourney
+
+    players.remove(tourney)
+    assert players.get(id=3) is None
+    assert players.get(name="cmyui") is None
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from app.usecases import duplicate_scores
+from app.utils import BloomFilter
+from tests.conftest import FakeDatabase
+
+
+@pytest.fixture(autouse=True)
+def checksums(database: FakeDatabase) -> set[str]:
+    checksums = {"a" * 32}
+
+    def results(query: str, values: dict[str, Any]) -> list[Any]:
+        return [(1,)] if values["checksum"] in checksums else []
+
+    database.results = results
+    return checksums
+
+
+async def test_is_duplicate_without_filter(database: FakeDatabase) -> None:
+    # until the filter is loaded, every check goes to sql
+    assert await duplicate_scores.is_duplicate("a" * 32)
+    assert not await duplicate_scores.is_duplicate("b" * 32)
+    assert len(database.queries) == 2
+
+
+async def test_is_duplicate_with_filter(
+    database: FakeDatabase,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(duplicate_scores, "_filter", BloomFilter(capacity=1_000))
+    duplicate_scores.add("a" * 32)
+
+    # checksums which aren't in the filter don't need to be checked in sql
+    assert not await duplicate_scores.is_duplicate("b" * 32)
+    assert not database.queries
+
+    assert await duplicate_scores.is_duplicate("a" * 32)
+    assert len(database.queries) == 1
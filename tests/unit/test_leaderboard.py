@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+import app.state
+from app.api.domains.osu import LeaderboardType
+from app.api.domains.osu import getScores
+from app.constants.gamemodes import GameMode
+from app.constants.mods import Mods
+from app.objects.beatmap import Beatmap
+from app.objects.beatmap import RankedStatus
+from app.objects.leaderboard import LEADERBOARD_SIZE
+from app.objects.leaderboard import Leaderboard
+from app.usecases import leaderboards
+from app.usecases import map_ranks
+from tests.conftest import FakeDatabase
+from tests.conftest import FakeRedis
+from tests.conftest import FakeRow
+
+
+def make_row(score_id: int, user_id: int, value: float) -> dict[str, Any]:
+    return {"id": score_id, "_score": value, "userid": user_id}
+
+
+def test_leaderboard_incremental_updates() -> None:
+    rng = random.Random(727)
+    best: dict[int, dict[str, Any]] = {}  # {user_id: row, ...}
+    leaderboard = Leaderboard([])
+
+    for score_id in range(5_000):
+        user_id = rng.randrange(300)
+
+        # NOTE: best scores are chosen by pp, so a player's
+        # new best may have a lower value on the leaderboard.
+        row = make_row(score_id, user_id, rng.randrange(1_000))
+        leaderboard.add(row)
+        best[user_id] = row
+
+        if leaderboard.stale:
+            # rebuild, as we would from sql
+            leaderboard = Leaderboard(
+                sorted(best.values(), key=lambda r: -r["_score"])[:LEADERBOARD_SIZE],
+            )
+
+        expected = sorted(r["_score"] for r in best.values())[::-1]
+        assert [r["_score"] for r in leaderboard.scores] == expected[:LEADERBOARD_SIZE]
+
+    assert len(leaderboard.scores) == LEADERBOARD_SIZE
+
+
+async def test_changes_during_load_are_not_cached(
+    database: FakeDatabase,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    app.state.cache.leaderboards.clear()
+
+    loaded = asyncio.Event()
+    loads = 0
+
+    async def from_sql(*args: Any) -> Leaderboard:
+        nonlocal loads
+        loads += 1
+        await loaded.wait()
+        return Leaderboard([make_row(1, 3, 727)])
+
+    monkeypatch.setattr(Leaderboard, "from_sql", from_sql)
+
+    # concurrent requests only load the leaderboard once
+    requests = [
+        asyncio.create_task(leaderboards.fetch("a" * 32, 0, "score")) for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+
+    leaderboards.invalidate_map("a" * 32)
+    loaded.set()
+
+    results = await asyncio.gather(*requests)
+    assert loads == 1
+    assert results[0] is results[1] is results[2]
+
+    # the map was invalidated during the load
+    assert ("a" * 32, 0, "score") not in app.state.cache.leaderboards
+
+    await leaderboards.fetch("a" * 32, 0, "score")
+    assert loads == 2
+    assert ("a" * 32, 0, "score") in app.state.cache.leaderboards
+
+
+async def test_get_scores_renders_cached_personal_best(
+    database: FakeDatabase,
+    redis: FakeRedis,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    app.state.cache.leaderboards.clear()
+
+    rows: list[dict[str, Any]] = [
+        {
+            "id": score_id,
+            "_score": 1_000 - user_id,
+            "max_combo": 100,
+            "n50": 0,
+            "n100": 0,
+            "n300": 100,
+            "nmiss": 0,
+            "nkatu": 0,
+            "ngeki": 0,
+            "perfect": 1,
+            "mods": 0,
+            "time": 1_700_000_000,
+            "userid": user_id,
+            "name": f"user{user_id}",
+        }
+        for score_id, user_id in enumerate(range(3, 6), start=1)
+    ]
+    leaderboard = Leaderboard(rows)
+    app.state.cache.leaderboards.set(("a" * 32, 0, "score"), leaderboard, size=4)
+    await map_ranks.store(
+        map_ranks.get_key("a" * 32, 0),
+        {str(r["userid"]): r["_score"] for r in rows},
+    )
+
+    async def from_md5(md5: str, set_id: int = -1) -> Any:
+        async def fetch_rating() -> float:
+            return 10.0
+
+        return SimpleNamespace(
+            md5=md5,
+            id=1,
+            set_id=1,
+            status=RankedStatus.Ranked,
+            full_name="artist - title [diff]",
+            fetch_rating=fetch_rating,
+        )
+
+    monkeypatch.setattr(Beatmap, "from_md5", from_md5)
+
+    player = SimpleNamespace(
+        id=4,
+        full_name="[tag] user4",
+        restricted=False,
+        status=SimpleNamespace(mode=GameMode.VANILLA_OSU, mods=Mods.NOMOD),
+    )
+
+    response = await getScores(
+        player=player,  # type: ignore[arg-type]
+        requesting_from_editor_song_select=False,
+        leaderboard_version=4,
+        leaderboard_type=LeaderboardType.Top,
+        map_md5="a" * 32,
+        map_filename="artist - title (mapper) [diff].osu",
+        mode_arg=0,
+        map_set_id=1,
+        mods_arg=0,
+        map_package_hash="",
+        aqn_files_found=False,
+    )
+
+    lines = bytes(response.body).decode().split("\n")
+    assert lines[4] == "2|[tag] user4|996|100|0|0|100|0|0|0|1|0|4|2|1700000000|1"
+    assert lines[5:] == [
+        f"{r['id']}|{r['name']}|{r['_score']}|100|0|0|100|0|0|0|1|0|"
+        f"{r['userid']}|{rank}|1700000000|1"
+        for rank, r in enumerate(rows, start=1)
+    ]
+
+    # the leaderboard & personal best were served from the cache
+    assert not database.queries
+
+
+async def test_personal_bests_are_looked_up_in_map_ranks(
+    database: FakeDatabase,
+    redis: FakeRedis,
+) -> None:
+    app.state.cache.leaderboards.clear()
+
+    key = ("a" * 32, 0, "score")
+    rows = [make_row(score_id, score_id, 1_000 - score_id) for score_id in range(60)]
+    app.state.cache.leaderboards.set(key, Leaderboard(rows[:LEADERBOARD_SIZE]))
+    await map_ranks.store(
+        map_ranks.get_key("a" * 32, 0),
+        {str(r["userid"]): r["_score"] for r in rows},
+    )
+
+    # players without a score on the map aren't queried from sql
+    assert await leaderboards.get_leaderboard_scores(*key[:2], 727, "score") == (
+        rows[:LEADERBOARD_SIZE],
+        None,
+    )
+    assert not database.queries
+
+    # & the rank of those outside of the top scores comes from the map's ranks
+    database.results = lambda query, values: [FakeRow(rows[55])]
+    _, personal_best = await leaderboards.get_leaderboard_scores(
+        *key[:2],
+        55,
+        "score",
+    )
+    assert personal_best == {"id": 55, "_score": 945, "rank": 56}
+    assert len(database.queries) == 1
+
+    # the cached leaderboard's size includes the personal bests it holds
+    assert app.state.cache.leaderboards.size == LEADERBOARD_SIZE + 1 + 1
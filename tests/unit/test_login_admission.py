@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.api.domains.cho import LoginAdmission
+
+
+async def test_login_admission_queues_and_rejects():
+    admission = LoginAdmission(max_concurrency=1, max_queued=1)
+    release = asyncio.Event()
+
+    async def login() -> None:
+        async with admission.slot():
+            await release.wait()
+
+    first = asyncio.create_task(login())
+    await asyncio.sleep(0)
+    assert admission.queued == 0 and not admission.full
+
+    second = asyncio.create_task(login())
+    await asyncio.sleep(0)
+    assert admission.queued == 1 and admission.full
+
+    # delays grow with the queue, but are jittered
+    assert 1000 <= admission.retry_delay() <= 3000
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert admission.queued == 0
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from app.constants.gamemodes import GameMode
+from app.usecases import map_ranks
+from tests.conftest import FakeRedis
+
+
+def make_score(user_id: int, value: int) -> Any:
+    return SimpleNamespace(
+        bmap=SimpleNamespace(md5="a" * 32),
+        player=SimpleNamespace(id=user_id),
+        mode=GameMode.VANILLA_OSU,
+        score=value,
+        pp=0.0,
+    )
+
+
+async def test_placements_match_best_scores(
+    redis: FakeRedis,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    rng = random.Random(727)
+
+    # {user_id: score, ...} as in sql
+    best: dict[int, int] = {u: rng.randrange(1_000_000) for u in range(100)}
+    builds = 0
+
+    async def fetch_best_scores(map_md5: str, mode: int) -> dict[str, float]:
+        nonlocal builds
+        builds += 1
+        return {str(u): v for u, v in best.items()}
+
+    monkeypatch.setattr(map_ranks, "fetch_best_scores", fetch_best_scores)
+
+    for _ in range(1_000):
+        value = rng.randrange(1_000_000)
+        expected = 1 + sum(v > value for v in best.values())
+        assert await map_ranks.get_placement("a" * 32, 0, value) == expected
+
+        # a new best score (which may be lower, as bests are chosen by pp)
+        user_id = rng.randrange(150)
+        best[user_id] = value
+        await map_ranks.add_score(make_score(user_id, value))
+
+    assert builds == 1
+
+
+async def test_empty_sets_are_built(
+    redis: FakeRedis,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def fetch_best_scores(map_md5: str, mode: int) -> dict[str, float]:
+        return {}
+
+    monkeypatch.setattr(map_ranks, "fetch_best_scores", fetch_best_scores)
+
+    assert await map_ranks.get_placement("a" * 32, 0, 0) == 1
+    assert await redis.exists(map_ranks.get_key("a" * 32, 0))
+
+
+async def test_sets_expiry_is_refreshed_on_use(
+    redis: FakeRedis,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    key = map_ranks.get_key("a" * 32, 0)
+    await map_ranks.store(key, {"3": 500})
+    assert redis.expiries[key] == map_ranks.TTL
+
+    redis.expiries[key] = 1
+    assert await map_ranks.get_best_score("a" * 32, 0, 3) == 500
+    assert await map_ranks.get_best_score("a" * 32, 0, 4) is None
+    assert redis.expiries[key] == map_ranks.TTL
+
+
+async def test_restrictions_update_built_sets(
+    redis: FakeRedis,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def fetch_player_best_scores(user_id: int) -> list[tuple[str, int, float]]:
+        return [("a" * 32, 0, 500), ("b" * 32, 0, 500)]
+
+    monkeypatch.setattr(
+        map_ranks,
+        "_fetch_player_best_scores",
+        fetch_player_best_scores,
+    )
+
+    key = map_ranks.get_key("a" * 32, 0)
+    await map_ranks.store(key, {"3": 500, "4": 100})
+
+    await map_ranks.remove_player(3)
+    assert redis.sets[key] == {map_ranks.SENTINEL: -float("inf"), "4": 100}
+
+    await map_ranks.add_player(3)
+    assert redis.sets[key]["3"] == 500
+
+    # sets which haven't been built aren't created
+    assert map_ranks.get_key("b" * 32, 0) not in redis.sets
+
+    await map_ranks.invalidate_maps(["a" * 32])
+    assert not redis.sets
+
+
+async def test_changes_during_build_are_discarded(
+    redis: FakeRedis,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    fetched = asyncio.Event()
+    builds = 0
+
+    async def fetch_best_scores(map_md5: str, mode: int) -> dict[str, float]:
+        nonlocal builds
+        builds += 1
+        if builds == 1:
+            await fetched.wait()
+            return {"3": 500}
+
+        return {"4": 100}
+
+    monkeypatch.setattr(map_ranks, "fetch_best_scores", fetch_best_scores)
+
+    placement = asyncio.create_task(map_ranks.get_placement("a" * 32, 0, 300))
+    await asyncio.sleep(0)
+
+    # the map's scores were deleted during the build
+    await map_ranks.invalidate_maps(["a" * 32])
+    fetched.set()
+
+    assert await placement == 1
+    assert builds == 2
+    assert redis.sets[map_ranks.get_key("a" * 32, 0)] == {
+        map_ranks.SENTINEL: -float("inf"),
+        "4": 100,
+    }
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import app.state
+from app.usecases import osu_files
+
+OSU_FILE = b"osu file format v14\n\n[HitObjects]\n256,192,1000,1,0,0:0:0:0:\n"
+OSU_FILE_MD5 = hashlib.md5(OSU_FILE).hexdigest()
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, content: bytes) -> None:
+        self.status_code = status_code
+        self.content = content
+
+    def read(self) -> bytes:
+        return self.content
+
+
+class FakeHTTPClient:
+    def __init__(self, content: bytes = OSU_FILE) -> None:
+        self.content = content
+        self.requests: list[str] = []
+
+    async def get(self, url: str, **kwargs: Any) -> FakeResponse:
+        self.requests.append(url)
+        await asyncio.sleep(0.01)  # let concurrent callers pile up
+        return FakeResponse(200, self.content)
+
+
+@pytest.fixture
+def http_client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> FakeHTTPClient:
+    monkeypatch.setattr(osu_files, "OSU_FILES_PATH", tmp_path)
+    osu_files._index.clear()
+
+    client = FakeHTTPClient()
+    monkeypatch.setattr(app.state.services, "http_client", client)
+    return client
+
+
+def test_get_osu_file_path_is_sharded(
+    http_client: FakeHTTPClient, tmp_path: Path
+) -> None:
+    assert osu_files.get_osu_file_path(1234567) == tmp_path / "567" / "1234567.osu"
+    assert osu_files.get_osu_file_path(5) == tmp_path / "005" / "5.osu"
+
+
+async def test_concurrent_misses_download_once(http_client: FakeHTTPClient) -> None:
+    paths = await asyncio.gather(
+        *[osu_files.ensure_local_osu_file(1234, OSU_FILE_MD5) for _ in range(10)],
+    )
+
+    assert len(http_client.requests) == 1
+    assert set(paths) == {osu_files.get_osu_file_path(1234)}
+    assert osu_files.get_osu_file_path(1234).read_bytes() == OSU_FILE
+
+
+async def test_unchanged_file_is_not_rehashed(
+    http_client: FakeHTTPClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    await osu_files.ensure_local_osu_file(1234, OSU_FILE_MD5)
+
+    def hash_file(path: Path) -> str:
+        raise AssertionError("file should not be hashed")
+
+    monkeypatch.setattr(osu_files, "_hash_file", hash_file)
+
+    path = await osu_files.ensure_local_osu_file(1234, OSU_FILE_MD5)
+    assert path == osu_files.get_osu_file_path(1234)
+    assert len(http_client.requests) == 1
+
+
+async def test_outdated_file_is_redownloaded(http_client: FakeHTTPClient) -> None:
+    path = osu_files.get_osu_file_path(1234)
+    path.parent.mkdir()
+    path.write_bytes(b"an old version of the map")
+
+    assert await osu_files.ensure_local_osu_file(1234, OSU_FILE_MD5) == path
+    assert len(http_client.requests) == 1
+    assert path.read_bytes() == OSU_FILE
+
+
+async def test_legacy_file_is_migrated(
+    http_client: FakeHTTPClient, tmp_path: Path
+) -> None:
+    legacy_path = tmp_path / "1234.osu"
+    legacy_path.write_bytes(OSU_FILE)
+
+    path = await osu_files.ensure_local_osu_file(1234, OSU_FILE_MD5)
+
+    assert path == osu_files.get_osu_file_path(1234)
+    assert not legacy_path.exists()
+    assert not http_client.requests
@@ -667,3 +667,129 @@ def test_write_match_abort():
 )
 def test_write_switch_tournament_server(test_input, expected):
     assert app.packets.switch_tournament_server(test_input) == expected
+
+
+@pytest.mark.parametrize(
+    ("fields", "values"),
+    [
+        ((), ()),
+        ((app.packets.osuTypes.i32,), (-1,)),
+        (
+            (
+                app.packets.osuTypes.i32,
+                app.packets.osuTypes.u8,
+                app.packets.osuTypes.f32,
+            ),
+            (1001, 255, 0.5),
+        ),
+        (
+            (app.packets.osuTypes.string, app.packets.osuTypes.i64),
+            ("cmyui", 2**40),
+        ),
+        (
+            (
+                app.packets.osuTypes.i16,
+                app.packets.osuTypes.string,
+                app.packets.osuTypes.u16,
+                app.packets.osuTypes.i32_list,
+                app.packets.osuTypes.f64,
+            ),
+            (-2, "", 65535, [1, 2, 3], 1.5),
+        ),
+        (
+            (app.packets.osuTypes.channel, app.packets.osuTypes.raw),
+            (("#osu", "general chat", 3), b"\x01\x02"),
+        ),
+    ],
+)
+def test_packet_schema_matches_write(fields, values):
+    schema = app.packets.PacketSchema(app.packets.ServerPackets.NOTIFICATION, *fields)
+    assert schema.encode(*values) == app.packets.write(
+        app.packets.ServerPackets.NOTIFICATION,
+        *zip(values, fields),
+    )
+
+
+# reading
+
+
+class _ReadMessage(app.packets.BasePacket):
+    def __init__(self, reader: app.packets.BanchoPacketReader) -> None:
+        self.msg = reader.read_message()
+
+    async def handle(self, player):
+        ...
+
+
+class _ReadUserIds(app.packets.BasePacket):
+    def __init__(self, reader: app.packets.BanchoPacketReader) -> None:
+        self.user_ids = reader.read_i32_list_i16l()
+
+    async def handle(self, player):
+        ...
+
+
+class _ReadNothing(app.packets.BasePacket):
+    async def handle(self, player):
+        ...
+
+
+READ_PACKET_MAP = {
+    app.packets.ClientPackets.SEND_PUBLIC_MESSAGE: _ReadMessage,
+    app.packets.ClientPackets.USER_STATS_REQUEST: _ReadUserIds,
+    app.packets.ClientPackets.LOGOUT: _ReadNothing,
+}
+
+
+def test_read_multiple_packets():
+    body = (
+        # send public message
+        b"\x01\x00\x00\x1c\x00\x00\x00"
+        b"\x00\x0b\x0fwoah woah crazy\x0b\x04#osu\x00\x00\x00\x00"
+        # ping (not in the packet map; skipped)
+        b"\x04\x00\x00\x00\x00\x00\x00"
+        # logout (body not consumed by the handler)
+        b"\x02\x00\x00\x04\x00\x00\x00\x00\x00\x00\x00"
+        # user stats request
+        b"\x55\x00\x00\x0a\x00\x00\x00\x02\x00\x01\x00\x00\x00\xe9\x03\x00\x00"
+    )
+
+    with memoryview(body) as body_view:
+        packets = list(app.packets.BanchoPacketReader(body_view, READ_PACKET_MAP))
+
+    assert [type(p) for p in packets] == [_ReadMessage, _ReadNothing, _ReadUserIds]
+
+    message, _, user_stats = packets
+    assert isinstance(message, _ReadMessage)
+    assert message.msg == app.packets.Message("", "woah woah crazy", "#osu", 0)
+    assert isinstance(user_stats, _ReadUserIds)
+    assert user_stats.user_ids == (1, 1001)
+
+
+@pytest.mark.parametrize(
+    ("test_input", "expected"),
+    [
+        (b"\x00", ""),
+        (b"\x0b\x00", ""),
+        (b"\x0b\x05cmyui", "cmyui"),
+        (b"\x0b\x80\x01" + b"a" * 128, "a" * 128),
+        ("\x0b\x06ロロ".encode(), "ロロ"),
+    ],
+)
+def test_read_string(test_input, expected):
+    reader = app.packets.BanchoPacketReader(memoryview(test_input), {})
+    assert reader.read_string() == expected
+    assert reader.offset == len(test_input)
+
+
+@pytest.mark.parametrize(
+    ("test_input", "expected"),
+    [
+        (b"\xff", (-1, 255)),
+        (b"\x80", (-128, 128)),
+        (b"\x7f", (127, 127)),
+    ],
+)
+def test_read_i8_u8(test_input, expected):
+    reader = app.packets.BanchoPacketReader(memoryview(test_input * 2), {})
+    assert (reader.read_i8(), reader.read_u8()) == expected
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import app.settings
+import app.state
+from app.constants.mods import Mods
+from app.repositories import difficulty_attributes as difficulty_attributes_repo
+from app.usecases import performance
+from app.usecases.performance import ScoreParams
+
+
+def write_osu_file(path: Path) -> None:
+    hit_objects = [
+        f"{i * 97 % 512},{i * 53 % 384},{1000 + i * 150},1,0,0:0:0:0:"
+        for i in range(200)
+    ]
+    path.write_text(
+        "\n".join(
+            [
+                "osu file format v14",
+                "",
+                "[Difficulty]",
+                "HPDrainRate:5",
+                "CircleSize:4",
+                "OverallDifficulty:8",
+                "ApproachRate:9",
+                "SliderMultiplier:1.4",
+                "SliderTickRate:1",
+                "",
+                "[TimingPoints]",
+                "0,300,4,2,0,100,1,0",
+                "",
+                "[HitObjects]",
+                *hit_objects,
+            ],
+        ),
+    )
+
+
+async def test_calculate_performances_in_pool(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(app.settings, "PERFORMANCE_MAX_PROCESSES", 1)
+
+    osu_file_path = tmp_path / "1.osu"
+    write_osu_file(osu_file_path)
+
+    scores = [ScoreParams(mode=0, acc=acc) for acc in (95, 98, 100)]
+
+    # without the worker processes running, calculations are done inline
+    expected = await performance.calculate_performances(str(osu_file_path), scores)
+    assert expected[0]["performance"]["pp"] < expected[2]["performance"]["pp"]
+
+    await performance.start()
+    try:
+        results = await performance.calculate_performances(
+            str(osu_file_path),
+            scores,
+        )
+    finally:
+        await performance.stop()
+
+    assert results == expected
+    assert performance.pending == 0
+
+
+class BrokenExecutor(ThreadPoolExecutor):
+    def submit(self, *args: Any, **kwargs: Any) -> Any:
+        raise BrokenProcessPool("A child process terminated abruptly.")
+
+
+async def test_calculate_performances_retries_broken_pool(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    osu_file_path = tmp_path / "1.osu"
+    write_osu_file(osu_file_path)
+
+    scores = [ScoreParams(mode=0, acc=98)]
+    expected = await performance.calculate_performances(str(osu_file_path), scores)
+
+    # the calculation is retried once on the replacement pool
+    monkeypatch.setattr(performance, "_executor", BrokenExecutor())
+    monkeypatch.setattr(performance, "_create_executor", ThreadPoolExecutor)
+    assert (
+        await performance.calculate_performances(
+            str(osu_file_path),
+            scores,
+        )
+        == expected
+    )
+
+    monkeypatch.setattr(performance, "_executor", BrokenExecutor())
+    monkeypatch.setattr(performance, "_create_executor", BrokenExecutor)
+    with pytest.raises(BrokenProcessPool):
+        await performance.calculate_performances(str(osu_file_path), scores)
+
+    await performance.stop()
+    assert performance.pending == 0
+
+
+async def test_calculate_performances_timeout_excludes_queueing(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def calculate_slowly(*args: Any) -> tuple[list[Any], performance.CacheStats]:
+        time.sleep(0.3)
+        return [], performance.CacheStats(0, 0, 0, 0)
+
+    monkeypatch.setattr(app.settings, "PERFORMANCE_CALC_TIMEOUT", 0.5)
+    monkeypatch.setattr(performance, "_calculate_performances", calculate_slowly)
+    monkeypatch.setattr(performance, "_executor", ThreadPoolExecutor(1))
+    monkeypatch.setattr(performance, "_idle_workers", asyncio.Semaphore(1))
+
+    # the last calculation waits longer than the timeout for the worker
+    await asyncio.gather(
+        *(performance.calculate_performances("1.osu", []) for _ in range(3)),
+    )
+
+    # but a calculation which runs longer than it still times out
+    monkeypatch.setattr(app.settings, "PERFORMANCE_CALC_TIMEOUT", 0.1)
+    with pytest.raises(asyncio.TimeoutError):
+        await performance.calculate_performances("1.osu", [])
+
+    await performance.stop()
+    assert performance.pending == 0
+
+
+async def test_calculate_performances_caches_beatmaps(tmp_path: Path) -> None:
+    osu_file_path = tmp_path / "1.osu"
+    write_osu_file(osu_file_path)
+
+    map_md5 = "1" * 32
+    scores = [ScoreParams(mode=0, acc=98, mods=Mods.HIDDEN | Mods.NIGHTCORE)]
+
+    uncached = await performance.calculate_performances(str(osu_file_path), scores)
+    assert map_md5 not in performance._beatmaps
+
+    hits = performance._beatmaps.hits
+    for _ in range(2):
+        results = await performance.calculate_performances(
+            str(osu_file_path),
+            scores,
+            map_md5,
+        )
+        assert results == uncached
+
+    # the second calculation used the parsed beatmap & difficulty from the first
+    assert performance._beatmaps.hits == hits + 1
+    assert (map_md5, 0, Mods.HIDDEN | Mods.DOUBLETIME) in performance._difficulties
+
+
+def test_difficulty_mods() -> None:
+    mods = Mods.HIDDEN | Mods.NIGHTCORE | Mods.SUDDENDEATH | Mods.NOFAIL
+    assert performance.difficulty_mods(mods) == Mods.HIDDEN | Mods.DOUBLETIME
+
+
+async def test_calculate_performances_saves_difficulties(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    osu_file_path = tmp_path / "1.osu"
+    write_osu_file(osu_file_path)
+
+    saved: list[dict[str, Any]] = []
+
+    async def create_or_update(attributes: dict[str, Any]) -> None:
+        saved.append(attributes)
+
+    monkeypatch.setattr(app.state.services.database, "is_connected", True)
+    monkeypatch.setattr(
+        difficulty_attributes_repo,
+        "create_or_update",
+        create_or_update,
+    )
+
+    map_md5 = "2" * 32
+    for mods in (Mods.DOUBLETIME, Mods.NIGHTCORE, Mods.HIDDEN | Mods.DOUBLETIME):
+        results = await performance.calculate_performances(
+            str(osu_file_path),
+            [ScoreParams(mode=0, acc=acc, mods=mods) for acc in (95, 100)],
+            map_md5,
+        )
+
+    # attributes are saved once for each set of difficulty changing mods
+    assert [attributes["mods"] for attributes in saved] == [
+        Mods.DOUBLETIME,
+        Mods.HIDDEN | Mods.DOUBLETIME,
+    ]
+    assert saved[-1]["calc_version"] == performance.CALCULATOR_VERSION
+    assert saved[-1]["stars"] == results[0]["difficulty"]["stars"]
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import app.packets
+from app.constants.gamemodes import GameMode
+from app.constants.privileges import Privileges
+from app.objects.player import ModeData
+from app.objects.player import Player
+
+
+def test_player_packet_cache_invalidation() -> None:
+    player = Player(id=3, name="cmyui", priv=Privileges.UNRESTRICTED)
+    player.stats[GameMode.VANILLA_OSU] = ModeData(
+        tscore=0,
+        rscore=0,
+        pp=0,
+        acc=0.0,
+        plays=0,
+        playtime=0,
+        max_combo=0,
+        total_hits=0,
+        rank=0,
+        grades={},
+    )
+
+    presence = player.presence_packet
+    stats = player.stats_packet
+    assert presence == app.packets.user_presence(player)
+    assert stats == app.packets.user_stats(player)
+    assert player.presence_packet is presence
+    assert player.stats_packet is stats
+
+    # privilege changes affect presence only
+    player.priv |= Privileges.SUPPORTER
+    assert player.stats_packet is stats
+    assert player.presence_packet == app.packets.user_presence(player) != presence
+
+    # in-place status/stats changes require explicit invalidation
+    player.gm_stats.pp = 727
+    player.invalidate_status_packets()
+    assert player.stats_packet == app.packets.user_stats(player) != stats
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from typing import Any
+
+import pytest
+
+from app.constants.gamemodes import GameMode
+from app.usecases import rankings
+from tests.conftest import FakeDatabase
+from tests.conftest import FakeRedis
+from tests.conftest import FakeRow
+
+
+@pytest.fixture
+def players(database: FakeDatabase, redis: FakeRedis) -> dict[int, dict[str, Any]]:
+    rng = random.Random(727)
+    players: dict[int, dict[str, Any]] = {
+        user_id: {
+            "player_id": user_id,
+            "country": rng.choice(["ca", "us"]),
+            "pp": rng.choice([0, rng.randrange(1, 10_000)]),
+        }
+        for user_id in range(3, 500)
+    }
+
+    def results(query: str, values: dict[str, Any]) -> list[Any]:
+        if "user_ids" in values:
+            return [
+                FakeRow(players[user_id])
+                for user_id in values["user_ids"]
+                if user_id in players
+            ]
+
+        # the stats of all players, to build the rankings from
+        return [
+            FakeRow(id=p["player_id"], pp=p["pp"], country=p["country"])
+            for p in players.values()
+        ]
+
+    database.results = results
+    return players
+
+
+@pytest.mark.parametrize("country", [None, "CA"])
+async def test_pages_match_sql_ordering(
+    players: dict[int, dict[str, Any]],
+    country: str | None,
+) -> None:
+    expected = sorted(
+        (
+            p
+            for p in players.values()
+            if p["pp"] > 0 and (country is None or p["country"] == country.lower())
+        ),
+        key=lambda p: -p["pp"],
+    )
+
+    pages = []
+    for offset in range(0, 500, 50):
+        pages += await rankings.fetch_page(GameMode.VANILLA_OSU, offset, 50, country)
+
+    assert [p["pp"] for p in pages] == [p["pp"] for p in expected]
+    assert {p["player_id"] for p in pages} == {p["player_id"] for p in expected}
+
+
+async def test_pages_past_the_end_are_empty(
+    players: dict[int, dict[str, Any]],
+    database: FakeDatabase,
+) -> None:
+    await rankings.ensure_built(GameMode.VANILLA_OSU)
+    database.queries.clear()
+
+    assert await rankings.fetch_page(GameMode.VANILLA_OSU, 10_000, 50) == []
+    assert not database.queries
+
+
+async def test_unbuilt_rankings_are_built_on_first_read(
+    players: dict[int, dict[str, Any]],
+    database: FakeDatabase,
+    redis: FakeRedis,
+) -> None:
+    # only players whose stats have changed are in the set
+    await redis.zadd(rankings.get_key(GameMode.VANILLA_OSU), {"3": 10_000})
+
+    # concurrent requests only build the rankings once
+    pages = await asyncio.gather(
+        *(rankings.fetch_page(GameMode.VANILLA_OSU, 0, 50) for _ in range(3)),
+    )
+    assert len(database.queries) == 1 + 3
+    assert pages[0] == pages[1] == pages[2]
+    assert len(pages[0]) == 50
+    assert len(redis.sets[rankings.get_key(GameMode.VANILLA_OSU)]) == len(players)
+
+    # the built rankings are reused
+    await rankings.fetch_page(GameMode.VANILLA_OSU, 50, 50)
+    assert len(database.queries) == 1 + 3 + 1
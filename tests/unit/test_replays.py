@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from app.usecases import replays
+
+REPLAY = os.urandom(200_000)
+
+
+@pytest.fixture(autouse=True)
+def replays_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(replays, "REPLAYS_PATH", tmp_path)
+    return tmp_path
+
+
+async def read_stream(score_id: int) -> bytes:
+    return b"".join([chunk async for chunk in replays.stream(score_id)])
+
+
+def test_get_replay_path_is_sharded(replays_path: Path) -> None:
+    assert replays.get_replay_path(1234567) == replays_path / "567" / "1234567.osr"
+    assert replays.get_replay_path(5, compressed=True) == (
+        replays_path / "005" / "5.osr.gz"
+    )
+
+
+async def test_save_and_read() -> None:
+    assert not await replays.exists(1234)
+    assert await replays.get_size(1234) is None
+    assert await replays.read(1234) is None
+
+    await replays.save(1234, REPLAY)
+
+    assert await replays.exists(1234)
+    assert await replays.get_size(1234) == len(REPLAY)
+    assert await replays.read(1234) == REPLAY
+    assert await read_stream(1234) == REPLAY
+
+
+async def test_stream_missing_replay() -> None:
+    with pytest.raises(FileNotFoundError):
+        await read_stream(1234)
+
+
+async def test_compressed_replay() -> None:
+    await replays.save(1234, REPLAY)
+    assert replays.compress(1234)
+
+    assert not replays.get_replay_path(1234).exists()
+    assert replays.get_replay_path(1234, compressed=True).exists()
+
+    assert await replays.get_size(1234) == len(REPLAY)
+    assert await replays.read(1234) == REPLAY
+    assert await read_stream(1234) == REPLAY
+
+
+async def test_legacy_replay(replays_path: Path) -> None:
+    legacy_path = replays_path / "1234.osr"
+    legacy_path.write_bytes(REPLAY)
+
+    # legacy replays are served until they're migrated
+    assert await replays.read(1234) == REPLAY
+
+    assert replays.migrate(1234)
+    assert not legacy_path.exists()
+    assert replays.get_replay_path(1234).read_bytes() == REPLAY
+
+    assert not replays.migrate(1234)
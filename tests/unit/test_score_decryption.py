@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+from py3rijndael import Pkcs7Padding
+from py3rijndael import RijndaelCbc
+
+from app.usecases import score_decryption
+from app.usecases.score_decryption import Py3RijndaelBackend
+from app.usecases.score_decryption import RijndaelBackend
+from app.usecases.score_decryption import TableRijndaelBackend
+
+OSU_VERSION = "20231030"
+
+
+def encrypt(plaintext: bytes, iv: bytes, osu_version: str = OSU_VERSION) -> bytes:
+    cipher = RijndaelCbc(
+        key=score_decryption.get_key(osu_version),
+        iv=iv,
+        padding=Pkcs7Padding(32),
+        block_size=32,
+    )
+    ciphertext: bytes = cipher.encrypt(plaintext)
+    return ciphertext
+
+
+@pytest.fixture(params=[TableRijndaelBackend, Py3RijndaelBackend])
+def backend(request: pytest.FixtureRequest) -> RijndaelBackend:
+    backend_cls: type[RijndaelBackend] = request.param
+    return backend_cls()
+
+
+def test_fastest_backend_is_selected() -> None:
+    assert score_decryption.backend.name == "table"
+
+
+@pytest.mark.parametrize("length", [0, 1, 31, 32, 33, 200, 1000])
+def test_decrypt(backend: RijndaelBackend, length: int) -> None:
+    plaintext = os.urandom(length)
+    iv = os.urandom(32)
+
+    assert backend.decrypt(OSU_VERSION, iv, encrypt(plaintext, iv)) == plaintext
+
+
+def test_decrypt_with_multiple_versions(backend: RijndaelBackend) -> None:
+    iv = os.urandom(32)
+    for osu_version in ("20230814", "20231030", "20240123"):
+        ciphertext = encrypt(b"727:cmyui", iv, osu_version)
+        assert backend.decrypt(osu_version, iv, ciphertext) == b"727:cmyui"
+
+
+def test_decrypt_invalid_length(backend: RijndaelBackend) -> None:
+    with pytest.raises(ValueError):
+        backend.decrypt(OSU_VERSION, os.urandom(32), os.urandom(33))
+
+    with pytest.raises(ValueError):
+        backend.decrypt(OSU_VERSION, os.urandom(16), os.urandom(32))
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from functools import partial
+
+import pytest
+
+from app.usecases import score_pipeline
+
+
+async def test_score_pipeline_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(score_pipeline, "RETRY_BACKOFF", 0)
+    calls = {"flaky": 0, "broken": 0}
+    failures: list[str] = []
+
+    async def flaky() -> None:
+        calls["flaky"] += 1
+        if calls["flaky"] < score_pipeline.MAX_ATTEMPTS:
+            raise ConnectionError
+
+    async def broken() -> None:
+        calls["broken"] += 1
+        raise ConnectionError
+
+    score_pipeline.start()
+    for name, func in (("flaky", flaky), ("broken", broken)):
+        await score_pipeline.submit(
+            name,
+            func,
+            on_failure=partial(failures.append, name),
+        )
+    await score_pipeline.stop()
+
+    # failing jobs are retried, but never raise into the submitter
+    assert calls == {
+        "flaky": score_pipeline.MAX_ATTEMPTS,
+        "broken": score_pipeline.MAX_ATTEMPTS,
+    }
+    assert failures == ["broken"]
+
+    # without any workers, jobs are run inline
+    await score_pipeline.submit("flaky", flaky)
+    assert calls["flaky"] == score_pipeline.MAX_ATTEMPTS + 1
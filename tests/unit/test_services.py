@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import ipaddress
+
+import app.state.services
+from app.utils import LRUCache
+
+
+class _FakeGeoIPReader:
+    def __init__(self) -> None:
+        self.lookups: list[str] = []
+
+    def get(self, ip: str) -> dict[str, object]:
+        self.lookups.append(ip)
+        return {
+            "country": {"iso_code": "CA"},
+            "location": {"latitude": 43.65, "longitude": -79.38},
+        }
+
+
+async def test_fetch_geoloc_from_mmdb(monkeypatch):
+    reader = _FakeGeoIPReader()
+    monkeypatch.setattr(app.state.services, "geoip_reader", reader)
+    monkeypatch.setattr(
+        app.state.services,
+        "geoloc_cache",
+        LRUCache(maxsize=8, ttl=60),
+    )
+
+    ip = ipaddress.ip_address("1.2.3.4")
+    expected = {
+        "latitude": 43.65,
+        "longitude": -79.38,
+        "country": {"acronym": "ca", "numeric": 38},
+    }
+
+    assert await app.state.services.fetch_geoloc(ip) == expected
+    assert await app.state.services.fetch_geoloc(ip, headers={}) == expected
+    assert reader.lookups == ["1.2.3.4"]
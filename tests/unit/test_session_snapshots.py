@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+import app.settings
+import app.state
+import app.usecases.session_snapshots as session_snapshots
+from app.constants.gamemodes import GameMode
+from app.constants.privileges import Privileges
+from app.objects.player import Action
+from app.objects.player import Player
+from tests.conftest import FakeDatabase
+from tests.conftest import FakeRedis
+from tests.conftest import FakeRow
+
+
+async def test_save_and_load_file_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(app.settings, "SESSION_SNAPSHOT_STORAGE", "file")
+    monkeypatch.setattr(session_snapshots, "FILE_PATH", tmp_path / "snapshot.json")
+    monkeypatch.setattr(app.state.sessions, "bot", None, raising=False)
+
+    player = Player(id=3, name="cmyui", priv=Privileges.UNRESTRICTED, utc_offset=2)
+    player.status.action = Action.Playing
+    player.enqueue(b"\x05\x00\x00\x04\x00\x00\x00\x03\x00\x00\x00")
+
+    app.state.sessions.players.append(player)
+    try:
+        await session_snapshots.save()
+    finally:
+        app.state.sessions.players.remove(player)
+
+    sessions = await session_snapshots._load()
+    assert len(sessions) == 1
+    assert sessions[0]["token"] == player.token
+    assert sessions[0]["status"]["action"] == Action.Playing
+    assert bytes.fromhex(sessions[0]["queue"]) == player.dequeue()
+
+    # snapshots are only restored once
+    assert await session_snapshots._load() == []
+
+
+async def test_restore_fetches_all_sessions_at_once(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    database: FakeDatabase,
+    redis: FakeRedis,
+) -> None:
+    monkeypatch.setattr(app.settings, "SESSION_SNAPSHOT_STORAGE", "file")
+    monkeypatch.setattr(session_snapshots, "FILE_PATH", tmp_path / "snapshot.json")
+    monkeypatch.setattr(app.state.sessions, "bot", None, raising=False)
+
+    # the account of player 4 was deleted while we were down
+    players = [
+        Player(id=user_id, name=f"user{user_id}", priv=Privileges.UNRESTRICTED)
+        for user_id in (3, 4, 5)
+    ]
+    for player in players:
+        app.state.sessions.players.append(player)
+    try:
+        await session_snapshots.save()
+    finally:
+        for player in players:
+            app.state.sessions.players.remove(player)
+
+    await redis.zadd("bancho:leaderboard:0", {"3": 1_000, "5": 2_000})
+
+    def results(query: str, values: dict[str, Any]) -> list[Any]:
+        assert sorted(values["user_ids"]) == [3, 4, 5]
+        if "FROM users" in query:
+            return [
+                FakeRow(
+                    id=user_id,
+                    name=f"user{user_id}",
+                    priv=Privileges.UNRESTRICTED,
+                    pw_bcrypt="",
+                    clan_id=0,
+                    clan_priv=0,
+                    silence_end=0,
+                    donor_end=0,
+                    api_key=None,
+                )
+                for user_id in (3, 5)
+            ]
+        elif "FROM stats" in query:
+            return [
+                FakeRow(
+                    id=user_id,
+                    mode=0,
+                    tscore=0,
+                    rscore=0,
+                    pp=pp,
+                    acc=0.0,
+                    plays=0,
+                    playtime=0,
+                    max_combo=0,
+                    total_hits=0,
+                    xh_count=0,
+                    x_count=0,
+                    sh_count=0,
+                    s_count=0,
+                    a_count=0,
+                )
+                for user_id, pp in ((3, 1_000), (5, 2_000))
+            ]
+        else:
+            return [FakeRow(user1=3, user2=5, type="friend")]
+
+    database.results = results
+
+    def restored_players() -> list[Player]:
+        return [p for p in app.state.sessions.players if p.id in (3, 5)]
+
+    await session_snapshots.restore(database)  # type: ignore[arg-type]
+    try:
+        assert len(database.queries) == 3
+
+        assert app.state.sessions.players.get(id=4) is None
+        restored = [app.state.sessions.players.get(id=user_id) for user_id in (3, 5)]
+        for player, restored_player in zip(players[::2], restored):
+            assert restored_player is not None
+            assert restored_player.token == player.token
+
+        assert restored[0] is not None and restored[1] is not None
+        assert restored[0].stats[GameMode.VANILLA_OSU].rank == 2
+        assert restored[1].stats[GameMode.VANILLA_OSU].rank == 1
+        assert restored[0].friends == {1, 5}
+        assert restored[1].friends == {1}
+    finally:
+        for player in restored_players():
+            app.state.sessions.players.remove(player)
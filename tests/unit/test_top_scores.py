@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import random
+
+from app.objects.top_scores import TopScore
+from app.objects.top_scores import TopScores
+
+
+def test_top_scores_incremental_updates():
+    rng = random.Random(727)
+    best: dict[str, TopScore] = {}  # {map_md5: score, ...}
+    top_scores = TopScores([], 0)
+
+    for _ in range(2_000):
+        map_md5 = f"{rng.randrange(300):032x}"
+        score = TopScore(rng.uniform(0, 500), rng.uniform(70, 100), map_md5)
+
+        top_scores.add(score, replaces_best=map_md5 in best)
+        best[map_md5] = score
+
+        if top_scores.stale:
+            # rebuild, as we would from sql
+            top_scores = TopScores(
+                sorted(best.values(), key=lambda s: s.pp, reverse=True),
+                len(best),
+            )
+
+        expected = TopScores(
+            sorted(best.values(), key=lambda s: s.pp, reverse=True),
+            len(best),
+        )
+        assert top_scores.scores == expected.scores
+        assert top_scores.count == expected.count
+        assert top_scores.pp == expected.pp
+
+    assert len(top_scores.scores) == 100
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+
+import bcrypt
+
+import app.state
+import app.usecases.passwords
+from app.utils import BloomFilter
+from app.utils import LRUCache
+
+
+def test_lru_cache_eviction():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache["a"] == 1  # `a` is now most recently used
+
+    cache["c"] = 3
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert (cache.hits, cache.misses) == (3, 0)
+
+
+def test_lru_cache_ttl(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+    cache: LRUCache[str, int] = LRUCache(maxsize=8, ttl=60)
+    cache["a"] = 1
+    assert cache.get("a") == 1
+
+    now += 61
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_sized_entries():
+    cache: LRUCache[str, bytes] = LRUCache(maxsize=10)
+    cache.set("a", b"a" * 4, size=4)
+    cache.set("b", b"b" * 4, size=4)
+    assert cache.size == 8
+
+    cache.set("c", b"c" * 4, size=4)
+    assert "a" not in cache and cache.size == 8
+
+    # replacing an entry replaces its size
+    cache.set("b", b"b", size=1)
+    assert cache.size == 5
+
+    # entries may be resized as their values grow
+    cache.resize("b", 9)
+    assert "c" not in cache and cache.size == 9
+
+    # entries larger than the cache aren't kept
+    cache.set("d", b"d" * 11, size=11)
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_bloom_filter():
+    bloom_filter = BloomFilter(capacity=10_000, error_rate=0.01)
+
+    added = [f"added {i}" for i in range(10_000)]
+    for item in added:
+        bloom_filter.add(item)
+
+    # items which were added are always found
+    assert all(item in bloom_filter for item in added)
+    assert len(bloom_filter) == 10_000
+
+    # others are found at roughly the error rate
+    false_positives = sum(f"not added {i}" in bloom_filter for i in range(10_000))
+    assert false_positives < 10_000 * 0.01 * 2
+
+
+async def test_verify_password():
+    pw_md5 = b"5f4dcc3b5aa765d61d8327deb882cf99"
+    pw_bcrypt = bcrypt.hashpw(pw_md5, bcrypt.gensalt(rounds=4))
+
+    assert not await app.usecases.passwords.verify_password(b"wrong", pw_bcrypt)
+    assert pw_bcrypt not in app.state.cache.bcrypt
+
+    assert await app.usecases.passwords.verify_password(pw_md5, pw_bcrypt)
+    assert app.state.cache.bcrypt[pw_bcrypt] == pw_md5
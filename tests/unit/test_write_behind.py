@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import pytest
+
+from app.usecases import write_behind
+from tests.conftest import FakeDatabase
+from tests.conftest import FakeRedis
+
+
+@pytest.fixture(autouse=True)
+def buffer(monkeypatch: pytest.MonkeyPatch) -> write_behind.Buffer:
+    buffer = write_behind.Buffer()
+    monkeypatch.setattr(write_behind, "_buffer", buffer)
+    monkeypatch.setattr(write_behind, "_sealed", [])
+    return buffer
+
+
+async def test_flush_batches_deltas(
+    database: FakeDatabase,
+    redis: FakeRedis,
+) -> None:
+    for _ in range(3):
+        write_behind.record_map_play("a" * 32, passed=True)
+    write_behind.record_map_play("b" * 32, passed=False)
+    write_behind.record_stats(3, 0, plays=1, playtime=60, tscore=727, total_hits=5)
+    write_behind.record_stats(3, 0, plays=1, playtime=30, tscore=100, total_hits=0)
+    write_behind.record_stats(4, 1, plays=1)
+    write_behind.record_latest_activity(3)
+
+    await write_behind.flush()
+
+    # a single statement per table
+    assert len(database.queries) == 3
+    (_, maps), (_, stats), (_, users) = database.queries
+
+    assert maps == {
+        "md5_0": "a" * 32,
+        "plays_0": 3,
+        "passes_0": 3,
+        "md5_1": "b" * 32,
+        "plays_1": 1,
+        "passes_1": 0,
+    }
+    assert stats["id_0"] == 3 and stats["mode_0"] == 0
+    assert stats["plays_0"] == 2 and stats["playtime_0"] == 90
+    assert stats["tscore_0"] == 827 and stats["total_hits_0"] == 5
+    assert stats["id_1"] == 4 and stats["mode_1"] == 1 and stats["plays_1"] == 1
+    assert users["id_0"] == 3
+
+    # the flushed journal is cleared
+    assert not redis.hashes
+
+    await write_behind.flush()
+    assert len(database.queries) == 3
+
+
+async def test_flush_is_chunked(
+    database: FakeDatabase,
+    redis: FakeRedis,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(write_behind, "FLUSH_BATCH_SIZE", 10)
+
+    for user_id in range(25):
+        write_behind.record_latest_activity(user_id)
+
+    await write_behind.flush()
+    assert [len(values) // 2 for _, values in database.queries] == [10, 10, 5]
+
+
+async def test_failed_flush_is_retried(
+    database: FakeDatabase,
+    redis: FakeRedis,
+) -> None:
+    write_behind.record_map_play("a" * 32, passed=False)
+
+    database.fail = True
+    await write_behind.flush()
+    assert not database.queries
+    assert redis.hashes
+
+    write_behind.record_map_play("a" * 32, passed=True)
+
+    database.fail = False
+    await write_behind.flush()
+
+    # both the failed & the new generation are flushed
+    assert [values for _, values in database.queries] == [
+        {"md5_0": "a" * 32, "plays_0": 1, "passes_0": 0},
+        {"md5_0": "a" * 32, "plays_0": 1, "passes_0": 1},
+    ]
+    assert not redis.hashes
+
+
+async def test_journal_is_recovered(
+    database: FakeDatabase,
+    redis: FakeRedis,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    write_behind.record_stats(3, 2, plays=1, tscore=500)
+    write_behind.record_latest_activity(3)
+    await write_behind._drain_journal()
+
+    # simulate a crash before the deltas were flushed
+    monkeypatch.setattr(write_behind, "_buffer", write_behind.Buffer())
+    assert redis.hashes
+
+    await write_behind.recover()
+
+    assert len(database.queries) == 2
+    (_, stats), (_, users) = database.queries
+    assert stats["plays_0"] == 1 and stats["tscore_0"] == 500
+    assert stats["playtime_0"] == 0
+    assert users["id_0"] == 3
+    assert not redis.hashes
+
+
+def test_record_stats_rejects_non_counters() -> None:
+    with pytest.raises(ValueError):
+        write_behind.record_stats(3, 0, pp=727)
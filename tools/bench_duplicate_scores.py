@@ -0,0 +1,160 @@
+#!/usr/bin/env python3.11
+"""\
+Benchmark for the duplicate score check done on every score submission.
+
+Builds a scratch copy of the `scores` table with millions of rows, then
+compares the latency of the duplicate check with no index on
+`online_checksum`, with the index, and with the bloom filter of
+`app.usecases.duplicate_scores` in front of the index.
+
+Most submissions are not duplicates, so checksums which aren't in the
+table are looked up, along with a fraction of ones which are.
+
+usage: python3.11 bench_duplicate_scores.py [--rows N] [--lookups N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import sys
+import time
+from collections.abc import Sequence
+
+import databases
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.settings
+    from app.usecases import duplicate_scores
+    from app.utils import BloomFilter
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+TABLE = "scores_duplicate_bench"
+INDEX = "scores_online_checksum_index"
+
+COLUMNS = (
+    "map_md5, score, pp, acc, max_combo, mods, n300, n100, n50, nmiss, "
+    "ngeki, nkatu, grade, status, mode, play_time, time_elapsed, "
+    "client_flags, userid, perfect"
+)
+
+
+async def create_table(db: databases.Database, rows: int) -> None:
+    await db.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    await db.execute(f"CREATE TABLE {TABLE} LIKE scores")
+
+    await db.execute(
+        f"INSERT INTO {TABLE} ({COLUMNS}, online_checksum) "
+        "VALUES (MD5(RAND()), 727727, 272.7, 98.76, 727, 72, 700, 20, 7, 2, "
+        "120, 12, 'A', 2, 0, NOW(), 0, 0, 3, 0, MD5(RAND()))",
+    )
+
+    # double the table until it has enough rows
+    count = 1
+    while count < rows:
+        await db.execute(
+            f"INSERT INTO {TABLE} ({COLUMNS}, online_checksum) "
+            f"SELECT {COLUMNS}, MD5(RAND()) FROM {TABLE} "
+            f"LIMIT {min(count, rows - count)}",
+        )
+        count += min(count, rows - count)
+        print(f"  {count} rows")
+
+    if await db.fetch_one(f"SHOW INDEX FROM {TABLE} WHERE Key_name = '{INDEX}'"):
+        await db.execute(f"DROP INDEX {INDEX} ON {TABLE}")
+
+
+async def time_lookups(
+    db: databases.Database,
+    checksums: Sequence[str],
+    bloom_filter: BloomFilter | None = None,
+) -> float:
+    """Return the mean time taken to check whether each checksum exists."""
+    st = time.perf_counter()
+
+    for checksum in checksums:
+        if bloom_filter is not None and checksum not in bloom_filter:
+            continue
+
+        await db.fetch_one(
+            f"SELECT 1 FROM {TABLE} WHERE online_checksum = :checksum",
+            {"checksum": checksum},
+        )
+
+    return (time.perf_counter() - st) / len(checksums)
+
+
+async def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the duplicate score check against a large table",
+    )
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--lookups", type=int, default=1_000)
+    parser.add_argument(
+        "--duplicate-ratio",
+        type=float,
+        default=0.05,
+        help="the fraction of lookups for checksums which exist",
+    )
+    args = parser.parse_args(argv)
+
+    async with databases.Database(app.settings.DB_DSN) as db:
+        try:
+            print(f"Creating {TABLE} with {args.rows} rows:")
+            await create_table(db, args.rows)
+
+            existing = [
+                row["online_checksum"]
+                for row in await db.fetch_all(
+                    f"SELECT online_checksum FROM {TABLE} ORDER BY RAND() "
+                    f"LIMIT {int(args.lookups * args.duplicate_ratio)}",
+                )
+            ]
+            checksums = existing + [
+                secrets.token_hex(16) for _ in range(args.lookups - len(existing))
+            ]
+            random.shuffle(checksums)
+
+            print("Building bloom filter...")
+            st = time.perf_counter()
+            bloom_filter = BloomFilter(
+                capacity=args.rows * duplicate_scores.CAPACITY_FACTOR,
+                error_rate=duplicate_scores.ERROR_RATE,
+            )
+            async for row in db.iterate(f"SELECT online_checksum FROM {TABLE}"):
+                bloom_filter.add(row["online_checksum"])
+            build_time = time.perf_counter() - st
+
+            print(
+                f"  built in {build_time:.1f}s, "
+                f"{bloom_filter.num_bits / 8 / (1024 * 1024):.1f}MB, "
+                f"{bloom_filter.num_hashes} hashes",
+            )
+
+            # the full table scan is slow; only do a few lookups
+            unindexed_checksums = checksums[: max(10, args.lookups // 100)]
+            unindexed = await time_lookups(db, unindexed_checksums)
+
+            await db.execute(f"CREATE INDEX {INDEX} ON {TABLE} (online_checksum)")
+            indexed = await time_lookups(db, checksums)
+            filtered = await time_lookups(db, checksums, bloom_filter)
+
+            print(f"{args.lookups} lookups ({args.duplicate_ratio:.0%} duplicates):")
+            print(f"  no index         {unindexed * 1000:10.3f}ms")
+            print(f"  index            {indexed * 1000:10.3f}ms")
+            print(f"  bloom + index    {filtered * 1000:10.3f}ms")
+        finally:
+            await db.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3.11
+"""\
+Load test for serving in-game beatmap leaderboards (osu-osz2-getscores).
+
+Requests the global leaderboards of the maps with the most scores in the
+configured database, with many concurrent requests from players who have
+(& haven't) set scores on them; comparing the previous sql-only queries
+against the leaderboard cache of `app.usecases.leaderboards`.
+
+The database is only read from.
+
+usage: python3.11 bench_leaderboards.py [--maps N] [--requests N] [--concurrency N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Sequence
+from types import SimpleNamespace
+from typing import Any
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.state
+    from app.api.domains.osu import LeaderboardType
+    from app.api.domains.osu import get_leaderboard_scores
+    from app.constants.mods import Mods
+    from app.usecases import leaderboards
+    from app.usecases import map_ranks
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+# (map_md5, mode, user_id)
+Request = tuple[str, int, int]
+
+
+async def sql_only(map_md5: str, mode: int, user_id: int) -> Any:
+    player: Any = SimpleNamespace(id=user_id)
+    return await get_leaderboard_scores(
+        LeaderboardType.Top,
+        map_md5,
+        mode,
+        Mods.NOMOD,
+        player,
+        map_ranks.get_scoring_metric(mode),
+    )
+
+
+async def cached(map_md5: str, mode: int, user_id: int) -> Any:
+    return await leaderboards.get_leaderboard_scores(
+        map_md5,
+        mode,
+        user_id,
+        map_ranks.get_scoring_metric(mode),
+    )
+
+
+async def run(
+    serve: Callable[[str, int, int], Awaitable[Any]],
+    requests: Sequence[Request],
+    concurrency: int,
+) -> tuple[float, list[float]]:
+    """Serve all requests; return the total time & each request's latency."""
+    queue = list(reversed(requests))
+    latencies: list[float] = []
+
+    async def worker() -> None:
+        while queue:
+            request = queue.pop()
+            st = time.perf_counter()
+            await serve(*request)
+            latencies.append(time.perf_counter() - st)
+
+    st = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - st, latencies
+
+
+async def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Load test serving beatmap leaderboards from sql & the cache",
+    )
+    parser.add_argument("--maps", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    async with app.state.services.database as db:
+        boards = await db.fetch_all(
+            "SELECT map_md5, mode, COUNT(*) count FROM scores "
+            "WHERE status = 2 GROUP BY map_md5, mode "
+            f"ORDER BY count DESC LIMIT {args.maps}",
+        )
+        if not boards:
+            print("\x1b[;91mNo scores found in the database\x1b[m")
+            return 1
+
+        # restricted players' leaderboards aren't served from the cache
+        user_ids = [
+            row[0] for row in await db.fetch_all("SELECT id FROM users WHERE priv & 1")
+        ]
+
+        # popular maps are requested more often
+        rng = random.Random(727)
+        requests: list[Request] = [
+            (board["map_md5"], board["mode"], rng.choice(user_ids))
+            for board in rng.choices(
+                boards,
+                weights=[board["count"] for board in boards],
+                k=args.requests,
+            )
+        ]
+
+        print(
+            f"{args.requests} requests for {len(boards)} leaderboards "
+            f"({boards[0]['count']} scores on the largest), "
+            f"{args.concurrency} at a time:",
+        )
+
+        # sanity check; the cache must agree with sql (other than
+        # the order of scores with equal values, which sql doesn't define)
+        app.state.cache.leaderboards.clear()
+        for request in requests[:100]:
+            results = []
+            for serve in (sql_only, cached):
+                score_rows, personal_best = await serve(*request)
+                results.append(
+                    (
+                        [row["_score"] for row in score_rows],
+                        personal_best and (personal_best["id"], personal_best["rank"]),
+                    ),
+                )
+            assert results[0] == results[1], request
+
+        cache = app.state.cache.leaderboards
+        cache.clear()
+        cache.hits = cache.misses = 0
+
+        for name, serve in (("sql", sql_only), ("cache", cached)):
+            total, latencies = await run(serve, requests, args.concurrency)
+            quantiles = statistics.quantiles(latencies, n=100)
+
+            print(
+                f"  {name:<6} {args.requests / total:9.1f} req/s | "
+                f"p50 {quantiles[49] * 1000:7.2f}ms | "
+                f"p99 {quantiles[98] * 1000:7.2f}ms",
+            )
+
+        print(f"  cache hit rate: {cache.hits / (cache.hits + cache.misses):.1%}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
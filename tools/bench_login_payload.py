@@ -0,0 +1,111 @@
+#!/usr/bin/env python3.11
+"""\
+Benchmark for the online player data sent in the osu! login response.
+
+Measures the size and build time of the data describing online players
+sent to a logging in player, both with full presence & stats packets for
+every player and with `LOGIN_PRESENCE_BUNDLE` enabled, for a range of
+online player counts.
+
+usage: python3.11 bench_login_payload.py [-n ITERATIONS] [--players N ...]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import timeit
+from collections.abc import Sequence
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.settings
+    import app.state
+    from app.api.domains.cho import online_players_data
+    from app.constants.gamemodes import GameMode
+    from app.constants.privileges import Privileges
+    from app.objects.player import ModeData
+    from app.objects.player import Player
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+def make_player(id: int) -> Player:
+    player = Player(
+        id=id,
+        name=f"player {id}",
+        priv=Privileges.UNRESTRICTED | Privileges.VERIFIED,
+        utc_offset=2,
+        geoloc={
+            "latitude": 43.65,
+            "longitude": -79.38,
+            "country": {"acronym": "ca", "numeric": 38},
+        },
+    )
+    player.status.info_text = "Camellia - Exit This Earth's Atomosphere [Evolution]"
+    player.status.map_md5 = "60b725f10c9c85c70d97880dfe8191b3"
+    player.stats[GameMode.VANILLA_OSU] = ModeData(
+        tscore=3_812_428_392,
+        rscore=1_238_917_112,
+        pp=8291,
+        acc=98.32,
+        plays=3821,
+        playtime=1_000_000,
+        max_combo=2000,
+        total_hits=1_000_000,
+        rank=id,
+        grades={},
+    )
+    return player
+
+
+def fmt_size(n: int) -> str:
+    return f"{n / 1024:.1f}KB" if n >= 1024 else f"{n}B"
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark login response size & time against online players",
+    )
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument(
+        "--players",
+        type=int,
+        nargs="+",
+        default=[100, 500, 1_000, 2_500, 5_000, 10_000],
+    )
+    args = parser.parse_args(argv)
+
+    app.state.sessions.bot = make_player(1)
+    all_players = [app.state.sessions.bot]
+    all_players += [make_player(id) for id in range(3, max(args.players) + 2)]
+
+    for count in args.players:
+        players = all_players[:count]
+
+        results = {}
+        for bundle in (False, True):
+            app.settings.LOGIN_PRESENCE_BUNDLE = bundle
+
+            size = len(online_players_data(players))
+            elapsed = timeit.timeit(
+                lambda: online_players_data(players),
+                number=args.iterations,
+            )
+            results[bundle] = (size, elapsed / args.iterations * 1e3)
+
+        (full_size, full_ms), (bundle_size, bundle_ms) = results[False], results[True]
+        print(
+            f"{count:>6} online: "
+            f"full {fmt_size(full_size):>9} {full_ms:7.3f}ms | "
+            f"bundle {fmt_size(bundle_size):>8} {bundle_ms:7.3f}ms",
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
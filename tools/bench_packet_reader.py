@@ -0,0 +1,312 @@
+#!/usr/bin/env python3.11
+"""\
+Micro-benchmark for `app.packets.BanchoPacketReader`.
+
+Compares the cursor-based reader against the previous implementation,
+which re-sliced its memoryview after every field read, on a handful of
+multi-packet bodies resembling what osu! clients send to `bancho_handler`.
+
+usage: python3.11 bench_packet_reader.py [-n ITERATIONS]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import sys
+import timeit
+from collections.abc import Iterator
+from collections.abc import Sequence
+from typing import Any
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.packets
+    from app.packets import BanchoPacketReader
+    from app.packets import BasePacket
+    from app.packets import ClientPackets
+    from app.packets import Message
+    from app.packets import ReplayAction
+    from app.packets import ReplayFrame
+    from app.packets import ReplayFrameBundle
+    from app.packets import ScoreFrame
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+class LegacyBanchoPacketReader:
+    """The previous reader, which re-slices `body_view` after each read."""
+
+    def __init__(self, body_view: memoryview, packet_map: Any) -> None:
+        self.body_view = body_view
+        self.packet_map = packet_map
+        self.current_len = 0
+
+    def __iter__(self) -> Iterator[BasePacket]:
+        return self
+
+    def __next__(self) -> BasePacket:
+        while self.body_view:
+            data = struct.unpack("<HxI", self.body_view[:7])
+            self.body_view = self.body_view[7:]
+            p_type, p_len = ClientPackets(data[0]), data[1]
+
+            if p_type not in self.packet_map:
+                if p_len != 0:
+                    self.body_view = self.body_view[p_len:]
+            else:
+                break
+        else:
+            raise StopIteration
+
+        self.current_len = p_len
+        packet: BasePacket = self.packet_map[p_type](self)
+        return packet
+
+    def read_u8(self) -> int:
+        val = self.body_view[0]
+        self.body_view = self.body_view[1:]
+        return val
+
+    def read_u16(self) -> int:
+        val = int.from_bytes(self.body_view[:2], "little", signed=False)
+        self.body_view = self.body_view[2:]
+        return val
+
+    def read_i32(self) -> int:
+        val = int.from_bytes(self.body_view[:4], "little", signed=True)
+        self.body_view = self.body_view[4:]
+        return val
+
+    def read_u32(self) -> int:
+        val = int.from_bytes(self.body_view[:4], "little", signed=False)
+        self.body_view = self.body_view[4:]
+        return val
+
+    def read_f32(self) -> float:
+        (val,) = struct.unpack_from("<f", self.body_view[:4])
+        self.body_view = self.body_view[4:]
+        return val  # type: ignore[no-any-return]
+
+    def read_i32_list_i16l(self) -> tuple[int, ...]:
+        length = int.from_bytes(self.body_view[:2], "little")
+        self.body_view = self.body_view[2:]
+
+        val = struct.unpack(f'<{"I" * length}', self.body_view[: length * 4])
+        self.body_view = self.body_view[length * 4 :]
+        return val
+
+    def read_string(self) -> str:
+        exists = self.body_view[0] == 0x0B
+        self.body_view = self.body_view[1:]
+
+        if not exists:
+            return ""
+
+        length = shift = 0
+
+        while True:
+            byte = self.body_view[0]
+            self.body_view = self.body_view[1:]
+
+            length |= (byte & 0x7F) << shift
+            if (byte & 0x80) == 0:
+                break
+
+            shift += 7
+
+        val = self.body_view[:length].tobytes().decode()
+        self.body_view = self.body_view[length:]
+        return val
+
+    def read_message(self) -> Message:
+        return Message(
+            sender=self.read_string(),
+            text=self.read_string(),
+            recipient=self.read_string(),
+            sender_id=self.read_i32(),
+        )
+
+    def read_scoreframe(self) -> ScoreFrame:
+        sf = ScoreFrame(*app.packets.SCOREFRAME_FMT.unpack_from(self.body_view[:29]))
+        self.body_view = self.body_view[29:]
+        return sf
+
+    def read_replayframe(self) -> ReplayFrame:
+        return ReplayFrame(
+            button_state=self.read_u8(),
+            taiko_byte=self.read_u8(),
+            x=self.read_f32(),
+            y=self.read_f32(),
+            time=self.read_i32(),
+        )
+
+    def read_replayframe_bundle(self) -> ReplayFrameBundle:
+        raw_data = self.body_view[: self.current_len]
+
+        extra = self.read_i32()
+        framecount = self.read_u16()
+        frames = [self.read_replayframe() for _ in range(framecount)]
+        action = ReplayAction(self.read_u8())
+        scoreframe = self.read_scoreframe()
+        sequence = self.read_u16()
+
+        return ReplayFrameBundle(frames, scoreframe, action, extra, sequence, raw_data)
+
+
+# minimal handlers mirroring the field reads done in app/api/domains/cho.py
+
+
+class ChangeAction(BasePacket):
+    def __init__(self, reader: Any) -> None:
+        self.action = reader.read_u8()
+        self.info_text = reader.read_string()
+        self.map_md5 = reader.read_string()
+        self.mods = reader.read_u32()
+        self.mode = reader.read_u8()
+        self.map_id = reader.read_i32()
+
+    async def handle(self, player: Any) -> None:
+        ...
+
+
+class SendMessage(BasePacket):
+    def __init__(self, reader: Any) -> None:
+        self.msg = reader.read_message()
+
+    async def handle(self, player: Any) -> None:
+        ...
+
+
+class UserIdList(BasePacket):
+    def __init__(self, reader: Any) -> None:
+        self.user_ids = reader.read_i32_list_i16l()
+
+    async def handle(self, player: Any) -> None:
+        ...
+
+
+class SpectateFrames(BasePacket):
+    def __init__(self, reader: Any) -> None:
+        self.frame_bundle = reader.read_replayframe_bundle()
+
+    async def handle(self, player: Any) -> None:
+        ...
+
+
+class Empty(BasePacket):
+    async def handle(self, player: Any) -> None:
+        ...
+
+
+PACKET_MAP: dict[ClientPackets, type[BasePacket]] = {
+    ClientPackets.CHANGE_ACTION: ChangeAction,
+    ClientPackets.SEND_PUBLIC_MESSAGE: SendMessage,
+    ClientPackets.SEND_PRIVATE_MESSAGE: SendMessage,
+    ClientPackets.REQUEST_STATUS_UPDATE: Empty,
+    ClientPackets.USER_STATS_REQUEST: UserIdList,
+    ClientPackets.USER_PRESENCE_REQUEST: UserIdList,
+    ClientPackets.SPECTATE_FRAMES: SpectateFrames,
+}
+
+
+def packet(packet_id: ClientPackets, body: bytes = b"") -> bytes:
+    return struct.pack("<HxI", packet_id, len(body)) + body
+
+
+def string(s: str) -> bytes:
+    return app.packets.write_string(s)
+
+
+def build_bodies() -> dict[str, bytes]:
+    change_action = packet(
+        ClientPackets.CHANGE_ACTION,
+        b"\x02"
+        + string("Camellia - Exit This Earth's Atomosphere [Evolution]")
+        + string("60b725f10c9c85c70d97880dfe8191b3")
+        + struct.pack("<IBi", 64 | 8, 0, 1723723),
+    )
+    ping = packet(ClientPackets.PING)
+    stats_request = packet(
+        ClientPackets.USER_STATS_REQUEST,
+        struct.pack(f"<H{64}I", 64, *range(1000, 1064)),
+    )
+    public_message = packet(
+        ClientPackets.SEND_PUBLIC_MESSAGE,
+        string("")
+        + string("hello everyone, how are we doing")
+        + string("#osu")
+        + b"\x00" * 4,
+    )
+    private_message = packet(
+        ClientPackets.SEND_PRIVATE_MESSAGE,
+        string("") + string("!with hdhr 98%") + string("BanchoBot") + b"\x00" * 4,
+    )
+    frames = b"".join(
+        struct.pack("<BBffi", 1, 0, 256.0 + i, 192.0 - i, 16 * i) for i in range(30)
+    )
+    spectate_frames = packet(
+        ClientPackets.SPECTATE_FRAMES,
+        struct.pack("<iH", 0, 30)
+        + frames
+        + b"\x00"
+        + app.packets.SCOREFRAME_FMT.pack(
+            *(1000, 0, 300, 12, 1, 40, 3, 0, 1_234_567, 300, 312, 0, 200, 0, 0),
+        )
+        + struct.pack("<H", 7),
+    )
+
+    return {
+        "idle poll (ping)": ping,
+        "status change": change_action + packet(ClientPackets.REQUEST_STATUS_UPDATE),
+        "stats request": stats_request + ping,
+        "chat burst": public_message * 3 + private_message + ping,
+        "spectator frames": spectate_frames + spectate_frames,
+        "mixed poll": (
+            change_action + public_message + stats_request + spectate_frames + ping
+        ),
+    }
+
+
+def parse_all(reader_cls: Any, body: bytes) -> list[BasePacket]:
+    return list(reader_cls(memoryview(body), PACKET_MAP))
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the legacy and cursor-based bancho packet readers",
+    )
+    parser.add_argument("-n", "--iterations", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    for name, body in build_bodies().items():
+        # sanity check; both readers must produce identical packets
+        legacy_packets = parse_all(LegacyBanchoPacketReader, body)
+        cursor_packets = parse_all(BanchoPacketReader, body)
+        assert [vars(p) for p in legacy_packets] == [vars(p) for p in cursor_packets]
+
+        legacy = timeit.timeit(
+            lambda: parse_all(LegacyBanchoPacketReader, body),
+            number=args.iterations,
+        )
+        cursor = timeit.timeit(
+            lambda: parse_all(BanchoPacketReader, body),
+            number=args.iterations,
+        )
+
+        legacy_us = legacy / args.iterations * 1e6
+        cursor_us = cursor / args.iterations * 1e6
+        print(
+            f"{name:<18} ({len(body):>5}B, {len(cursor_packets)} packets): "
+            f"legacy {legacy_us:7.2f}us | cursor {cursor_us:7.2f}us | "
+            f"{legacy / cursor:4.2f}x",
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3.11
+"""\
+Micro-benchmark for server packet encoding in `app.packets`.
+
+Compares the per-packet encode cost of the generic `write()` dispatcher
+as it was before packet schemas (splicing the length into the front of
+the buffer) against the precompiled `PacketSchema` encoders.
+
+usage: python3.11 bench_packet_writer.py [-n ITERATIONS]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import sys
+import timeit
+from collections.abc import Callable
+from collections.abc import Sequence
+from typing import Any
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.packets
+    import app.state
+    from app.constants.gamemodes import GameMode
+    from app.constants.mods import Mods
+    from app.objects.channel import Channel
+    from app.objects.match import Match
+    from app.objects.match import MatchTeamTypes
+    from app.objects.match import MatchWinConditions
+    from app.objects.match import SlotStatus
+    from app.objects.player import Action
+    from app.objects.player import ModeData
+    from app.objects.player import Player
+    from app.packets import osuTypes
+    from app.packets import ServerPackets
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+def legacy_write(packid: int, *args: tuple[Any, osuTypes]) -> bytes:
+    """`app.packets.write` as it was before packet schemas."""
+    ret = bytearray(struct.pack("<Hx", packid))
+
+    for p_args, p_type in args:
+        if p_type == osuTypes.raw:
+            ret += p_args
+        elif p_type in app.packets._noexpand_types:
+            ret += app.packets._noexpand_types[p_type](p_args)
+        elif p_type in app.packets._expand_types:
+            ret += app.packets._expand_types[p_type](*p_args)
+
+    ret[3:3] = struct.pack("<I", len(ret) - 3)
+    return bytes(ret)
+
+
+def legacy_user_stats(player: Player) -> bytes:
+    gm_stats = player.gm_stats
+    return legacy_write(
+        ServerPackets.USER_STATS,
+        (player.id, osuTypes.i32),
+        (player.status.action, osuTypes.u8),
+        (player.status.info_text, osuTypes.string),
+        (player.status.map_md5, osuTypes.string),
+        (player.status.mods, osuTypes.i32),
+        (player.status.mode.as_vanilla, osuTypes.u8),
+        (player.status.map_id, osuTypes.i32),
+        (gm_stats.rscore, osuTypes.i64),
+        (gm_stats.acc / 100.0, osuTypes.f32),
+        (gm_stats.plays, osuTypes.i32),
+        (gm_stats.tscore, osuTypes.i64),
+        (gm_stats.rank, osuTypes.i32),
+        (gm_stats.pp, osuTypes.i16),
+    )
+
+
+def legacy_user_presence(player: Player) -> bytes:
+    return legacy_write(
+        ServerPackets.USER_PRESENCE,
+        (player.id, osuTypes.i32),
+        (player.name, osuTypes.string),
+        (player.utc_offset + 24, osuTypes.u8),
+        (player.geoloc["country"]["numeric"], osuTypes.u8),
+        (player.bancho_priv | (player.status.mode.as_vanilla << 5), osuTypes.u8),
+        (player.geoloc["longitude"], osuTypes.f32),
+        (player.geoloc["latitude"], osuTypes.f32),
+        (player.gm_stats.rank, osuTypes.i32),
+    )
+
+
+def legacy_send_message(sender: str, msg: str, recipient: str, sender_id: int) -> bytes:
+    return legacy_write(
+        ServerPackets.SEND_MESSAGE,
+        ((sender, msg, recipient, sender_id), osuTypes.message),
+    )
+
+
+def legacy_update_match(m: Match, send_pw: bool = True) -> bytes:
+    return legacy_write(ServerPackets.UPDATE_MATCH, ((m, send_pw), osuTypes.match))
+
+
+def make_player(id: int) -> Player:
+    player = Player(
+        id=id,
+        name=f"player {id}",
+        priv=1,
+        utc_offset=2,
+        geoloc={
+            "latitude": 43.65,
+            "longitude": -79.38,
+            "country": {"acronym": "ca", "numeric": 38},
+        },
+    )
+    player.status.action = Action.Playing
+    player.status.info_text = "Camellia - Exit This Earth's Atomosphere [Evolution]"
+    player.status.map_md5 = "60b725f10c9c85c70d97880dfe8191b3"
+    player.status.mods = Mods.HIDDEN | Mods.HARDROCK
+    player.status.map_id = 1723723
+    player.stats[GameMode.VANILLA_OSU] = ModeData(
+        tscore=3_812_428_392,
+        rscore=1_238_917_112,
+        pp=8291,
+        acc=98.32,
+        plays=3821,
+        playtime=1_000_000,
+        max_combo=2000,
+        total_hits=1_000_000,
+        rank=42,
+        grades={},
+    )
+    return player
+
+
+def make_match(players: list[Player]) -> Match:
+    match = Match(
+        id=1,
+        name="4ayo tournament: (team a) vs (team b)",
+        password="hunter2",
+        map_name="Camellia - Exit This Earth's Atomosphere [Evolution]",
+        map_id=1723723,
+        map_md5="60b725f10c9c85c70d97880dfe8191b3",
+        host_id=players[0].id,
+        mode=GameMode.VANILLA_OSU,
+        mods=Mods.NOMOD,
+        win_condition=MatchWinConditions.scorev2,
+        team_type=MatchTeamTypes.team_vs,
+        freemods=True,
+        seed=1234,
+        chat_channel=Channel(name="#multi_1", topic="", auto_join=False),
+    )
+    for slot, player in zip(match.slots, players):
+        slot.player = player
+        slot.status = SlotStatus.not_ready
+
+    return match
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark legacy write() against precompiled packet schemas",
+    )
+    parser.add_argument("-n", "--iterations", type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    players = [make_player(id) for id in range(3, 11)]
+    for player in players:
+        app.state.sessions.players.append(player)
+
+    match = make_match(players)
+    message = ("cmyui", "woah woah crazy!! " * 4, "#osu", 3)
+
+    cases: dict[str, tuple[Callable[[], bytes], Callable[[], bytes]]] = {
+        "user_stats": (
+            lambda: legacy_user_stats(players[0]),
+            lambda: app.packets.user_stats(players[0]),
+        ),
+        "user_presence": (
+            lambda: legacy_user_presence(players[0]),
+            lambda: app.packets.user_presence(players[0]),
+        ),
+        "send_message": (
+            lambda: legacy_send_message(*message),
+            lambda: app.packets.send_message(*message),
+        ),
+        "update_match": (
+            lambda: legacy_update_match(match),
+            lambda: app.packets.update_match(match),
+        ),
+    }
+
+    for name, (legacy_fn, schema_fn) in cases.items():
+        # sanity check; both encoders must produce identical packets
+        assert legacy_fn() == schema_fn()
+
+        legacy = timeit.timeit(legacy_fn, number=args.iterations)
+        schema = timeit.timeit(schema_fn, number=args.iterations)
+
+        legacy_us = legacy / args.iterations * 1e6
+        schema_us = schema / args.iterations * 1e6
+        print(
+            f"{name:<14} ({len(schema_fn()):>4}B): "
+            f"write() {legacy_us:6.2f}us | schema {schema_us:6.2f}us | "
+            f"{legacy / schema:4.2f}x",
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3.11
+"""\
+Scaling benchmark for `app.objects.collections.Players` lookups.
+
+Compares the indexed session registry against the previous list-scanning
+implementation for the lookups done on hot paths (`get` by token on every
+bancho poll, `get` by id & name, and the privilege sets), for a range of
+online session counts.
+
+usage: python3.11 bench_players.py [-n ITERATIONS] [--sessions N ...]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from collections.abc import Callable
+from collections.abc import Sequence
+from typing import Any
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    from app.constants.privileges import Privileges
+    from app.objects.collections import Players
+    from app.objects.player import Player
+    from app.utils import make_safe_name
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+class LegacyPlayers(list[Player]):
+    """The previous `Players` lookups, which scan the whole list."""
+
+    @property
+    def staff(self) -> set[Player]:
+        return {p for p in self if p.priv & Privileges.STAFF}
+
+    @property
+    def unrestricted(self) -> set[Player]:
+        return {p for p in self if p.priv & Privileges.UNRESTRICTED}
+
+    def get(
+        self,
+        token: str | None = None,
+        id: int | None = None,
+        name: str | None = None,
+    ) -> Player | None:
+        for player in self:
+            if token is not None:
+                if player.token == token:
+                    return player
+            elif id is not None:
+                if player.id == id:
+                    return player
+            elif name is not None:
+                if player.safe_name == make_safe_name(name):
+                    return player
+
+        return None
+
+
+def make_player(id: int) -> Player:
+    priv = Privileges.UNRESTRICTED | Privileges.VERIFIED
+    if id % 10 == 0:
+        priv &= ~Privileges.UNRESTRICTED
+    if id % 50 == 0:
+        priv |= Privileges.MODERATOR
+
+    return Player(id=id, name=f"Player {id}", priv=priv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the indexed & list-scanning player collections",
+    )
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument(
+        "--sessions",
+        type=int,
+        nargs="+",
+        default=[100, 1_000, 5_000, 10_000, 20_000],
+    )
+    args = parser.parse_args(argv)
+
+    rng = random.Random(727)
+
+    for count in args.sessions:
+        sessions = [make_player(id) for id in range(3, count + 3)]
+        legacy = LegacyPlayers(sessions)
+        indexed = Players(sessions)
+
+        # look up random online players, as the server would
+        targets = rng.choices(sessions, k=100)
+
+        ops: dict[str, Callable[[Any], object]] = {
+            "get(token)": lambda c: [c.get(token=p.token) for p in targets],
+            "get(id)": lambda c: [c.get(id=p.id) for p in targets],
+            "get(name)": lambda c: [c.get(name=p.name) for p in targets],
+            "unrestricted": lambda c: len(c.unrestricted),
+            "staff": lambda c: len(c.staff),
+        }
+
+        print(f"{count} sessions:")
+        for name, op in ops.items():
+            # sanity check; both collections must agree
+            assert op(legacy) == op(indexed)
+
+            legacy_t = timeit.timeit(lambda: op(legacy), number=args.iterations)
+            indexed_t = timeit.timeit(lambda: op(indexed), number=args.iterations)
+
+            legacy_us = legacy_t / args.iterations * 1e6
+            indexed_us = indexed_t / args.iterations * 1e6
+            print(
+                f"  {name:<13} legacy {legacy_us:11.2f}us | "
+                f"indexed {indexed_us:8.2f}us | {legacy_t / indexed_t:8.1f}x",
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3.11
+"""\
+Throughput benchmark for the replay store (`app.usecases.replays`).
+
+Compares the store against the previous implementation (blocking
+`write_bytes` & `read_bytes` calls on the event loop, in a flat directory)
+for concurrent writes & reads. Alongside throughput, the longest stall of
+the event loop is reported; this is the time other requests would have
+been left waiting for.
+
+usage: python3.11 bench_replays.py [-n REPLAYS] [--concurrency N ...] [--replay PATH]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Sequence
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    from app.usecases import replays
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+# the average size of a replay submitted to the server
+DEFAULT_REPLAY_SIZE = 128 * 1024
+
+
+async def legacy_write(score_id: int, replay: bytes) -> None:
+    (replays.REPLAYS_PATH / f"{score_id}.osr").write_bytes(replay)
+
+
+async def legacy_read(score_id: int) -> int:
+    return len((replays.REPLAYS_PATH / f"{score_id}.osr").read_bytes())
+
+
+async def store_write(score_id: int, replay: bytes) -> None:
+    await replays.save(score_id, replay)
+
+
+async def store_read(score_id: int) -> int:
+    return sum([len(chunk) async for chunk in replays.stream(score_id)])
+
+
+async def measure_stalls(stop: asyncio.Event, stalls: list[float]) -> None:
+    """Measure how late the event loop is in waking up a sleeping task."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        stalls.append(time.perf_counter() - start - 0.001)
+
+
+async def run(
+    op: Callable[[int], Awaitable[object]],
+    score_ids: Sequence[int],
+    concurrency: int,
+) -> tuple[float, float]:
+    """Run an operation for each score id; return (elapsed, max loop stall)."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(score_id: int) -> None:
+        async with semaphore:
+            await op(score_id)
+
+    stop = asyncio.Event()
+    stalls: list[float] = []
+    stall_task = asyncio.create_task(measure_stalls(stop, stalls))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[run_one(score_id) for score_id in score_ids])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await stall_task
+
+    return elapsed, max(stalls, default=0.0)
+
+
+async def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the replay store's write & read throughput",
+    )
+    parser.add_argument("-n", "--replays", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument(
+        "--replay",
+        type=Path,
+        help="a real replay to use (default: random data, like lzma'd frames)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.replay is not None:
+        replay = args.replay.read_bytes()
+    else:
+        replay = os.urandom(DEFAULT_REPLAY_SIZE)
+
+    total_mb = len(replay) * args.replays / (1024 * 1024)
+
+    for concurrency in args.concurrency:
+        print(f"concurrency {concurrency} ({args.replays} x {len(replay)}B):")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            replays.REPLAYS_PATH = Path(tmp_dir)
+
+            legacy_ids = range(1, args.replays + 1)
+            store_ids = range(args.replays + 1, 2 * args.replays + 1)
+
+            results = {
+                "legacy write": await run(
+                    lambda id: legacy_write(id, replay),
+                    legacy_ids,
+                    concurrency,
+                ),
+                "store write": await run(
+                    lambda id: store_write(id, replay),
+                    store_ids,
+                    concurrency,
+                ),
+                "legacy read": await run(legacy_read, legacy_ids, concurrency),
+                "store read": await run(store_read, store_ids, concurrency),
+            }
+
+            for score_id in store_ids:
+                replays.compress(score_id)
+
+            results["store read (gz)"] = await run(
+                store_read,
+                store_ids,
+                concurrency,
+            )
+
+        for name, (elapsed, max_stall) in results.items():
+            print(
+                f"  {name:<16} {total_mb / elapsed:9.1f}MB/s | "
+                f"max loop stall {max_stall * 1000:8.2f}ms",
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3.11
+"""\
+Benchmark for the decryption of score submission payloads.
+
+Compares the previous implementation (a new py3rijndael `RijndaelCbc` per
+submission) against each backend in `app.usecases.score_decryption`.
+
+Real payloads can be captured from score submissions (the `osuver`, `iv`,
+`score` & `s` form fields) into a json lines file, one submission per line;
+otherwise, payloads with a realistic size are generated.
+
+usage: python3.11 bench_score_decryption.py [-n ITERATIONS] [--payloads FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import timeit
+from base64 import b64decode
+from base64 import b64encode
+from collections.abc import Callable
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TypedDict
+
+import orjson
+from py3rijndael import Pkcs7Padding
+from py3rijndael import RijndaelCbc
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    from app.usecases import score_decryption
+    from app.usecases.score_decryption import Py3RijndaelBackend
+    from app.usecases.score_decryption import RijndaelBackend
+    from app.usecases.score_decryption import TableRijndaelBackend
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+class Payload(TypedDict):
+    osuver: str
+    iv: str
+    score: str
+    s: str
+
+
+def generate_payload(osu_version: str) -> Payload:
+    """Generate a payload like those sent by the osu! client."""
+    iv = os.urandom(32)
+    cipher = RijndaelCbc(
+        key=score_decryption.get_key(osu_version),
+        iv=iv,
+        padding=Pkcs7Padding(32),
+        block_size=32,
+    )
+
+    score_data = ":".join(
+        [
+            os.urandom(16).hex(),  # map md5
+            "cmyui",
+            os.urandom(16).hex(),  # online checksum
+            *map(str, (727, 27, 2, 72, 12, 1, 727727, 1250, "False", "A")),
+            *map(str, (72, "True", 0, "20231030123456", osu_version, 727)),
+        ],
+    )
+    client_hash = ":".join(os.urandom(16).hex() for _ in range(5)) + ":"
+
+    return {
+        "osuver": osu_version,
+        "iv": b64encode(iv).decode(),
+        "score": b64encode(cipher.encrypt(score_data.encode())).decode(),
+        "s": b64encode(cipher.encrypt(client_hash.encode())).decode(),
+    }
+
+
+def legacy_decrypt(payload: Payload) -> tuple[bytes, bytes]:
+    aes = RijndaelCbc(
+        key=score_decryption.get_key(payload["osuver"]),
+        iv=b64decode(payload["iv"]),
+        padding=Pkcs7Padding(32),
+        block_size=32,
+    )
+    return (
+        aes.decrypt(b64decode(payload["score"])),
+        aes.decrypt(b64decode(payload["s"])),
+    )
+
+
+def make_backend_decrypt(
+    backend: RijndaelBackend,
+) -> Callable[[Payload], tuple[bytes, bytes]]:
+    def decrypt(payload: Payload) -> tuple[bytes, bytes]:
+        iv = b64decode(payload["iv"])
+        return (
+            backend.decrypt(payload["osuver"], iv, b64decode(payload["score"])),
+            backend.decrypt(payload["osuver"], iv, b64decode(payload["s"])),
+        )
+
+    return decrypt
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the score payload decryption backends",
+    )
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument(
+        "--payloads",
+        type=Path,
+        help="a json lines file of captured payloads (default: generated)",
+    )
+    args = parser.parse_args(argv)
+
+    payloads: list[Payload]
+    if args.payloads is not None:
+        payloads = [
+            orjson.loads(line)
+            for line in args.payloads.read_text().splitlines()
+            if line.strip()
+        ]
+    else:
+        payloads = [generate_payload(v) for v in ("20230814", "20231030") * 50]
+
+    implementations: dict[str, Callable[[Payload], tuple[bytes, bytes]]] = {
+        "legacy": legacy_decrypt,
+        "py3rijndael": make_backend_decrypt(Py3RijndaelBackend()),
+        "table": make_backend_decrypt(TableRijndaelBackend()),
+    }
+
+    # sanity check; all implementations must agree
+    expected = [legacy_decrypt(payload) for payload in payloads]
+    for name, decrypt in implementations.items():
+        assert [decrypt(payload) for payload in payloads] == expected, name
+
+    print(f"{len(payloads)} payloads, {args.iterations} iterations:")
+
+    legacy_t = None
+    for name, decrypt in implementations.items():
+        t = timeit.timeit(
+            lambda: [decrypt(payload) for payload in payloads],
+            number=args.iterations,
+        )
+        legacy_t = legacy_t or t
+
+        us_per_payload = t / (args.iterations * len(payloads)) * 1e6
+        print(f"  {name:<12} {us_per_payload:9.1f}us/payload | {legacy_t / t:5.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3.11
+"""\
+Migrate replays from the old (flat) `.data/osr/{score_id}.osr` layout into
+the sharded replay store, optionally compressing replays which haven't been
+modified in a given number of days.
+
+The server can serve replays from either layout, so this
+can safely be run while the server is online.
+
+usage: python3.11 migrate_replays.py [--compress-older-than DAYS]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from collections.abc import Sequence
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    from app.usecases import replays
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Migrate replays into the sharded replay store",
+    )
+    parser.add_argument(
+        "--compress-older-than",
+        type=float,
+        metavar="DAYS",
+        help="compress replays which haven't been modified in this many days",
+    )
+    args = parser.parse_args(argv)
+
+    if not replays.REPLAYS_PATH.exists():
+        print(f"{replays.REPLAYS_PATH} does not exist, nothing to migrate.")
+        return 0
+
+    migrated = 0
+    for path in replays.REPLAYS_PATH.glob("*.osr"):
+        if not path.stem.isdecimal():
+            continue
+
+        if replays.migrate(int(path.stem)):
+            migrated += 1
+
+            if migrated % 10_000 == 0:
+                print(f"Migrated {migrated} replays...")
+
+    print(f"Migrated {migrated} replays.")
+
+    if args.compress_older_than is not None:
+        cutoff = time.time() - args.compress_older_than * 24 * 60 * 60
+
+        compressed = 0
+        for path in replays.REPLAYS_PATH.glob("*/*.osr"):
+            if not path.stem.isdecimal() or path.stat().st_mtime > cutoff:
+                continue
+
+            if replays.compress(int(path.stem)):
+                compressed += 1
+
+                if compressed % 10_000 == 0:
+                    print(f"Compressed {compressed} replays...")
+
+        print(f"Compressed {compressed} replays.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3.11
+"""\
+Precompute & persist the difficulty attributes of all ranked, approved
+& loved beatmaps, for a set of mod combinations.
+
+Attributes from other versions of the calculator, or for beatmaps which
+no longer exist (e.g. since their .osu file was updated) are removed.
+
+usage: python3.11 precompute_difficulty.py [--mods NM HD HR DT ...] [--force]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+from collections.abc import Sequence
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.state.services
+    import app.usecases.performance
+    from app.constants.mods import Mods
+    from app.objects.beatmap import RankedStatus
+    from app.repositories import difficulty_attributes as difficulty_attributes_repo
+    from app.usecases.osu_files import ensure_local_osu_file
+    from app.usecases.performance import CALCULATOR_VERSION
+    from app.usecases.performance import ScoreParams
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+DEFAULT_MODS = ["NM", "EZ", "HD", "HR", "DT", "HT", "FL", "HDHR", "HDDT", "HRDT"]
+
+
+async def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Precompute difficulty attributes for all leaderboard maps",
+    )
+    parser.add_argument("--mods", nargs="+", default=DEFAULT_MODS)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="recalculate maps which already have attributes",
+    )
+    args = parser.parse_args(argv)
+
+    mod_combos = [Mods.from_modstr(mods) for mods in args.mods]
+
+    await app.state.services.database.connect()
+
+    await difficulty_attributes_repo.delete_stale(CALCULATOR_VERSION)
+
+    calculated_md5s: set[str] = set()
+    if not args.force:
+        calculated_md5s = await difficulty_attributes_repo.fetch_calculated_md5s(
+            CALCULATOR_VERSION,
+        )
+
+    beatmaps = await app.state.services.database.fetch_all(
+        "SELECT id, md5, mode FROM maps WHERE status IN :statuses",
+        {
+            "statuses": (
+                RankedStatus.Ranked,
+                RankedStatus.Approved,
+                RankedStatus.Loved,
+            ),
+        },
+    )
+
+    calculated = failed = 0
+
+    for beatmap in beatmaps:
+        if beatmap["md5"] in calculated_md5s:
+            continue
+
+        osu_file_path = await ensure_local_osu_file(beatmap["id"], beatmap["md5"])
+        if osu_file_path is None:
+            failed += 1
+            continue
+
+        # the attributes are saved as they're calculated
+        await app.usecases.performance.calculate_performances(
+            osu_file_path=str(osu_file_path),
+            scores=[ScoreParams(mode=beatmap["mode"], mods=m) for m in mod_combos],
+            map_md5=beatmap["md5"],
+        )
+        calculated += 1
+
+        if calculated % 100 == 0:
+            print(f"Calculated {calculated} beatmaps...")
+
+    print(
+        f"Calculated {calculated} beatmaps "
+        f"({len(calculated_md5s)} already calculated, {failed} missing .osu files).",
+    )
+
+    await app.state.services.http_client.aclose()
+    await app.state.services.database.disconnect()
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3.11
+"""\
+Rebuild the per-map redis sorted sets used for score placements
+(see `app.usecases.map_ranks`) from the best scores in sql.
+
+The sets are kept up to date by the server, but must be rebuilt after
+scores are changed outside of it; e.g. after running recalc.py, or
+editing scores in sql by hand.
+
+Sets of maps which no longer have any best scores are removed, and will
+be rebuilt by the server when they're next needed.
+
+usage: python3.11 rebuild_map_ranks.py [--map MD5 ...]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections.abc import Sequence
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.state.services
+    from app.usecases import map_ranks
+    from app.usecases.map_ranks import get_scoring_metric
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+async def rebuild(map_md5s: Sequence[str]) -> int:
+    """Rebuild the sets of some (or all) maps; return the number rebuilt."""
+    query = [
+        "SELECT s.map_md5, s.mode, s.userid, s.score, s.pp FROM scores s "
+        "INNER JOIN users u ON u.id = s.userid "
+        "WHERE s.status = 2 AND u.priv & 1",
+    ]
+    params: dict[str, object] = {}
+
+    if map_md5s:
+        query.append("AND s.map_md5 IN :map_md5s")
+        params["map_md5s"] = map_md5s
+
+    query.append("ORDER BY s.map_md5, s.mode")
+
+    rebuilt: set[str] = set()
+    key: str | None = None
+    scores: dict[str, float] = {}
+
+    async for row in app.state.services.database.iterate(" ".join(query), params):
+        row_key = map_ranks.get_key(row["map_md5"], row["mode"])
+        if row_key != key:
+            if key is not None:
+                await map_ranks.store(key, scores, replace=True)
+                rebuilt.add(key)
+
+                if len(rebuilt) % 1000 == 0:
+                    print(f"  {len(rebuilt)} sets")
+
+            key = row_key
+            scores = {}
+
+        scores[str(row["userid"])] = row[get_scoring_metric(row["mode"])]
+
+    if key is not None:
+        await map_ranks.store(key, scores, replace=True)
+        rebuilt.add(key)
+
+    # remove the sets of maps without best scores
+    if map_md5s:
+        stale_keys = [
+            map_ranks.get_key(map_md5, mode)
+            for map_md5 in map_md5s
+            for mode in map_ranks.MODES
+        ]
+    else:
+        stale_keys = [
+            key.decode()
+            async for key in app.state.services.redis.scan_iter(
+                match=f"{map_ranks.KEY_PREFIX}:*",
+            )
+        ]
+
+    # NOTE: sets being built by the server are left alone
+    stale_keys = [
+        key for key in stale_keys if key not in rebuilt and ":build:" not in key
+    ]
+    if stale_keys:
+        await app.state.services.redis.delete(*stale_keys)
+
+    return len(rebuilt)
+
+
+async def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the per-map sorted sets used for score placements",
+    )
+    parser.add_argument(
+        "--map",
+        dest="map_md5s",
+        nargs=argparse.ONE_OR_MORE,
+        default=[],
+        metavar="MD5",
+        help="only rebuild the sets of these maps (default: all maps)",
+    )
+    args = parser.parse_args(argv)
+
+    await app.state.services.database.connect()
+    await app.state.services.redis.initialize()
+
+    try:
+        print("Rebuilding map rank sets:")
+        st = time.perf_counter()
+        count = await rebuild(args.map_md5s)
+        print(f"Rebuilt {count} sets in {time.perf_counter() - st:.1f}s.")
+    finally:
+        await app.state.services.database.disconnect()
+        await app.state.services.redis.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3.11
+"""\
+Rebuild the redis sorted sets of players' global & country rankings
+(see `app.usecases.rankings`) from their stats in sql.
+
+The sets are kept up to date by the server (which also builds them if
+they haven't been built, e.g. after redis' data is lost), but must be
+rebuilt if they fall out of sync with sql; e.g. after a player's stats
+are edited in sql by hand.
+
+usage: python3.11 rebuild_rankings.py [-m MODE ...]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+from collections.abc import Sequence
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.state.services
+    from app.constants.gamemodes import GameMode
+    from app.usecases import rankings
+    from app.usecases.map_ranks import MODES
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+async def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the sorted sets of players' global & country rankings",
+    )
+    parser.add_argument(
+        "-m",
+        "--mode",
+        nargs=argparse.ONE_OR_MORE,
+        type=int,
+        choices=[mode.value for mode in MODES],
+        default=[mode.value for mode in MODES],
+    )
+    args = parser.parse_args(argv)
+
+    await app.state.services.database.connect()
+    await app.state.services.redis.initialize()
+
+    try:
+        for mode in map(GameMode, args.mode):
+            count = await rankings.rebuild(mode)
+            print(f"Rebuilt {mode!r} rankings with {count} players.")
+    finally:
+        await app.state.services.database.disconnect()
+        await app.state.services.redis.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
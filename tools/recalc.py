@@ -3,21 +3,17 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-import math
 import os
 import sys
 from collections.abc import Awaitable
 from collections.abc import Iterator
 from collections.abc import Sequence
 from dataclasses import dataclass
-from dataclasses import field
 from pathlib import Path
 from typing import Any
 from typing import TypeVar
 
 import databases
-from akatsuki_pp_py import Beatmap
-from akatsuki_pp_py import Calculator
 from redis import asyncio as aioredis
 
 sys.path.insert(0, os.path.abspath(os.pardir))
@@ -27,9 +23,12 @@ try:
     from app.constants.privileges import Privileges
     from app.constants.mods import Mods
     from app.constants.gamemodes import GameMode
-    from app.objects.beatmap import ensure_local_osu_file
+    from app.objects.top_scores import TopScores
+    from app.usecases.osu_files import ensure_local_osu_file
+    from app.usecases.performance import ScoreParams
     import app.settings
     import app.state.services
+    import app.usecases.performance
 except ModuleNotFoundError:
     print("\x1b[;91mMust run from tools/ directory\x1b[m")
     raise
@@ -38,14 +37,12 @@ T = TypeVar("T")
 
 
 DEBUG = False
-BEATMAPS_PATH = Path.cwd() / ".data/osu"
 
 
 @dataclass
 class Context:
     database: databases.Database
     redis: aioredis.Redis
-    beatmaps: dict[int, Beatmap] = field(default_factory=dict)
 
 
 def divide_chunks(values: list[T], n: int) -> Iterator[list[T]]:
@@ -58,30 +55,27 @@ async def recalculate_score(
     beatmap_path: Path,
     ctx: Context,
 ) -> None:
-    beatmap = ctx.beatmaps.get(score["map_id"])
-    if beatmap is None:
-        beatmap = Beatmap(path=str(beatmap_path))
-        ctx.beatmaps[score["map_id"]] = beatmap
-
-    calculator = Calculator(
-        mode=GameMode(score["mode"]).as_vanilla,
-        mods=score["mods"],
-        acc=score["acc"],
-        combo=score["max_combo"],
-        n_geki=score["ngeki"],  # Mania 320s
-        n300=score["n300"],
-        n_katu=score["nkatu"],  # Mania 200s, Catch tiny droplets
-        n100=score["n100"],
-        n50=score["n50"],
-        n_misses=score["nmiss"],
+    results = await app.usecases.performance.calculate_performances(
+        osu_file_path=str(beatmap_path),
+        scores=[
+            ScoreParams(
+                mode=GameMode(score["mode"]).as_vanilla,
+                mods=score["mods"],
+                combo=score["max_combo"],
+                acc=score["acc"],
+                ngeki=score["ngeki"],  # Mania 320s
+                n300=score["n300"],
+                nkatu=score["nkatu"],  # Mania 200s, Catch tiny droplets
+                n100=score["n100"],
+                n50=score["n50"],
+                nmiss=score["nmiss"],
+            ),
+        ],
+        # parsed beatmaps are cached by md5 (within a memory budget)
+        map_md5=score["map_md5"],
     )
-    attrs = calculator.performance(beatmap)
 
-    new_pp: float = attrs.pp
-    if math.isnan(new_pp) or math.isinf(new_pp):
-        new_pp = 0.0
-
-    new_pp = min(new_pp, 9999.999)
+    new_pp = min(results[0]["performance"]["pp"], 9999.999)
 
     await ctx.database.execute(
         "UPDATE scores SET pp = :new_pp WHERE id = :id",
@@ -100,8 +94,9 @@ async def process_score_chunk(
 ) -> None:
     tasks: list[Awaitable[None]] = []
     for score in chunk:
-        beatmap_path = BEATMAPS_PATH / f"{score['map_id']}.osu"
-        await ensure_local_osu_file(beatmap_path, score["map_id"], score["map_md5"])
+        beatmap_path = await ensure_local_osu_file(score["map_id"], score["map_md5"])
+        if beatmap_path is None:
+            continue
 
         tasks.append(recalculate_score(score, beatmap_path, ctx))
 
@@ -113,30 +108,13 @@ async def recalculate_user(
     game_mode: GameMode,
     ctx: Context,
 ) -> None:
-    best_scores = await ctx.database.fetch_all(
-        "SELECT s.pp, s.acc FROM scores s "
-        "INNER JOIN maps m ON s.map_md5 = m.md5 "
-        "WHERE s.userid = :user_id AND s.mode = :mode "
-        "AND s.status = 2 AND m.status IN (2, 3) "  # ranked, approved
-        "ORDER BY s.pp DESC",
-        {"user_id": id, "mode": game_mode},
-    )
+    async with ctx.database.connection() as db_conn:
+        top_scores = await TopScores.from_sql(id, game_mode, db_conn)
 
-    total_scores = len(best_scores)
-    if not total_scores:
+    if not top_scores.count:
         return
 
-    top_100_pp = best_scores[:100]
-
-    # calculate new total weighted accuracy
-    weighted_acc = sum(row["acc"] * 0.95**i for i, row in enumerate(top_100_pp))
-    bonus_acc = 100.0 / (20 * (1 - 0.95**total_scores))
-    acc = (weighted_acc * bonus_acc) / 100
-
-    # calculate new total weighted pp
-    weighted_pp = sum(row["pp"] * 0.95**i for i, row in enumerate(top_100_pp))
-    bonus_pp = 416.6667 * (1 - 0.9994**total_scores)
-    pp = round(weighted_pp + bonus_pp)
+    pp, acc = top_scores.pp, top_scores.acc
 
     await ctx.database.execute(
         "UPDATE stats SET pp = :pp, acc = :acc WHERE id = :id AND mode = :mode",